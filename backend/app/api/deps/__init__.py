@@ -10,7 +10,11 @@ from .auth import (
 
 from .papers import (
     get_paper_form,
+    get_owned_paper,
+    get_owned_upload_session,
     validate_paper_file,
+    OwnedPaper,
+    OwnedUploadSession,
     PAPER_ALLOWED_TYPES
 )
 
@@ -26,6 +30,10 @@ __all__ = [
     
     # 论文相关
     "get_paper_form",
+    "get_owned_paper",
+    "get_owned_upload_session",
     "validate_paper_file",
+    "OwnedPaper",
+    "OwnedUploadSession",
     "PAPER_ALLOWED_TYPES"
 ]
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Annotated
 
 import jwt
@@ -9,6 +10,7 @@ from pydantic import ValidationError
 from beanie.odm.fields import PydanticObjectId
 
 from app.core import security
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
 from app.models import TokenData, User
 from app.exceptions.user_exceptions import UserNotFound, UserNotActive
@@ -23,18 +25,24 @@ reusable_oauth2 = OAuth2PasswordBearer(
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 async def get_current_user(token: TokenDep) -> User:
+    cached_user = await auth_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
         token_data = TokenData(**payload)
         user_id = PydanticObjectId(token_data.sub)
+        loaded_at = datetime.utcnow()
         user = await User.get(user_id)
         
         if not user:
             raise UserNotFound
         if not user.is_active:
             raise UserNotActive
+        auth_cache.set(token, user, expires_at=token_data.exp, loaded_at=loaded_at)
         return user
     except (InvalidTokenError, ValidationError) as e:
         logger.error(f"Token validation error: {str(e)}")
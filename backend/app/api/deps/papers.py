@@ -1,8 +1,15 @@
 import logging
+from typing import Annotated
+
 from fastapi import File, Form, UploadFile, Depends
+from beanie.odm.fields import PydanticObjectId
 
+from app.api.deps.auth import CurrentUser
+from app.exceptions.auth_exceptions import PermissionDenied
 from app.exceptions.base import ParamException
-from app.models.papers import PaperCreateForm
+from app.exceptions.paper_exceptions import PaperNotFound, UploadSessionNotFound
+from app.models.papers import Paper, PaperCreateForm
+from app.models.upload_session import UploadSession
 from app.utils.file_helper import FileHelper
 
 logger = logging.getLogger(__name__)
@@ -44,4 +51,24 @@ async def get_paper_form(
         )
     except ValueError as e:
         logger.error(e)
-        raise ParamException 
\ No newline at end of file
+        raise ParamException
+
+async def get_owned_paper(current_user: CurrentUser, id: PydanticObjectId) -> Paper:
+    """获取论文并校验当前用户有权访问"""
+    paper = await Paper.get(id)
+    if not paper:
+        raise PaperNotFound
+    if not current_user.is_superuser and (paper.owner_id != current_user.id):
+        raise PermissionDenied
+    return paper
+
+OwnedPaper = Annotated[Paper, Depends(get_owned_paper)]
+
+async def get_owned_upload_session(current_user: CurrentUser, session_id: PydanticObjectId) -> UploadSession:
+    """获取当前用户的上传会话"""
+    session = await UploadSession.get(session_id)
+    if not session or session.owner_id != current_user.id:
+        raise UploadSessionNotFound
+    return session
+
+OwnedUploadSession = Annotated[UploadSession, Depends(get_owned_upload_session)]
@@ -1,19 +1,23 @@
-from typing import Any
+from typing import Any, Optional
 import logging
 
 from fastapi import APIRouter
 from beanie.odm.fields import PydanticObjectId
 
+from app.core.responses import ApiRoute
 from app.api.deps import CurrentUser
-from app.models import Item, ItemCreate, ItemPublic, ItemUpdate
+from app.models import Item, ItemCreate, ItemListView, ItemPublic, ItemUpdate
+from app.models.counter import Counter, owner_counter_key
 from app.models.response import ApiResponse, PaginatedResponse
+from app.models.utils import get_link_id
 from app.exceptions.auth_exceptions import PermissionDenied
 from app.exceptions.item_exceptions import ItemNotFound
+from app.utils.pagination_helper import TotalMode, fetch_page_with_total
 
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/items", tags=["items"])
+router = APIRouter(prefix="/items", tags=["items"], route_class=ApiRoute)
 
 
 @router.get("/", response_model=ApiResponse[list[ItemPublic]])
@@ -21,32 +25,49 @@ async def read_items(
     current_user: CurrentUser,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total_mode: TotalMode = "exact",
+    mine: bool = False,
 ) -> Any:
     """
     Retrieve items.
+
+    Pass the `next_cursor` of the previous page as `cursor` for keyset
+    pagination; `skip` is ignored in that case. Set `include_total=false` to
+    skip counting, or `total_mode=estimated` for a cheap approximate total.
+    Set `mine=true` to list only the current user's items.
     """
-    # 获取项目总数
-    count = await Item.count()
-    
-    # 获取分页项目列表
-    items = await Item.find().skip(skip).limit(limit).to_list()
+    # 按用户过滤时走 (owner_id, created_at, _id) 索引，总数读取增量计数器
+    filters = []
+    counter_key = None
+    if mine:
+        filters.append(Item.owner_id == current_user.id)
+        counter_key = owner_counter_key("items", current_user.id)
+
+    # 并发获取分页项目列表与总数
+    items, next_cursor, count = await fetch_page_with_total(
+        Item,
+        *filters,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+        total_mode=total_mode,
+        counter_key=counter_key,
+        projection_model=ItemListView,
+    )
     
-    # 将 Item 转换为 ItemPublic
-    items_public = []
-    for item in items:
-        try:
-            item_public = await ItemPublic.from_item(item)
-            items_public.append(item_public)
-        except Exception as e:
-            logger.error(f"Error processing item {item.id}: {str(e)}")
-            continue
+    # 将投影结果批量转换为 ItemPublic
+    items_public = await ItemPublic.from_items(items)
     
     # 返回分页响应
     return PaginatedResponse.create(
         items=items_public,
         total=count,
         page=skip // limit + 1 if limit else 1,
-        page_size=limit
+        page_size=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -76,6 +97,7 @@ async def create_item(
     item_data["owner"] = current_user
     item = Item.model_validate(item_data)
     await item.insert()
+    await Counter.incr(owner_counter_key("items", current_user.id))
     
     item_public = await ItemPublic.from_item(item)
     return ApiResponse.success_response(
@@ -127,4 +149,5 @@ async def delete_item(
         raise PermissionDenied
     
     await item.delete()
+    await Counter.incr(owner_counter_key("items", get_link_id(item.owner)), -1)
     return ApiResponse.success_response(message="项目删除成功")
@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta
 from typing import Annotated, Any
 
@@ -7,20 +8,23 @@ from fastapi.security import OAuth2PasswordRequestForm
 import logging
 
 from app import crud
+from app.core.responses import ApiRoute
 from app.api.deps import CurrentUser, CurrentSuperuser
 from app.core import security
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
-from app.core.security import get_password_hash
-from app.models import PasswordResetConfirm, Token, UserPublic
+from app.core.security import get_password_hash_async
+from app.models import PasswordResetConfirm, Token, User, UserPublic
 from app.models.response import ApiResponse
-from app.utils.email_helper import (generate_reset_password_email,send_email)
+from app.services.email_services import enqueue_email
+from app.utils.email_helper import generate_reset_password_email
 from app.utils.token_helper import generate_password_reset_token,verify_password_reset_token
 from app.exceptions.auth_exceptions import AuthFail,UserEmailOrPasswordFail
 from app.exceptions.user_exceptions import UserNotFound,UserNotActive
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["login"])
+router = APIRouter(tags=["login"], route_class=ApiRoute)
 
 @router.post("/login/access-token", response_model=ApiResponse[Token])
 async def login_access_token(
@@ -57,7 +61,7 @@ async def test_token(current_user: CurrentUser) -> Any:
     """
     Test access token
     """
-    return ApiResponse.success_response(data=current_user)
+    return ApiResponse.success_response(data=current_user.to_public())
 
 
 @router.post("/password-recovery/{email}", response_model=ApiResponse[None])
@@ -67,16 +71,19 @@ async def recover_password(email: str) -> Any:
     """
     user = await crud.get_user_by_email(email=email)
 
-    if not user:
+    # 没有邮箱的用户无法接收重置邮件
+    if not user or not user.email:
         raise UserNotFound
     password_reset_token = generate_password_reset_token(email=email)
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
+    await enqueue_email(
         email_to=user.email,
         subject=email_data.subject,
         html_content=email_data.html_content,
+        # 同一分钟内的重复请求只发送一封
+        dedup_key=f"password-recovery:{user.id}:{int(time.time()) // 60}",
     )
     return ApiResponse.success_response(message="密码重置邮件已发送")
 
@@ -95,8 +102,8 @@ async def reset_password(body: PasswordResetConfirm) -> Any:
     elif not user.is_active:
         raise UserNotActive
     
-    user.hashed_password = get_password_hash(password=body.new_password)
-    await user.save()
+    await user.set({User.hashed_password: await get_password_hash_async(password=body.new_password)})
+    await auth_cache.evict_user(user.id)
     return ApiResponse.success_response(message="密码更新成功")
 
 
@@ -111,7 +118,8 @@ async def recover_password_html_content(email: str) -> Any:
     """
     user = await crud.get_user_by_email(email=email)
 
-    if not user:
+    # 没有邮箱的用户无法接收重置邮件
+    if not user or not user.email:
         raise UserNotFound
     password_reset_token = generate_password_reset_token(email=email)
     email_data = generate_reset_password_email(
@@ -1,50 +1,93 @@
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
 
 from app.api.deps import CurrentUser
-from app.api.deps.papers import get_paper_form
-from app.models.papers import Paper, PaperCreate, PaperPublic, PapersPublic, PaperCreateForm
+from app.api.deps.papers import (
+    PAPER_ALLOWED_TYPES,
+    OwnedPaper,
+    OwnedUploadSession,
+    get_paper_form,
+)
+from app.core.file_response import file_response
+from app.core.responses import ApiRoute
+from app.exceptions.file_exceptions import FileTypeError
+from app.exceptions.paper_exceptions import PreviewNotReady
+from app.models.counter import owner_counter_key
+from app.models.job import Job, JobPublic
+from app.models.papers import (
+    Paper,
+    PaperCreateForm,
+    PaperListView,
+    PaperPages,
+    PaperPublic,
+    PaperSearchHit,
+    PaperTocEntry,
+)
+from app.models.related import RelatedPaper
 from app.models.response import ApiResponse, PaginatedResponse
-from app.utils.file_helper import FileHelper
-from app.core.config import settings
+from app.models.upload_session import UploadSessionCreate, UploadSessionPublic
+from app.services import preview_services, related_services, search_services
+from app.services.paper_services import PaperService
+from app.services.upload_services import UploadSessionService
+from app.utils.pagination_helper import TotalMode, fetch_page_with_total
+from app.utils.preview_helper import PREVIEW_VERSION
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/papers", tags=["papers"])
+router = APIRouter(prefix="/papers", tags=["papers"], route_class=ApiRoute)
 
 
-@router.get("/", response_model=ApiResponse[list[PapersPublic]])
+@router.get("/", response_model=ApiResponse[list[PaperPublic]])
 async def read_items(
     current_user: CurrentUser,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total_mode: TotalMode = "exact",
+    mine: bool = False,
 ) -> PaginatedResponse:
     """
     Retrieve items.
+
+    Pass the `next_cursor` of the previous page as `cursor` for keyset
+    pagination; `skip` is ignored in that case. Set `include_total=false` to
+    skip counting, or `total_mode=estimated` for a cheap approximate total.
+    Set `mine=true` to list only the current user's papers.
     """
-    # 获取项目总数
-    count = await Paper.count()
-    
-    # 获取分页项目列表
-    papers = await Paper.find().skip(skip).limit(limit).to_list()
+    # 按用户过滤时走 (owner_id, created_at, _id) 索引，总数读取增量计数器
+    filters = []
+    counter_key = None
+    if mine:
+        filters.append(Paper.owner_id == current_user.id)
+        counter_key = owner_counter_key("papers", current_user.id)
+
+    # 并发获取分页项目列表与总数
+    papers, next_cursor, count = await fetch_page_with_total(
+        Paper,
+        *filters,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+        total_mode=total_mode,
+        counter_key=counter_key,
+        projection_model=PaperListView,
+    )
     
-    # 将 Item 转换为 ItemPublic
-    papers_public = []
-    for paper in papers:
-        try:
-            paper_public = await PaperPublic.from_item(paper)
-            papers_public.append(paper_public)
-        except Exception as e:
-            logger.error(f"Error processing item {paper.id}: {str(e)}")
-            continue
+    # 将投影结果批量转换为 PaperPublic
+    papers_public = await PaperPublic.from_items(papers)
     
     # 返回分页响应
     return PaginatedResponse.create(
         items=papers_public,
         total=count,
         page=skip // limit + 1 if limit else 1,
-        page_size=limit
+        page_size=limit,
+        next_cursor=next_cursor
     )
 
 @router.post("/", response_model=ApiResponse[PaperPublic])
@@ -55,20 +98,198 @@ async def create_paper(
     """
     create paper.
     """
-    # 创建Paper数据模型
-    paper_create = form_data.to_paper_create()
-    paper_data = paper_create.model_dump()
-    paper_data["owner"] = current_user
-    
-    # 处理文件上传
-    file_helper = FileHelper(settings.DOWNLOAD_DIR)
-    saved_file_name = await file_helper.save_from_upload_file(form_data.file)
-    saved_file_url = file_helper.gen_down_url(saved_file_name)
-    paper_data["url"] = saved_file_url
-    
-    # 创建并保存数据库记录
-    paper = Paper.model_validate(paper_data)
-    await paper.insert()
-    
-    paper_public = await paper.to_public()
-    return ApiResponse.success_response(data=paper_public)
\ No newline at end of file
+    paper = await PaperService().create_paper(
+        owner=current_user,
+        paper_create=form_data.to_paper_create(),
+        file=form_data.file,
+    )
+    paper_public = await PaperPublic.from_item(paper)
+    return ApiResponse.success_response(data=paper_public)
+
+
+@router.get("/search", response_model=ApiResponse[list[PaperSearchHit]])
+async def search_papers(
+    current_user: CurrentUser,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(10, ge=1, le=50),
+    mine: bool = False,
+    mode: search_services.SearchMode = "keyword",
+) -> ApiResponse[list[PaperSearchHit]]:
+    """
+    Search processed papers.
+
+    `mode=keyword` ranks by BM25 full-text relevance; `mode=semantic` ranks
+    by vector similarity of paper chunks and reports the best matching page.
+    """
+    hits = await search_services.search_papers(
+        q, limit=limit, owner_id=current_user.id if mine else None, mode=mode
+    )
+    return ApiResponse.success_response(data=hits)
+
+
+@router.post("/uploads/", response_model=ApiResponse[UploadSessionPublic])
+async def create_upload_session(
+    current_user: CurrentUser,
+    session_in: UploadSessionCreate,
+) -> ApiResponse[UploadSessionPublic]:
+    """
+    Start a resumable upload.
+
+    Upload the file with `PUT /papers/uploads/{session_id}?offset=N`, then
+    create the paper with `POST /papers/uploads/{session_id}/complete`.
+    """
+    if session_in.content_type not in PAPER_ALLOWED_TYPES:
+        raise FileTypeError
+    session = await UploadSessionService().create_session(owner=current_user, session_in=session_in)
+    return ApiResponse.success_response(data=session.to_public())
+
+
+@router.get("/uploads/{session_id}", response_model=ApiResponse[UploadSessionPublic])
+async def read_upload_session(session: OwnedUploadSession) -> ApiResponse[UploadSessionPublic]:
+    """
+    Get upload progress; `received` is the offset of the next chunk.
+    """
+    return ApiResponse.success_response(data=session.to_public())
+
+
+@router.put("/uploads/{session_id}", response_model=ApiResponse[UploadSessionPublic])
+async def upload_chunk(
+    request: Request,
+    session: OwnedUploadSession,
+    offset: int = Query(..., ge=0),
+) -> ApiResponse[UploadSessionPublic]:
+    """
+    Upload a chunk as the raw request body, starting at `offset`.
+    """
+    session = await UploadSessionService().write_chunk(session, offset, request.stream())
+    return ApiResponse.success_response(data=session.to_public())
+
+
+@router.post("/uploads/{session_id}/complete", response_model=ApiResponse[PaperPublic])
+async def complete_upload(
+    current_user: CurrentUser,
+    session: OwnedUploadSession,
+) -> ApiResponse[PaperPublic]:
+    """
+    Create the paper from a fully uploaded session.
+    """
+    paper = await UploadSessionService().finalize(owner=current_user, session=session)
+    paper_public = await PaperPublic.from_item(paper)
+    return ApiResponse.success_response(data=paper_public)
+
+
+@router.delete("/uploads/{session_id}", response_model=ApiResponse[None])
+async def abort_upload(session: OwnedUploadSession) -> ApiResponse[None]:
+    """
+    Cancel a resumable upload.
+    """
+    await UploadSessionService().abort(session)
+    return ApiResponse.success_response(message="上传已取消")
+
+
+@router.get("/{id}", response_model=ApiResponse[PaperPublic])
+async def read_paper(paper: OwnedPaper) -> ApiResponse[PaperPublic]:
+    """
+    Get paper by ID.
+    """
+    paper_public = await PaperPublic.from_item(paper)
+    return ApiResponse.success_response(data=paper_public)
+
+
+@router.get("/{id}/process", response_model=ApiResponse[Optional[JobPublic]])
+async def read_paper_process(paper: OwnedPaper) -> ApiResponse[Optional[JobPublic]]:
+    """
+    Get the latest processing job of a paper.
+    """
+    job = await Job.find(Job.paper_id == paper.id).sort("-created_at").first_or_none()
+    return ApiResponse.success_response(data=job.to_public() if job else None)
+
+
+@router.get("/{id}/related", response_model=ApiResponse[list[RelatedPaper]])
+async def read_related_papers(
+    current_user: CurrentUser,
+    paper: OwnedPaper,
+    limit: int = Query(10, ge=1, le=50),
+    mine: bool = False,
+) -> ApiResponse[list[RelatedPaper]]:
+    """
+    Get papers similar to this one.
+
+    Reads the neighbor list stored when the paper was processed, so the cost
+    does not grow with the number of papers. Set `mine=true` to keep only the
+    current user's papers.
+    """
+    related = await related_services.read_related(
+        paper.id, limit=limit, owner_id=current_user.id if mine else None
+    )
+    return ApiResponse.success_response(data=related)
+
+
+@router.get("/{id}/pages", response_model=ApiResponse[PaperPages])
+async def read_paper_pages(
+    paper: OwnedPaper,
+    first: int = Query(1, ge=1, alias="from"),
+    last: Optional[int] = Query(None, ge=1, alias="to"),
+) -> ApiResponse[PaperPages]:
+    """
+    Get the extracted text of a page range.
+
+    Pages are 1-based and `to` is inclusive (defaults to `from`). Only the
+    requested pages are read from the server-side text cache; pages past the
+    end are omitted, and `page_count` gives the total.
+    """
+    pages = await PaperService().read_pages(paper, first, last)
+    return ApiResponse.success_response(data=pages)
+
+
+# 预览是用户内容：不执行脚本、不加载外部资源以外的内容，并禁止嗅探类型
+_PREVIEW_HEADERS = {
+    "content-security-policy": "default-src 'none'; img-src https: data:; style-src 'unsafe-inline'; sandbox",
+    "x-content-type-options": "nosniff",
+}
+
+
+@router.get("/{id}/preview", response_class=Response)
+async def read_paper_preview(request: Request, paper: OwnedPaper) -> Response:
+    """
+    Get a Markdown or Word paper rendered as a sanitized HTML fragment.
+
+    The preview is generated once per file content in the background; until it
+    is ready the endpoint returns code 10506 and the client should retry.
+    Responses carry a strong ETag, so revalidation with If-None-Match is cheap.
+    """
+    html_path = await preview_services.preview_html_path(paper)
+    try:
+        response = file_response(
+            request,
+            html_path,
+            content_hash=f"{paper.content_hash}-v{PREVIEW_VERSION}",
+            media_type="text/html; charset=utf-8",
+        )
+    except FileNotFoundError:
+        # 刚好被淘汰
+        assert paper.content_hash is not None
+        await preview_services.schedule_preview(paper.content_hash)
+        raise PreviewNotReady()
+    response.headers.update(_PREVIEW_HEADERS)
+    return response
+
+
+@router.get("/{id}/preview/toc", response_model=ApiResponse[list[PaperTocEntry]])
+async def read_paper_preview_toc(paper: OwnedPaper) -> ApiResponse[list[PaperTocEntry]]:
+    """
+    Get the table of contents of the preview.
+
+    Each entry's `anchor` is the id of the heading in the preview HTML.
+    """
+    toc = await preview_services.preview_toc(paper)
+    return ApiResponse.success_response(data=[PaperTocEntry(**entry) for entry in toc])
+
+
+@router.delete("/{id}", response_model=ApiResponse[None])
+async def delete_paper(paper: OwnedPaper) -> ApiResponse[None]:
+    """
+    Delete a paper.
+    """
+    await PaperService().delete_paper(paper)
+    return ApiResponse.success_response(message="论文删除成功")
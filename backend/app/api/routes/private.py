@@ -3,7 +3,7 @@ from typing import Any
 from fastapi import APIRouter
 from pydantic import BaseModel, EmailStr
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.models import (
     User,
     UserPublic,
@@ -35,7 +35,7 @@ async def create_user(user_in: PrivateUserCreate) -> Any:
     user_data = {
         "email": user_in.email,
         "full_name": user_in.full_name,
-        "hashed_password": get_password_hash(user_in.password),
+        "hashed_password": await get_password_hash_async(user_in.password),
         "is_verified": user_in.is_verified,
     }
     
@@ -1,15 +1,17 @@
 import uuid
-from typing import Any
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends
 
 from app import crud
+from app.core.responses import ApiRoute
 from app.api.deps import (
     CurrentUser,
     get_current_active_superuser,
 )
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.models import (
     Item,
     MessageResponse,
@@ -21,13 +23,16 @@ from app.models import (
     UsersPublic,
     UserUpdate,
 )
+from app.models.counter import Counter, owner_counter_key
 from app.models.response import ApiResponse, PaginatedResponse
-from app.utils.email_helper import generate_new_account_email, send_email
+from app.services.email_services import enqueue_email
+from app.utils.email_helper import generate_new_account_email
+from app.utils.pagination_helper import TotalMode, fetch_page_with_total
 from beanie.odm.fields import PydanticObjectId
 from app.exceptions.auth_exceptions import AuthFail, PermissionDenied,SuperCanNotDeleteSelf
 from app.exceptions.user_exceptions import IncorrectPassword, PasswordSame, UserNotFound,UserNotActive,UserExists
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=ApiRoute)
 
 
 @router.get(
@@ -35,15 +40,29 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=ApiResponse[list[UserPublic]],
 )
-async def read_users(skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total_mode: TotalMode = "exact",
+) -> Any:
     """
     Retrieve users.
+
+    Pass the `next_cursor` of the previous page as `cursor` for keyset
+    pagination; `skip` is ignored in that case. Set `include_total=false` to
+    skip counting, or `total_mode=estimated` for a cheap approximate total.
     """
-    # 获取用户总数
-    count = await User.count()
-    
-    # 获取分页用户列表
-    users = await User.find().skip(skip).limit(limit).to_list()
+    # 并发获取分页用户列表与总数
+    users, next_cursor, count = await fetch_page_with_total(
+        User,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+        total_mode=total_mode,
+    )
     users_public = []
     for user in users:
         try:
@@ -56,7 +75,8 @@ async def read_users(skip: int = 0, limit: int = 100) -> Any:
         items=users_public,
         total=count,
         page=skip // limit + 1 if limit else 1,
-        page_size=limit
+        page_size=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -78,13 +98,14 @@ async def create_user(*, user_in: UserCreate) -> Any:
         email_data = generate_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
         )
-        send_email(
+        await enqueue_email(
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
+            dedup_key=f"new-account:{user.id}",
         )
     return ApiResponse.success_response(
-        data=user,
+        data=user.to_public(),
         message="用户创建成功",
         code=201
     )
@@ -102,9 +123,13 @@ async def update_user_me(
         if existing_user and existing_user.id != current_user.id:
             raise UserExists
     
-    user = await crud.update_user(db_user=current_user, user_in=user_in)
+    # current_user 可能来自鉴权缓存，修改前重新读取
+    db_user = await User.get(current_user.id)
+    if not db_user:
+        raise UserNotFound
+    user = await crud.update_user(db_user=db_user, user_in=user_in)
     return ApiResponse.success_response(
-        data=user,
+        data=user.to_public(),
         message="用户信息更新成功"
     )
 
@@ -116,13 +141,17 @@ async def update_password_me(
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    # 鉴权缓存中的用户不含密码哈希，重新读取
+    db_user = await User.get(current_user.id)
+    if not db_user:
+        raise UserNotFound
+    if not await verify_password_async(body.current_password, db_user.hashed_password):
         raise IncorrectPassword
     if body.current_password == body.new_password:
         raise PasswordSame
     
-    current_user.hashed_password = get_password_hash(body.new_password)
-    await current_user.save()
+    await db_user.set({User.hashed_password: await get_password_hash_async(body.new_password)})
+    await auth_cache.evict_user(db_user.id)
     return ApiResponse.success_response(message="密码更新成功")
 
 
@@ -131,7 +160,7 @@ async def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
-    return ApiResponse.success_response(data=current_user)
+    return ApiResponse.success_response(data=current_user.to_public())
 
 
 @router.delete("/me", response_model=ApiResponse[None])
@@ -144,7 +173,10 @@ async def delete_user_me(current_user: CurrentUser) -> Any:
     
     # 删除用户相关的所有项目
     await Item.find(Item.owner == current_user).delete()
+    await Counter.reset(owner_counter_key("items", current_user.id))
+    await Counter.reset(owner_counter_key("papers", current_user.id))
     await current_user.delete()
+    await auth_cache.evict_user(current_user.id)
     return ApiResponse.success_response(message="用户删除成功")
 
 
@@ -159,7 +191,7 @@ async def register_user(user_in: UserCreate) -> Any:
     user_create = UserCreate.model_validate(user_in)
     user = await crud.create_user(user_create=user_create)
     return ApiResponse.success_response(
-        data=user,
+        data=user.to_public(),
         message="注册成功",
         code=201
     )
@@ -176,10 +208,10 @@ async def read_user_by_id(
     if not user:
         raise UserNotFound
     if user.id == current_user.id:
-        return ApiResponse.success_response(data=user)
+        return ApiResponse.success_response(data=user.to_public())
     if not current_user.is_superuser:
         raise PermissionDenied
-    return ApiResponse.success_response(data=user)
+    return ApiResponse.success_response(data=user.to_public())
 
 
 @router.patch(
@@ -206,7 +238,7 @@ async def update_user(
 
     db_user = await crud.update_user(db_user=db_user, user_in=user_in)
     return ApiResponse.success_response(
-        data=db_user,
+        data=db_user.to_public(),
         message="用户更新成功"
     )
 
@@ -229,5 +261,8 @@ async def delete_user(
     
     # 删除用户相关的所有项目
     await Item.find(Item.owner == user).delete()
+    await Counter.reset(owner_counter_key("items", user.id))
+    await Counter.reset(owner_counter_key("papers", user.id))
     await user.delete()
+    await auth_cache.evict_user(user.id)
     return ApiResponse.success_response(message="用户删除成功")
@@ -1,17 +1,22 @@
 import logging
-from typing import Optional
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import FileResponse
+import os
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
 from pydantic.networks import EmailStr
 
+from app.core.responses import ApiRoute
 from app.api.deps import get_current_active_superuser
-from app.exceptions.file_exceptions import FileNotFound
+from app.exceptions.file_exceptions import DownloadLinkInvalid, FileNotFound
 from app.models.response import ApiResponse
-from app.utils.email_helper import generate_test_email, send_email
+from app.services.email_services import enqueue_email
+from app.utils.email_helper import generate_test_email
 from app.core.config import settings
+from app.core.file_response import content_disposition, file_response
+from app.core.security import verify_download_signature
+from app.core.metrics import metrics
 from app.utils.file_helper import FileHelper
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=ApiRoute)
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +27,12 @@ logger = logging.getLogger(__name__)
     status_code=201,
     response_model=ApiResponse[None],
 )
-def test_email(email_to: EmailStr) -> ApiResponse:
+async def test_email(email_to: EmailStr) -> ApiResponse:
     """
     Test emails.
     """
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    await enqueue_email(
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -45,16 +50,59 @@ async def health_check() -> ApiResponse:
         message="服务正常"
     )
 
+@router.get(
+    "/metrics/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=ApiResponse[dict[str, Any]],
+)
+async def read_metrics() -> ApiResponse[dict[str, Any]]:
+    """
+    In-process metrics of this worker.
+    """
+    return ApiResponse.success_response(data=metrics.snapshot())
+
+
 @router.get("/download/")
 async def download(
-        file_name: Optional[str] = Query(None, max_length=255)
+        request: Request,
+        file_name: str = Query(..., max_length=255),
+        expires: int = Query(...),
+        signature: str = Query(..., max_length=128),
+        name: Optional[str] = Query(None, max_length=255),
 ):
+    """
+    Download a file through a signed, expiring URL.
+
+    Depending on DOWNLOAD_SERVE_MODE the file is sent by the app (with Range and
+    conditional request support) or handed to the reverse proxy.
+    """
+    if not verify_download_signature(file_name, expires, signature, name):
+        raise DownloadLinkInvalid
     file_helper = FileHelper(settings.DOWNLOAD_DIR)
     file_url = file_helper.gen_full_path(file_name)
     if file_url == "":
         raise FileNotFound
-    return FileResponse(
-        path=file_url,
-        filename=file_name,
-        media_type="application/octet-stream",
-    )
+
+    filename = name or file_name
+    if settings.DOWNLOAD_SERVE_MODE == "x-accel-redirect":
+        metrics.incr("download.offloaded")
+        return Response(headers={
+            "x-accel-redirect": file_helper.gen_accel_path(file_name),
+            "content-disposition": content_disposition(filename),
+        })
+    if settings.DOWNLOAD_SERVE_MODE == "x-sendfile":
+        metrics.incr("download.offloaded")
+        return Response(headers={
+            "x-sendfile": os.path.abspath(file_url),
+            "content-disposition": content_disposition(filename),
+        })
+
+    try:
+        return file_response(
+            request,
+            file_url,
+            filename=filename,
+            content_hash=file_name if file_helper.is_content_hash(file_name) else None,
+        )
+    except FileNotFoundError:
+        raise FileNotFound
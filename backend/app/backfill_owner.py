@@ -0,0 +1,91 @@
+"""
+一次性数据迁移：为旧的 items / papers 文档补全 owner_id 和 owner_snapshot，
+为论文签名补全 owner_id
+
+    python app/backfill_owner.py
+
+只处理缺少 owner_id / owner_snapshot 的文档，可以重复执行。完成后删除每个用户的计数器，
+由下一次列表请求重新精确计数。
+"""
+import asyncio
+import logging
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import client, init_mongo
+from app.models import Counter, Item, Paper, PaperSignature
+from app.services.owner_sync import owner_snapshot_sync
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+async def backfill_collection(model: type[Item] | type[Paper]) -> int:
+    collection = model.get_motor_collection()
+    cursor = collection.find({"owner_id": None}, projection={"owner": 1})
+    updated = 0
+    batch: list[UpdateOne] = []
+    async for document in cursor:
+        owner = document.get("owner")
+        owner_id = getattr(owner, "id", None)
+        if owner_id is None:
+            continue
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": {"owner_id": owner_id}}))
+        if len(batch) >= BATCH_SIZE:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+
+    name = model.Settings.name
+    await Counter.get_motor_collection().delete_many({"_id": {"$regex": f"^{name}:owner:"}})
+    logger.info(f"Backfilled owner_id on {updated} {name}")
+    return updated
+
+
+async def backfill_snapshots() -> int:
+    owner_ids: set[PydanticObjectId] = set()
+    for model in owner_snapshot_sync.models:
+        collection = model.get_motor_collection()
+        distinct = await collection.distinct("owner_id", {"owner_snapshot": None})
+        owner_ids.update(PydanticObjectId(owner_id) for owner_id in distinct if owner_id is not None)
+    updated = 0
+    for owner_id in owner_ids:
+        updated += await owner_snapshot_sync.sync_user(owner_id)
+    logger.info(f"Backfilled owner_snapshot for {len(owner_ids)} owners ({updated} documents)")
+    return updated
+
+
+async def backfill_signatures() -> int:
+    """签名按 owner_id 查找近似重复，缺少 owner_id 的签名从论文补全"""
+    cursor = Paper.get_motor_collection().find({"owner_id": {"$ne": None}}, projection={"owner_id": 1})
+    collection = PaperSignature.get_motor_collection()
+    updated = 0
+    batch: list[UpdateOne] = []
+    async for document in cursor:
+        batch.append(UpdateOne(
+            {"_id": document["_id"], "owner_id": None}, {"$set": {"owner_id": document["owner_id"]}}
+        ))
+        if len(batch) >= BATCH_SIZE:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    logger.info(f"Backfilled owner_id on {updated} paper signatures")
+    return updated
+
+
+async def main() -> None:
+    await init_mongo(client, settings.MONGO_DB)
+    await backfill_collection(Item)
+    await backfill_collection(Paper)
+    await backfill_snapshots()
+    await backfill_signatures()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from beanie import PydanticObjectId
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import User, UserRevocation
+
+logger = logging.getLogger(__name__)
+
+# 各进程之间时钟的最大偏差：读取失效记录时多读这段时间（按记录 id 去重）
+_CLOCK_SKEW = timedelta(seconds=5)
+
+
+class AuthCache:
+    """
+    已验证访问令牌的缓存
+
+    以令牌的 SHA-256 为键，缓存解码后的用户 id 与用户快照，命中时跳过 jwt.decode
+    和一次 MongoDB 主键查询。快照不含密码哈希，返回的用户只用于鉴权和读取，
+    修改用户或校验密码前必须用 User.get 重新读取。
+
+    缓存是进程内的，跨进程失效依靠 user_revocations 集合：evict_user 写入失效记录，
+    每个进程在查缓存前若距上次同步已超过 AUTH_CACHE_SYNC_SECONDS，先读取新的失效记录
+    并淘汰对应用户，因此停用/删除用户和修改密码最多 AUTH_CACHE_SYNC_SECONDS 后在所有 worker
+    中生效。读取失效记录失败时清空缓存，回退到查询数据库。
+    """
+
+    def __init__(self, maxsize: int, ttl: float, sync_interval: float) -> None:
+        self._tokens: TTLCache[str, tuple[PydanticObjectId, dict[str, Any]]] = TTLCache(
+            maxsize=maxsize, ttl=ttl
+        )
+        # user_id -> 该用户已缓存的令牌键，用于按用户失效
+        self._user_tokens: dict[PydanticObjectId, set[str]] = {}
+        self.sync_interval = sync_interval
+        # 最近的失效记录 user_id -> revoked_at，失效之前读取的用户快照不再写入缓存
+        self._revoked: dict[PydanticObjectId, datetime] = {}
+        # 已处理的失效记录 id -> revoked_at（多读的时钟偏差窗口内的记录只处理一次）
+        self._applied: dict[PydanticObjectId, datetime] = {}
+        self._synced_at = datetime.utcnow()
+        self._next_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._tokens.maxsize > 0 and self._tokens.ttl > 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    async def get(self, token: str) -> User | None:
+        """返回缓存中的用户（每次返回新的对象，hashed_password 为空）"""
+        if not self.enabled:
+            return None
+        await self.sync()
+        entry = self._tokens.get(self._key(token))
+        if entry is None:
+            metrics.incr("auth_cache.misses")
+            return None
+        metrics.incr("auth_cache.hits")
+        return User.model_validate({**entry[1], "hashed_password": ""})
+
+    def set(
+        self, token: str, user: User, expires_at: datetime | None = None, loaded_at: datetime | None = None
+    ) -> None:
+        """
+        缓存令牌对应的用户，过期时间不会超过令牌本身的 exp
+
+        loaded_at 为读取用户之前的时间：读取期间该用户被其他请求失效时不缓存。
+        """
+        revoked_at = self._revoked.get(user.id)
+        if revoked_at is not None and (loaded_at is None or revoked_at >= loaded_at - _CLOCK_SKEW):
+            return
+        ttl = None
+        if expires_at is not None:
+            ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        key = self._key(token)
+        snapshot = user.model_dump(by_alias=True, exclude={"hashed_password"})
+        self._tokens.set(key, (user.id, snapshot), ttl=ttl)
+        self._user_tokens.setdefault(user.id, set()).add(key)
+        if len(self._user_tokens) > 2 * max(self._tokens.maxsize, 1):
+            self._compact()
+
+    def _compact(self) -> None:
+        """清理反向索引中已被 LRU/TTL 淘汰的令牌键"""
+        for user_id in list(self._user_tokens):
+            keys = {key for key in self._user_tokens[user_id] if key in self._tokens}
+            if keys:
+                self._user_tokens[user_id] = keys
+            else:
+                del self._user_tokens[user_id]
+
+    def _evict_local(self, user_id: PydanticObjectId, revoked_at: datetime) -> None:
+        if user_id not in self._revoked or revoked_at > self._revoked[user_id]:
+            self._revoked[user_id] = revoked_at
+        for key in self._user_tokens.pop(user_id, set()):
+            self._tokens.pop(key)
+
+    async def evict_user(self, user_id: PydanticObjectId) -> None:
+        """使某个用户在所有进程中的缓存令牌失效"""
+        now = datetime.utcnow()
+        # 保留到所有进程中该用户的缓存条目都已过期
+        revocation = UserRevocation(
+            user_id=user_id,
+            revoked_at=now,
+            expire_at=now + timedelta(seconds=self._tokens.ttl) + 2 * _CLOCK_SKEW,
+        )
+        await revocation.insert()
+        self._applied[revocation.id] = now
+        self._evict_local(user_id, now)
+        metrics.incr("auth_cache.evictions")
+
+    async def sync(self) -> None:
+        """距上次同步超过 sync_interval 时，读取其他进程写入的失效记录"""
+        if time.monotonic() < self._next_sync:
+            return
+        async with self._sync_lock:
+            if time.monotonic() < self._next_sync:
+                return
+            started = datetime.utcnow()
+            try:
+                revocations = await UserRevocation.get_motor_collection().find(
+                    {"revoked_at": {"$gte": self._synced_at - _CLOCK_SKEW}},
+                    projection={"user_id": 1, "revoked_at": 1},
+                ).to_list(None)
+            except Exception as e:
+                # 无法确认哪些用户已失效，不再使用已缓存的用户
+                logger.warning(f"Auth cache sync failed, cache cleared: {e}")
+                self.clear()
+                return
+            for revocation in revocations:
+                if revocation["_id"] not in self._applied:
+                    self._applied[revocation["_id"]] = revocation["revoked_at"]
+                    self._evict_local(revocation["user_id"], revocation["revoked_at"])
+            self._applied = {
+                revocation_id: revoked_at
+                for revocation_id, revoked_at in self._applied.items()
+                if revoked_at >= started - 2 * _CLOCK_SKEW
+            }
+            horizon = started - timedelta(seconds=self._tokens.ttl) - _CLOCK_SKEW
+            self._revoked = {
+                user_id: revoked_at for user_id, revoked_at in self._revoked.items() if revoked_at >= horizon
+            }
+            self._synced_at = started
+            self._next_sync = time.monotonic() + self.sync_interval
+            metrics.incr("auth_cache.syncs")
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._user_tokens.clear()
+
+
+auth_cache = AuthCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+    sync_interval=settings.AUTH_CACHE_SYNC_SECONDS,
+)
@@ -87,6 +87,18 @@ class Settings(BaseSettings):
         return self
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    # 邮件发件箱：后台每批发送的封数、SMTP 连接池大小（也是并行发送的连接数）、
+    # 空闲连接保留时间（超过后重建，通常短于服务器的空闲断开时间）、重试、认领租约和轮询间隔
+    EMAIL_BATCH_SIZE: int = 50
+    EMAIL_SMTP_POOL_SIZE: int = 2
+    EMAIL_SMTP_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_SMTP_IDLE_SECONDS: float = 60.0
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 30.0
+    EMAIL_LEASE_SECONDS: int = 5 * 60
+    EMAIL_POLL_INTERVAL_SECONDS: float = 5.0
+    # 发送结束（成功或最终失败）的邮件在发件箱中保留的时间
+    EMAIL_OUTBOX_RETENTION_SECONDS: int = 7 * 24 * 60 * 60
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -120,6 +132,58 @@ class Settings(BaseSettings):
 
     DOWNLOAD_DIR: str = "./downloads"
     UPLOAD_DIR: str = "./uploads"
+    # 单个上传文件的大小上限，0 表示不限制
+    UPLOAD_MAX_SIZE_BYTES: int = 256 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024
+    # 可续传上传：会话有效期和单次 PUT 的分块大小上限
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60
+    UPLOAD_SESSION_CHUNK_MAX_BYTES: int = 32 * 1024 * 1024
+
+    # 下载地址使用 SECRET_KEY 做 HMAC 签名，超过有效期后失效
+    DOWNLOAD_URL_TTL_SECONDS: int = 60 * 60
+    # 下载的传输方式：app 由 Python 发送文件；x-accel-redirect / x-sendfile 只校验签名，由反向代理发送文件
+    DOWNLOAD_SERVE_MODE: Literal["app", "x-accel-redirect", "x-sendfile"] = "app"
+    # x-accel-redirect 模式下 nginx 中映射到 DOWNLOAD_DIR 的 internal location
+    DOWNLOAD_ACCEL_PREFIX: str = "/protected-downloads/"
+
+    # 论文处理产物（抽取的文本、索引等）的保存目录
+    PAPER_DATA_DIR: str = "./data"
+    # 后台任务：每个进程的并发数（同时也是论文处理进程池的大小）、重试和租约
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    JOB_LEASE_SECONDS: int = 10 * 60
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    PAPER_PROCESS_TIMEOUT_SECONDS: float = 5 * 60
+    # GET /papers/{id}/pages 一次最多返回的页数
+    PAPER_PAGES_MAX_RANGE: int = 50
+    # Markdown / DOCX 预览缓存的总大小上限，超过时淘汰最久未访问的预览
+    PAPER_PREVIEW_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # 相关论文：每篇保存的近邻数和全量重建的间隔
+    RELATED_PAPERS_K: int = 20
+    RELATED_REBUILD_INTERVAL_SECONDS: int = 24 * 60 * 60
+    # 近似重复：MinHash 估计的相似度不低于该值时标记；不低于复用阈值时，
+    # PDF 论文改用原论文（非 PDF）抽取的文本
+    PAPER_NEAR_DUPLICATE_THRESHOLD: float = 0.8
+    PAPER_TEXT_REUSE_THRESHOLD: float = 0.9
+    # 关键词和摘要批量计算：每批论文数，处理完成后等待多久再计算（收集同时上传的论文）
+    PAPER_SUMMARY_BATCH_SIZE: int = 32
+    PAPER_SUMMARY_DELAY_SECONDS: float = 10
+
+    # 列表 estimated 总数使用的增量计数器：超过该时间未校正时重新精确计数
+    COUNTER_RECOUNT_SECONDS: int = 10 * 60
+
+    # 密码哈希执行器（bcrypt 为 CPU 密集型操作，不能在事件循环中执行）
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_MAX_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 5.0
+
+    # 访问令牌 -> 用户 的进程内缓存，TTL 为 0 时关闭；
+    # 各进程至少每隔 AUTH_CACHE_SYNC_SECONDS 读取一次其他进程写入的用户失效记录
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    AUTH_CACHE_SYNC_SECONDS: float = 1.0
 
 
 settings = Settings()  # type: ignore
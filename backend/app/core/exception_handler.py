@@ -1,15 +1,15 @@
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from app.core.responses import ApiJSONResponse
 from app.exceptions.base import BizException
 from app.models.response import ApiResponse
 
 
 # @app.exception_handler(BizException)
 async def biz_exception_handler(request: Request, exc: BizException):
-    return JSONResponse(
+    return ApiJSONResponse(
         status_code=200,  # 不抛 HTTP 错
         content=ApiResponse.error_response(
             message=exc.message,
             code=exc.code
-        ).model_dump(),
+        ),
     )
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Literal, TypeVar
+
+from app.core.metrics import metrics
+from app.exceptions.base import ServiceBusy, ServiceTimeout
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """
+    有界的 CPU 任务执行器
+
+    将同步的 CPU 密集型函数放到独立的线程池或进程池中执行，避免阻塞事件循环。
+    正在执行和排队的任务总数超过 max_workers + max_queue 时直接拒绝（ServiceBusy），
+    单个任务等待超过 timeout 秒时抛出 ServiceTimeout。
+
+    线程无法中止，线程池中超时的任务会继续占用 worker 直到结束；进程池超时时终止所有
+    工作进程并在下次提交时重建，同一进程池中其他未完成的任务以 ServiceBusy 失败。
+
+    指标（前缀为 executor.<name>）:
+        in_flight / saturation / max_in_flight 仪表盘，
+        submitted / completed / rejected / timeouts / recycled 计数器
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: Literal["thread", "process"] = "thread",
+        max_workers: int = 4,
+        max_queue: int = 32,
+        timeout: float | None = None,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _metric(self, suffix: str) -> str:
+        return f"executor.{self.name}.{suffix}"
+
+    def start(self) -> None:
+        """创建底层线程池/进程池（重复调用无副作用）"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self.kind == "process":
+                # spawn 而不是 fork：fork 会复制事件循环和数据库客户端的线程状态
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker",
+                )
+        logger.info(
+            f"Started {self.kind} executor '{self.name}' "
+            f"(workers={self.max_workers}, queue={self.max_queue})"
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭底层线程池/进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _recycle(self, executor: Executor) -> None:
+        """终止进程池的工作进程，未完成的任务以 BrokenProcessPool 结束并释放计数"""
+        with self._lock:
+            if self._executor is not executor:
+                # 已被其他超时的任务回收
+                return
+            self._executor = None
+        assert isinstance(executor, ProcessPoolExecutor)
+        # Python 3.14 之前没有公开的终止接口
+        for process in list(executor._processes.values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+        metrics.incr(self._metric("recycled"))
+        logger.warning(f"Recycled process executor '{self.name}' after a timeout")
+
+    def _publish(self) -> None:
+        metrics.set_gauge(self._metric("in_flight"), self._in_flight)
+        metrics.set_gauge(self._metric("saturation"), self._in_flight / self.capacity)
+        metrics.max_gauge(self._metric("max_in_flight"), self._in_flight)
+
+    def _release(self, _future: Any) -> None:
+        # 在工作线程中回调，计数以底层任务真正结束为准（超时后任务仍占用 worker）
+        with self._lock:
+            self._in_flight -= 1
+            self._publish()
+        metrics.incr(self._metric("completed"))
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """在执行器中运行 func(*args) 并等待结果"""
+        if self._executor is None:
+            self.start()
+
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                metrics.incr(self._metric("rejected"))
+                logger.warning(
+                    f"Executor '{self.name}' saturated "
+                    f"({self._in_flight}/{self.capacity}), rejecting task"
+                )
+                raise ServiceBusy
+            self._in_flight += 1
+            self._publish()
+            executor = self._executor
+            assert executor is not None
+            future = executor.submit(func, *args)
+        metrics.incr(self._metric("submitted"))
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.incr(self._metric("timeouts"))
+            logger.warning(f"Task in executor '{self.name}' timed out after {self.timeout}s")
+            if self.kind == "process":
+                self._recycle(executor)
+            raise ServiceTimeout
+        except BrokenProcessPool:
+            # 进程池因其他任务超时被回收（或工作进程崩溃），稍后重试即可
+            logger.warning(f"Task in executor '{self.name}' lost its worker process")
+            raise ServiceBusy
@@ -0,0 +1,239 @@
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import quote
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.metrics import metrics
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)", re.IGNORECASE)
+
+
+def content_disposition(filename: str) -> str:
+    """附件下载的 Content-Disposition，非 ASCII 文件名按 RFC 5987 编码"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def make_etag(stat_result: os.stat_result, content_hash: Optional[str] = None) -> str:
+    """生成强 ETag：内容寻址文件直接使用内容哈希，否则由 mtime 和大小生成"""
+    if content_hash:
+        return f'"{content_hash}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    解析单个字节范围，返回闭区间 (start, end)
+
+    返回 None 表示忽略 Range（语法错误或多个范围，按完整内容响应）；
+    范围无法满足时抛出 ValueError。
+    """
+    match = _RANGE_RE.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        # "bytes=-" 不是合法的范围
+        return None
+    if not first:
+        # 后缀范围：最后 N 个字节
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    """比较 If-None-Match / If-Range 中的 ETag 列表"""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP 日期精度为秒
+    return int(mtime) <= since
+
+
+class RangeFileResponse(Response):
+    """
+    支持条件请求和单个字节范围的文件响应
+
+    服务器支持 ASGI zerocopysend 扩展时把文件描述符交给服务器 sendfile，
+    否则在线程池中用 pread 分块读取，不移动共享的文件位置。
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        *,
+        status_code: int = 200,
+        byte_range: Optional[tuple[int, int]] = None,
+        headers: Optional[dict[str, str]] = None,
+        media_type: str = "application/octet-stream",
+    ) -> None:
+        self.path = path
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        size = stat_result.st_size
+        self.offset, end = byte_range if byte_range else (0, size - 1)
+        self.count = max(end - self.offset + 1, 0)
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.count)
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.offset}-{end}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"].upper() == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.fileno(),
+                        "offset": self.offset,
+                        "count": self.count,
+                        "more_body": False,
+                    }
+                )
+            else:
+                await self._send_chunks(file.fileno(), send)
+        metrics.incr("download.bytes", self.count)
+
+    async def _send_chunks(self, fd: int, send: Send) -> None:
+        offset = self.offset
+        remaining = self.count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(
+                os.pread, fd, min(self.chunk_size, remaining), offset
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            remaining -= len(chunk)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                }
+            )
+        if remaining > 0:
+            # 文件在发送过程中被截断
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(
+    request: Request,
+    path: str,
+    *,
+    filename: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    media_type: str = "application/octet-stream",
+) -> Response:
+    """
+    按请求头生成文件响应
+
+    依次处理 If-None-Match / If-Modified-Since（304）、If-Range 和 Range（206 / 416），
+    其余情况返回完整内容。
+
+    异常:
+        FileNotFoundError: 文件不存在或不是普通文件
+    """
+    stat_result = os.stat(path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+
+    size = stat_result.st_size
+    etag = make_etag(stat_result, content_hash)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "etag": etag,
+        "last-modified": last_modified,
+        "accept-ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if request.method in ("GET", "HEAD") and (
+        _etag_matches(if_none_match, etag, weak=True)
+        if if_none_match is not None
+        else if_modified_since is not None
+        and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    ):
+        metrics.incr("download.not_modified")
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        headers["content-disposition"] = content_disposition(filename)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and request.method == "GET" and (
+        if_range is None or _range_still_valid(if_range, etag, last_modified)
+    ):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            metrics.incr("download.range_not_satisfiable")
+            return Response(
+                status_code=416,
+                headers={**headers, "content-range": f"bytes */{size}"},
+            )
+        if byte_range is not None:
+            metrics.incr("download.partial")
+            return RangeFileResponse(
+                path, stat_result, status_code=206, byte_range=byte_range,
+                headers=headers, media_type=media_type,
+            )
+
+    return RangeFileResponse(path, stat_result, headers=headers, media_type=media_type)
+
+
+def _range_still_valid(if_range: str, etag: str, last_modified: str) -> bool:
+    """If-Range 只接受强比较：ETag 完全一致，或日期与 Last-Modified 相同"""
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return _etag_matches(if_range, etag, weak=False)
+    return if_range == last_modified
@@ -0,0 +1,55 @@
+import asyncio
+import functools
+from typing import Any, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from app.models.response import ApiResponse
+
+
+class ApiJSONResponse(JSONResponse):
+    """
+    直接用 pydantic-core 把模型序列化为 JSON 字节
+
+    跳过 jsonable_encoder 和标准库 json.dumps，模型在构造时已经校验过一次。
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, by_alias=True)
+        return super().render(content)
+
+
+class ApiRoute(APIRoute):
+    """
+    返回 ApiResponse 的路由直接输出 ApiJSONResponse
+
+    FastAPI 默认会把返回值 dump 成 dict、按 response_model 再校验一遍后用 json.dumps 输出。
+    这里包装 endpoint，把 ApiResponse 直接交给 ApiJSONResponse，response_model 只用于生成 OpenAPI 文档。
+    因此路由的 data 必须已经是公共模型（如 UserPublic），不能是包含敏感字段的 Document。
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if not getattr(endpoint, "_api_response_wrapped", False):
+            endpoint = self._wrap_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _wrap_endpoint(endpoint: Callable[..., Any], status_code: int | None) -> Callable[..., Any]:
+        is_coroutine = asyncio.iscoroutinefunction(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if is_coroutine:
+                result = await endpoint(*args, **kwargs)
+            else:
+                result = await run_in_threadpool(endpoint, *args, **kwargs)
+            if isinstance(result, ApiResponse):
+                return ApiJSONResponse(content=result, status_code=status_code or 200)
+            return result
+
+        wrapper._api_response_wrapped = True  # type: ignore[attr-defined]
+        return wrapper
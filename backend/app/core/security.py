@@ -1,13 +1,26 @@
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Optional
 
 import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.executor import BoundedExecutor
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt 哈希/校验专用执行器，所有请求路径都应使用下面的异步版本
+password_hasher = BoundedExecutor(
+    name="password_hash",
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
+
 
 ALGORITHM = "HS256"
 
@@ -25,3 +38,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在密码哈希执行器中校验密码"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在密码哈希执行器中计算密码哈希"""
+    return await password_hasher.run(get_password_hash, password)
+
+
+def sign_download(file_name: str, expires: int, name: Optional[str] = None) -> str:
+    """对下载的文件名、过期时间戳和下载时使用的文件名做 HMAC-SHA256 签名"""
+    message = f"{file_name}:{expires}:{name or ''}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_download_signature(file_name: str, expires: int, signature: str, name: Optional[str] = None) -> bool:
+    """校验下载签名且未过期"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign_download(file_name, expires, name), signature)
@@ -1,25 +1,40 @@
-from app.core.security import get_password_hash, verify_password
+from app.core.auth_cache import auth_cache
+from app.core.security import get_password_hash_async, verify_password_async
 from app.exceptions.user_exceptions import IncorrectPassword, UserNotFound
 from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models.counter import Counter, owner_counter_key
+from app.models.user import OWNER_SNAPSHOT_FIELDS
+from app.services.owner_sync import owner_snapshot_sync
 from beanie import PydanticObjectId
+from bson import DBRef
 
 async def create_user(*, user_create: UserCreate) -> User:
     user_data = user_create.model_dump()
-    user_data["hashed_password"] = get_password_hash(user_create.password)
+    user_data["hashed_password"] = await get_password_hash_async(user_create.password)
     db_obj = User.model_validate(user_data)
     await db_obj.insert()
     return db_obj
 
 async def update_user(*, db_user: User, user_in: UserUpdate) -> User:
+    """
+    更新用户，只写入变更的字段
+
+    db_user 必须是刚从数据库读取的用户（不能是鉴权缓存中的 CurrentUser）。
+    """
     update_data = user_in.model_dump(exclude_unset=True)
     
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-    
-    for field, value in update_data.items():
-        setattr(db_user, field, value)
+        update_data["hashed_password"] = await get_password_hash_async(update_data.pop("password"))
     
-    await db_user.save()
+    snapshot_changed = any(
+        field in update_data and update_data[field] != getattr(db_user, field)
+        for field in OWNER_SNAPSHOT_FIELDS
+    )
+    if update_data:
+        await db_user.set(update_data)
+    await auth_cache.evict_user(db_user.id)
+    if snapshot_changed:
+        await owner_snapshot_sync.schedule(db_user.id)
     return db_user
 
 async def get_user_by_email(*, email: str) -> User | None:
@@ -29,13 +44,15 @@ async def authenticate(*, email: str, password: str) -> User | None:
     db_user = await get_user_by_email(email=email)
     if not db_user:
         raise UserNotFound
-    if not verify_password(password, db_user.hashed_password):
+    if not await verify_password_async(password, db_user.hashed_password):
         raise IncorrectPassword
     return db_user
 
 async def create_item(*, item_in: ItemCreate, owner_id: PydanticObjectId) -> Item:
     item_data = item_in.model_dump()
+    item_data["owner"] = DBRef(User.Settings.name, owner_id)
     item_data["owner_id"] = owner_id
     db_item = Item.model_validate(item_data)
     await db_item.insert()
+    await Counter.incr(owner_counter_key("items", owner_id))
     return db_item
@@ -9,4 +9,19 @@ class BizException(Exception):
 class ParamException(BizException):
     """参数错误"""
     def __init__(self, message: str = "param error"):
-        super().__init__(code=10001,message=message)
\ No newline at end of file
+        super().__init__(code=10001,message=message)
+
+class ServiceBusy(BizException):
+    """服务繁忙"""
+    def __init__(self, message: str = "Service is busy, please retry later"):
+        super().__init__(code=10002, message=message)
+
+class ServiceTimeout(BizException):
+    """服务处理超时"""
+    def __init__(self, message: str = "Service timed out, please retry later"):
+        super().__init__(code=10003, message=message)
+
+class EmailNotConfigured(BizException):
+    """没有配置邮件服务"""
+    def __init__(self, message: str = "Email is not configured"):
+        super().__init__(code=10004, message=message)
@@ -9,4 +9,14 @@ class FileNotFound(BizException):
 class FileTypeError(BizException):
     """文件类型错误"""
     def __init__(self, message: str = "File type error"):
-        super().__init__(code=10402,message=message)
\ No newline at end of file
+        super().__init__(code=10402,message=message)
+
+class FileTooLarge(BizException):
+    """文件过大"""
+    def __init__(self, message: str = "File too large"):
+        super().__init__(code=10403, message=message)
+
+class DownloadLinkInvalid(BizException):
+    """下载链接签名错误或已过期"""
+    def __init__(self, message: str = "Download link is invalid or expired"):
+        super().__init__(code=10404, message=message)
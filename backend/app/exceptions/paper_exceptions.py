@@ -0,0 +1,37 @@
+from app.exceptions.base import BizException
+
+
+class PaperNotFound(BizException):
+    """论文未找到异常"""
+    def __init__(self, message: str = "Paper not found"):
+        super().__init__(code=10501, message=message)
+
+class UploadSessionNotFound(BizException):
+    """上传会话不存在或已过期"""
+    def __init__(self, message: str = "Upload session not found"):
+        super().__init__(code=10502, message=message)
+
+class UploadOffsetMismatch(BizException):
+    """分块偏移量与已接收的字节数不一致，或会话正在被其他请求写入"""
+    def __init__(self, message: str = "Upload offset mismatch"):
+        super().__init__(code=10503, message=message)
+
+class UploadIncomplete(BizException):
+    """上传尚未完成，不能提交"""
+    def __init__(self, message: str = "Upload is incomplete"):
+        super().__init__(code=10504, message=message)
+
+class PaperTextNotReady(BizException):
+    """论文文本尚未抽取（未处理或处理失败）"""
+    def __init__(self, message: str = "Paper text is not available yet"):
+        super().__init__(code=10505, message=message)
+
+class PreviewNotReady(BizException):
+    """预览正在后台生成，稍后重试"""
+    def __init__(self, message: str = "Preview is being generated, retry later"):
+        super().__init__(code=10506, message=message)
+
+class PreviewUnsupported(BizException):
+    """论文格式不支持预览（只支持 Markdown / 纯文本和 DOCX）"""
+    def __init__(self, message: str = "Preview is not available for this paper"):
+        super().__init__(code=10507, message=message)
@@ -1,5 +1,6 @@
 import sentry_sdk
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -7,6 +8,15 @@ from contextlib import asynccontextmanager
 from app.api.main import api_router
 from app.core.config import settings
 from app.core.db import init_mongo, client
+from app.core.security import password_hasher
+from app.services.upload_services import UploadSessionService
+from app.services.email_services import email_sender
+from app.services.jobs import job_worker
+from app.services.paper_processing import ensure_search_index_current
+from app.services.process_pool import paper_process_pool
+from app.services.related_services import ensure_related_rebuild_scheduled
+from app.services.summary_services import ensure_summaries_current
+from app.utils.email_helper import preload_email_templates
 from app.exceptions.base import BizException
 from app.core.exception_handler import biz_exception_handler
 
@@ -20,8 +30,21 @@ if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    password_hasher.start()
     await init_mongo(client, settings.MONGO_DB)
+    await run_in_threadpool(UploadSessionService().purge_stale_parts)
+    paper_process_pool.start()
+    job_worker.start()
+    await run_in_threadpool(preload_email_templates)
+    email_sender.start()
+    await ensure_search_index_current()
+    await ensure_related_rebuild_scheduled()
+    await ensure_summaries_current()
     yield
+    await email_sender.stop()
+    await job_worker.stop()
+    paper_process_pool.shutdown()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -9,6 +9,7 @@ from app.models.user import (
     User,
     UserPublic,
     UsersPublic,
+    OwnerSnapshot,
 )
 
 from app.models.item import (
@@ -16,6 +17,7 @@ from app.models.item import (
     ItemCreate,
     ItemUpdate,
     Item,
+    ItemListView,
     ItemPublic,
     ItemsPublic,
 )
@@ -25,10 +27,20 @@ from app.models.papers import (
     PaperCreate,
     PaperUpdate,
     Paper,
+    PaperListView,
     PaperPublic,
     PaperPublic,
 )
 
+from app.models.auth_revocation import UserRevocation
+from app.models.counter import Counter
+from app.models.stored_file import StoredFile
+from app.models.job import Job, JobPublic
+from app.models.related import RelatedPapers, RelatedPaper
+from app.models.paper_signature import PaperSignature
+from app.models.email_outbox import OutboxEmail
+from app.models.upload_session import UploadSession, UploadSessionCreate, UploadSessionPublic
+
 # 导入依赖于两者的模型
 from app.models.user import UserWithItems
 
@@ -50,3 +62,19 @@ Item.model_rebuild()
 Paper.model_rebuild()
 
 models = [cls for cls in Document.__subclasses__()]
+
+__all__ = [
+    "TimestampMixin",
+    "UserBase", "UserCreate", "UserUpdate", "User", "UserPublic", "UsersPublic", "OwnerSnapshot", "UserWithItems",
+    "ItemBase", "ItemCreate", "ItemUpdate", "Item", "ItemListView", "ItemPublic", "ItemsPublic",
+    "PaperBase", "PaperCreate", "PaperUpdate", "Paper", "PaperListView", "PaperPublic",
+    "UserRevocation", "Counter", "StoredFile",
+    "UploadSession", "UploadSessionCreate", "UploadSessionPublic",
+    "Job", "JobPublic",
+    "RelatedPapers", "RelatedPaper",
+    "PaperSignature",
+    "OutboxEmail",
+    "Token", "TokenData", "PasswordResetRequest", "PasswordResetConfirm",
+    "PaginatedResults", "MessageResponse",
+    "models",
+]
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class UserRevocation(Document):
+    """
+    用户缓存失效记录
+
+    修改/删除用户时写入，各 worker 的 AuthCache 定期读取 revoked_at 之后的记录并淘汰本进程中
+    该用户的缓存。只需保留到各进程中的缓存条目都过期，之后在 expire_at 由 TTL 索引删除。
+    """
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    user_id: PydanticObjectId
+    revoked_at: datetime = Field(default_factory=datetime.utcnow)
+    expire_at: datetime
+
+    class Settings:
+        name = "user_revocations"
+        indexes = [
+            IndexModel([("revoked_at", ASCENDING)]),
+            IndexModel([("expire_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -0,0 +1,71 @@
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo.errors import DuplicateKeyError
+
+
+class Counter(Document):
+    """
+    增量维护的计数器（如每个用户的项目数）
+
+    _id 即计数器的键。计数器不存在时 incr 不会创建它，由第一次读取时用精确计数初始化；
+    计数与增减之间没有事务，读取时超过 max_age 未校正的计数器会重新精确计数，
+    并发写入造成的偏差最多保留到下一次校正。version 在每次增减时递增，用于校正时检测并发的增减。
+    """
+    id: str = Field(alias="_id")  # type: ignore[assignment]
+    value: int = 0
+    version: int = 0
+    checked_at: Optional[datetime] = None
+
+    class Settings:
+        name = "counters"
+
+    @classmethod
+    async def incr(cls, key: str, amount: int = 1) -> None:
+        """对已存在的计数器做原子加减"""
+        await cls.get_motor_collection().update_one(
+            {"_id": key}, {"$inc": {"value": amount, "version": 1}}
+        )
+
+    @classmethod
+    async def read(cls, key: str, recount: Callable[[], Awaitable[int]], max_age: float) -> int:
+        """
+        读取计数器，不存在或超过 max_age 秒未校正时返回 recount 的精确计数并写回
+
+        只在计数期间没有并发增减（version 未变）时写回，不会覆盖其他请求的增减；
+        否则保持原值，由之后的读取再次校正。
+        """
+        collection = cls.get_motor_collection()
+        document = await collection.find_one({"_id": key})
+        now = datetime.utcnow()
+        if document is not None:
+            checked_at = document.get("checked_at")
+            if checked_at is not None and checked_at >= now - timedelta(seconds=max_age):
+                return int(document["value"])
+
+        value = await recount()
+        if document is None:
+            try:
+                await collection.insert_one({"_id": key, "value": value, "version": 0, "checked_at": now})
+            except DuplicateKeyError:
+                # 其他请求同时初始化了计数器
+                pass
+        else:
+            await collection.update_one(
+                {"_id": key, "version": document.get("version", 0)},
+                {"$set": {"value": value, "checked_at": now}},
+            )
+        return value
+
+    @classmethod
+    async def reset(cls, key: str) -> None:
+        """删除计数器，下一次读取时重新精确计数"""
+        await cls.get_motor_collection().delete_one({"_id": key})
+
+
+def owner_counter_key(collection: str, owner_id: object) -> str:
+    """每个用户的文档数计数器键"""
+    return f"{collection}:owner:{owner_id}"
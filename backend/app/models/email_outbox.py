@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+OutboxStatus = Literal["queued", "sending", "sent", "failed"]
+
+
+class OutboxEmail(Document):
+    """
+    发件箱中的邮件
+
+    请求处理中只写入发件箱，由后台发送任务认领到期的邮件（sending，lease 为认领批次，locked_until 为租约）
+    批量发送；失败后按退避时间重新排队，超过 max_attempts 次或被服务器永久拒绝时标记为 failed。
+    dedup_key 唯一，相同键的邮件只发送一次。发送结束后清空正文（可能含密码等）；
+    写入时和发送结束时设置 expire_at，到期后由 TTL 索引删除。
+    """
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    email_to: str
+    subject: str
+    html_content: str
+    dedup_key: Optional[str] = None
+    status: OutboxStatus = "queued"
+    attempts: int = 0
+    max_attempts: int = 5
+    error: Optional[str] = None
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    lease: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+    expire_at: Optional[datetime] = None
+
+    class Settings:
+        name = "email_outbox"
+        indexes = [
+            # 发送任务认领到期的邮件
+            IndexModel([("status", ASCENDING), ("run_after", ASCENDING)]),
+            IndexModel("lease", sparse=True),
+            IndexModel(
+                [("dedup_key", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"dedup_key": {"$type": "string"}},
+            ),
+            IndexModel([("expire_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -1,9 +1,16 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+import logging
+from datetime import datetime
+from typing import Optional, Sequence
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from beanie import Document, Link, PydanticObjectId
+from bson import DBRef
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 from app.models.base import TimestampMixin
-from app.models.user import User, UserPublic
+from app.models.user import OwnerSnapshot, User, UserPublic
+from app.models.utils import fetch_owners, get_link_id
+
+logger = logging.getLogger(__name__)
 
 class ItemBase(TimestampMixin):
     title: str = Field(..., min_length=1, max_length=255)
@@ -24,26 +31,59 @@ class Item(ItemBase, Document):
         default=None,
         description="Owner of the item",
     )
+    # owner 的冗余 id，用于按用户过滤的列表和权限判断（带索引）
+    owner_id: Optional[PydanticObjectId] = Field(default=None)
+    # owner 快照，用户信息变更时由后台任务批量更新
+    owner_snapshot: Optional[OwnerSnapshot] = Field(default=None)
 
     class Settings:
         name = "items"
         use_state_management = True
+        indexes = [
+            # 列表分页排序键 (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            # 按用户过滤的列表
+            IndexModel(
+                [("owner_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+            ),
+        ]
+
+    @model_validator(mode="after")
+    def _fill_owner_id(self) -> "Item":
+        """旧文档没有 owner_id 时从 owner 引用中补全，owner 已加载时同时生成快照"""
+        if self.owner_id is None:
+            self.owner_id = get_link_id(self.owner)
+        if self.owner_snapshot is None and isinstance(self.owner, User):
+            self.owner_snapshot = self.owner.to_snapshot()
+        return self
 
     async def to_public(self) -> "ItemPublic":
         """转换为公共项目模型"""
-        owner = await self.owner.fetch() if isinstance(self.owner, Link) else self.owner
-        if not owner:
-            raise ValueError("Owner not found")
+        return await ItemPublic.from_item(self)
 
-        return ItemPublic(
-            id=self.id,
-            title=self.title,
-            description=self.description,
-            is_public=self.is_public,
-            created_at=self.created_at,
-            updated_at=self.updated_at,
-            owner=owner.to_public(),
-        )
+class ItemListView(BaseModel):
+    """
+    列表查询的投影模型
+
+    只取渲染 ItemPublic 所需的字段，直接由查询结果构建，不创建带状态管理的 Document。
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    description: Optional[str] = None
+    is_public: bool = True
+    created_at: datetime
+    updated_at: datetime
+    owner: Optional[DBRef] = None
+    owner_id: Optional[PydanticObjectId] = None
+    owner_snapshot: Optional[OwnerSnapshot] = None
+
+    @model_validator(mode="after")
+    def _fill_owner_id(self) -> "ItemListView":
+        if self.owner_id is None and self.owner is not None:
+            self.owner_id = self.owner.id
+        return self
 
 class ItemPublic(ItemBase):
     id: PydanticObjectId = Field(alias="id")
@@ -52,7 +92,43 @@ class ItemPublic(ItemBase):
     @classmethod
     async def from_item(cls, item: Item) -> "ItemPublic":
         """从项目创建公共项目模型"""
-        return await item.to_public()
+        public = await cls.from_items([item])
+        if not public:
+            raise ValueError("Owner not found")
+        return public[0]
+
+    @classmethod
+    def from_row(cls, row: "Item | ItemListView", owner: UserPublic) -> "ItemPublic":
+        """使用已加载的 owner 构建公共模型"""
+        return cls(
+            id=row.id,
+            title=row.title,
+            description=row.description,
+            is_public=row.is_public,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            owner=owner,
+        )
+
+    @classmethod
+    async def from_items(cls, rows: Sequence["Item | ItemListView"]) -> list["ItemPublic"]:
+        """
+        批量创建公共项目模型
+
+        优先使用嵌入的 owner 快照，没有快照的旧文档通过一次查询加载 owner。
+        """
+        owners = await fetch_owners([row for row in rows if row.owner_snapshot is None])
+        result = []
+        for row in rows:
+            if row.owner_snapshot is not None:
+                result.append(cls.from_row(row, row.owner_snapshot.to_public()))
+                continue
+            owner = owners.get(row.owner_id) if row.owner_id is not None else None
+            if owner is None:
+                logger.error(f"Owner not found for item {row.id}")
+                continue
+            result.append(cls.from_row(row, owner.to_public()))
+        return result
 
 class ItemsPublic(BaseModel):
     data: list[ItemPublic]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from typing import Any, Literal, Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class Job(Document):
+    """
+    后台任务
+
+    queued 的任务在 run_after 之后由 worker 认领为 running，locked_until 为认领租约，
+    worker 崩溃后租约到期的任务会被重新认领。失败后按退避时间重新排队，
+    超过 max_attempts 次后标记为 failed。
+
+    dedupe_key 相同的任务同时只能有一个处于排队或执行中，queued_key 相同的任务同时只能有一个
+    处于排队中（认领时清除），均由唯一部分索引保证。
+    """
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    kind: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    paper_id: Optional[PydanticObjectId] = None
+    dedupe_key: Optional[str] = None
+    queued_key: Optional[str] = None
+    status: JobStatus = "queued"
+    progress: float = 0.0
+    stage: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 3
+    error: Optional[str] = None
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            # worker 认领任务
+            IndexModel([("status", ASCENDING), ("run_after", ASCENDING)]),
+            IndexModel("paper_id"),
+            IndexModel(
+                [("dedupe_key", ASCENDING)],
+                unique=True,
+                partialFilterExpression={
+                    "dedupe_key": {"$type": "string"},
+                    "status": {"$in": ["queued", "running"]},
+                },
+            ),
+            IndexModel(
+                [("queued_key", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"queued_key": {"$type": "string"}, "status": "queued"},
+            ),
+        ]
+
+    async def set_progress(self, progress: float, stage: Optional[str] = None, lease_seconds: float = 0) -> None:
+        """更新进度，lease_seconds 大于 0 时同时续租"""
+        self.progress = progress
+        self.stage = stage
+        update: dict[str, Any] = {"progress": progress, "stage": stage}
+        if lease_seconds:
+            self.locked_until = datetime.utcnow() + timedelta(seconds=lease_seconds)
+            update["locked_until"] = self.locked_until
+        await self.get_motor_collection().update_one({"_id": self.id}, {"$set": update})
+
+    def to_public(self) -> "JobPublic":
+        return JobPublic.model_validate(self.model_dump())
+
+
+class JobPublic(BaseModel):
+    id: PydanticObjectId
+    kind: str
+    status: JobStatus
+    progress: float
+    stage: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
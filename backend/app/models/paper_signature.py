@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class PaperSignature(Document):
+    """
+    论文文本的 MinHash 签名及其 LSH 桶键
+
+    _id 为论文 id。(owner_id, buckets) 带多键索引，查找近似重复时只比较同一用户的、
+    至少有一个桶相同的论文。
+    """
+    id: PydanticObjectId = Field(alias="_id")
+    owner_id: Optional[PydanticObjectId] = None
+    content_hash: str
+    # uint32[NUM_PERM] 的字节
+    signature: bytes
+    buckets: list[int]
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "paper_signatures"
+        indexes = [
+            IndexModel([("owner_id", ASCENDING), ("buckets", ASCENDING)]),
+            # 相同内容的论文直接复用签名
+            IndexModel([("content_hash", ASCENDING)]),
+        ]
@@ -1,15 +1,41 @@
-from typing import Optional
-from pydantic import BaseModel, Field, validator
+import logging
+from datetime import datetime
+from typing import Optional, Sequence
+from pydantic import BaseModel, ConfigDict, Field, model_validator, validator
 from beanie import Document, Link, PydanticObjectId
+from bson import DBRef
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from fastapi import UploadFile
 
+from app.core.config import settings
 from app.models.base import TimestampMixin
-from app.models.user import User, UserPublic
+from app.models.user import OwnerSnapshot, User, UserPublic
+from app.models.utils import fetch_owners, get_link_id
+from app.utils.file_helper import FileHelper
+
+logger = logging.getLogger(__name__)
+
+# 保存的下载地址会过期，生成公共模型时重新签名
+_download_helper = FileHelper(settings.DOWNLOAD_DIR)
 
 class PaperBase(TimestampMixin):
     file_name: str = Field(..., min_length=1, max_length=255)
-    url: Optional[str] = Field(None, max_length=512)
+    # 签名的下载地址，生成公共模型时按 content_hash 签发（长度取决于文件名，不限制）；
+    # 只有内容寻址存储之前的旧论文在库中保存了地址
+    url: Optional[str] = None
     is_process: bool = Field(default=True, index=True)
+    # 文件内容的 SHA-256（内容寻址存储的键）和大小
+    content_hash: Optional[str] = Field(default=None, max_length=64)
+    file_size: Optional[int] = None
+    # 后台处理状态：queued / running / done / failed，不处理的论文为 None
+    process_status: Optional[str] = None
+    processed_at: Optional[datetime] = None
+    # 处理时发现的近似重复：最相似的已有论文及估计的相似度
+    near_duplicate_of: Optional[PydanticObjectId] = None
+    near_duplicate_score: Optional[float] = None
+    # 处理后批量计算的关键词（TF-IDF）和抽取式摘要（TextRank）
+    keywords: list[str] = Field(default_factory=list)
+    summary: Optional[str] = None
 
 class PaperCreate(PaperBase):
     file_name: str = Field(..., min_length=1, max_length=255)
@@ -50,35 +76,164 @@ class Paper(PaperBase, Document):
     owner: Link["User"] = Field(
         default=None,
     )
+    # owner 的冗余 id，用于按用户过滤的列表和权限判断（带索引）
+    owner_id: Optional[PydanticObjectId] = Field(default=None)
+    # owner 快照，用户信息变更时由后台任务批量更新
+    owner_snapshot: Optional[OwnerSnapshot] = Field(default=None)
+    # 上传时的原始文件名，下载时使用
+    download_name: Optional[str] = Field(default=None, max_length=255)
+    # 关键词和摘要的算法版本，与 SUMMARY_VERSION 不同时重新计算
+    summary_version: Optional[int] = None
 
     class Settings:
         name = "papers"
         use_state_management = True
+        indexes = [
+            # 列表分页排序键 (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+            # 按用户过滤的列表
+            IndexModel(
+                [("owner_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]
+            ),
+            # 按内容查找相同文件的论文
+            IndexModel([("content_hash", ASCENDING)]),
+            # 删除论文时清除指向它的近似重复标记
+            IndexModel([("near_duplicate_of", ASCENDING)]),
+        ]
+
+    @model_validator(mode="after")
+    def _fill_owner_id(self) -> "Paper":
+        """旧文档没有 owner_id 时从 owner 引用中补全，owner 已加载时同时生成快照"""
+        if self.owner_id is None:
+            self.owner_id = get_link_id(self.owner)
+        if self.owner_snapshot is None and isinstance(self.owner, User):
+            self.owner_snapshot = self.owner.to_snapshot()
+        return self
 
     async def to_public(self) -> "PaperPublic":
         """转换为公共项目模型"""
-        owner = await self.owner.fetch() if isinstance(self.owner, Link) else self.owner
-        if not owner:
-            raise ValueError("Owner not found")
+        return await PaperPublic.from_item(self)
+
+class PaperListView(BaseModel):
+    """
+    列表查询的投影模型
+
+    只取渲染 PaperPublic 所需的字段，直接由查询结果构建，不创建带状态管理的 Document。
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: PydanticObjectId = Field(alias="_id")
+    file_name: str
+    url: Optional[str] = None
+    is_process: bool = True
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
+    process_status: Optional[str] = None
+    processed_at: Optional[datetime] = None
+    near_duplicate_of: Optional[PydanticObjectId] = None
+    near_duplicate_score: Optional[float] = None
+    keywords: list[str] = Field(default_factory=list)
+    summary: Optional[str] = None
+    download_name: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    owner: Optional[DBRef] = None
+    owner_id: Optional[PydanticObjectId] = None
+    owner_snapshot: Optional[OwnerSnapshot] = None
+
+    @model_validator(mode="after")
+    def _fill_owner_id(self) -> "PaperListView":
+        if self.owner_id is None and self.owner is not None:
+            self.owner_id = self.owner.id
+        return self
+
+def _download_url(row: "Paper | PaperListView") -> Optional[str]:
+    """签发论文的下载地址：旧论文重新签名保存的地址，其余按内容哈希签名"""
+    if row.url:
+        return _download_helper.resign_down_url(row.url)
+    if row.content_hash:
+        return _download_helper.gen_down_url(row.content_hash, download_name=row.download_name or row.file_name)
+    return None
 
-        return PaperPublic(
-            id=self.id,
-            file_name=self.file_name,
-            url=self.url,
-            is_process=self.is_process,
-            created_at=self.created_at,
-            updated_at=self.updated_at,
-            owner=owner.to_public(),
-        )
 
 class PaperPublic(PaperBase):
     id: PydanticObjectId = Field(alias="id")
     owner: UserPublic
+    is_near_duplicate: bool = False
 
     @classmethod
     async def from_item(cls, paper: Paper) -> "PaperPublic":
         """从项目创建公共项目模型"""
-        return await paper.to_public()
+        public = await cls.from_items([paper])
+        if not public:
+            raise ValueError("Owner not found")
+        return public[0]
+
+    @classmethod
+    def from_row(cls, row: "Paper | PaperListView", owner: UserPublic) -> "PaperPublic":
+        """使用已加载的 owner 构建公共模型"""
+        return cls(
+            id=row.id,
+            file_name=row.file_name,
+            url=_download_url(row),
+            is_process=row.is_process,
+            content_hash=row.content_hash,
+            file_size=row.file_size,
+            process_status=row.process_status,
+            processed_at=row.processed_at,
+            near_duplicate_of=row.near_duplicate_of,
+            near_duplicate_score=row.near_duplicate_score,
+            is_near_duplicate=row.near_duplicate_of is not None,
+            keywords=row.keywords,
+            summary=row.summary,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            owner=owner,
+        )
+
+    @classmethod
+    async def from_items(cls, rows: Sequence["Paper | PaperListView"]) -> list["PaperPublic"]:
+        """
+        批量创建公共项目模型
+
+        优先使用嵌入的 owner 快照，没有快照的旧文档通过一次查询加载 owner。
+        """
+        owners = await fetch_owners([row for row in rows if row.owner_snapshot is None])
+        result = []
+        for row in rows:
+            if row.owner_snapshot is not None:
+                result.append(cls.from_row(row, row.owner_snapshot.to_public()))
+                continue
+            owner = owners.get(row.owner_id) if row.owner_id is not None else None
+            if owner is None:
+                logger.error(f"Owner not found for paper {row.id}")
+                continue
+            result.append(cls.from_row(row, owner.to_public()))
+        return result
+
+class PaperSearchHit(BaseModel):
+    """检索结果：论文、得分（BM25 或余弦相似度）和命中位置附近的摘录"""
+    paper: PaperPublic
+    score: float
+    snippet: str
+    # 语义检索时最相似的文本块所在页（从 1 开始）
+    page: Optional[int] = None
+
+class PaperPage(BaseModel):
+    # 页码从 1 开始，与检索结果的 page 一致
+    number: int
+    text: str
+
+class PaperPages(BaseModel):
+    """论文按页的文本（请求的页范围）及总页数"""
+    page_count: int
+    pages: list[PaperPage]
+
+class PaperTocEntry(BaseModel):
+    """预览的目录项，anchor 为预览 HTML 中标题的 id"""
+    level: int
+    title: str
+    anchor: str
 
 class PapersPublic(BaseModel):
     data: list[PaperPublic]
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Any
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from app.models.papers import PaperPublic
+
+
+class RelatedNeighbor(BaseModel):
+    paper_id: PydanticObjectId
+    score: float
+
+
+class RelatedPapers(Document):
+    """
+    论文的相关论文列表（预先计算的前 k 个近邻，按 score 降序）
+
+    _id 为论文 id。论文处理完成时增量更新自身和受影响的列表，定期任务全量重建。
+    """
+    id: PydanticObjectId = Field(alias="_id")
+    neighbors: list[RelatedNeighbor] = Field(default_factory=list)
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "related_papers"
+        indexes = [
+            # 删除论文时从其他论文的列表中移除
+            "neighbors.paper_id",
+        ]
+
+    @staticmethod
+    def offer(paper_id: PydanticObjectId, neighbor_id: PydanticObjectId, score: float, k: int) -> list[Any]:
+        """
+        把 neighbor_id 放入 paper_id 的列表的更新操作（bulk_write 用）
+
+        先移除旧的同一近邻，再按得分插入并只保留前 k 个，不在前 k 内时自然被截掉。
+        """
+        entry = {"paper_id": neighbor_id, "score": score}
+        return [
+            UpdateOne({"_id": paper_id}, {"$pull": {"neighbors": {"paper_id": neighbor_id}}}),
+            UpdateOne(
+                {"_id": paper_id},
+                {
+                    "$push": {"neighbors": {"$each": [entry], "$sort": {"score": -1}, "$slice": k}},
+                    "$set": {"computed_at": datetime.utcnow()},
+                },
+                upsert=True,
+            ),
+        ]
+
+
+class RelatedPaper(BaseModel):
+    """相关论文及相似度（余弦相似度）"""
+    paper: PaperPublic
+    score: float
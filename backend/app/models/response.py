@@ -1,6 +1,5 @@
 from typing import List, TypeVar, Generic, Optional, Any
 from pydantic import BaseModel, ConfigDict
-from pydantic.generics import GenericModel
 
 # 定义泛型类型变量
 T = TypeVar('T')
@@ -10,7 +9,7 @@ class PaginatedResults(BaseModel):
     results: List[BaseModel]
 
 # 通用API响应模型
-class ApiResponse(GenericModel, Generic[T]):
+class ApiResponse(BaseModel, Generic[T]):
     model_config = ConfigDict(arbitrary_types_allowed=True)
     
     success: bool = True
@@ -43,17 +42,18 @@ class ApiResponse(GenericModel, Generic[T]):
 # 分页数据响应包装器
 class PaginatedResponse(ApiResponse, Generic[T]):
     data: List[T]
-    meta: dict = {"total": 0, "page": 1, "page_size": 10}
+    meta: dict = {"total": 0, "page": 1, "page_size": 10, "next_cursor": None}
     
     @classmethod
-    def create(cls, items: List[T], total: int, page: int = 1, page_size: int = 10) -> "PaginatedResponse[T]":
+    def create(cls, items: List[T], total: Optional[int], page: int = 1, page_size: int = 10, next_cursor: Optional[str] = None) -> "PaginatedResponse[T]":
         """创建分页响应"""
         return cls(
             data=items, 
             meta={
                 "total": total,
                 "page": page,
-                "page_size": page_size
+                "page_size": page_size,
+                "next_cursor": next_cursor
             }
         )
 
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ReturnDocument
+
+
+class StoredFile(Document):
+    """
+    内容寻址存储的文件
+
+    _id 为文件内容的 SHA-256，ref_count 为引用该内容的论文数。
+    引用数降为 0 时删除记录，由调用方删除磁盘文件。
+    """
+    id: str = Field(alias="_id")  # type: ignore[assignment]
+    size: int
+    content_type: Optional[str] = None
+    ref_count: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "stored_files"
+
+    @classmethod
+    async def acquire(cls, content_hash: str, size: int, content_type: Optional[str] = None) -> bool:
+        """增加一次引用，返回该内容此前是否已被引用"""
+        previous = await cls.get_motor_collection().find_one_and_update(
+            {"_id": content_hash},
+            {
+                "$inc": {"ref_count": 1},
+                "$setOnInsert": {
+                    "size": size,
+                    "content_type": content_type,
+                    "created_at": datetime.utcnow(),
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        return previous is not None and previous.get("ref_count", 0) > 0
+
+    @classmethod
+    async def release(cls, content_hash: str) -> bool:
+        """减少一次引用，返回内容是否已不再被引用（记录已删除）"""
+        document = await cls.get_motor_collection().find_one_and_update(
+            {"_id": content_hash},
+            {"$inc": {"ref_count": -1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return True
+        if document["ref_count"] > 0:
+            return False
+        result = await cls.get_motor_collection().delete_one(
+            {"_id": content_hash, "ref_count": {"$lte": 0}}
+        )
+        return result.deleted_count == 1
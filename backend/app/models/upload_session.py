@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+
+from app.core.config import settings
+
+UploadStatus = Literal["pending", "finalizing", "completed"]
+
+
+class UploadSessionCreate(BaseModel):
+    """创建可续传上传会话的参数"""
+    file_name: str = Field(..., min_length=1, max_length=255)
+    filename: str = Field(..., min_length=1, max_length=255, description="原始文件名")
+    content_type: str = Field(..., max_length=255)
+    total_size: int = Field(..., gt=0)
+    is_process: bool = True
+
+
+class UploadSession(Document):
+    """
+    可续传的分块上传会话
+
+    分块按偏移量顺序写入 UPLOAD_DIR 下的临时文件，received 为已确认写入的字节数。
+    lease_until 是写入租约，同一时刻只允许一个请求写入，请求中断后租约到期即可重试。
+    会话过期后由 TTL 索引删除，残留的临时文件在启动时清理。
+    """
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    owner_id: PydanticObjectId
+    file_name: str
+    filename: str
+    content_type: str
+    total_size: int
+    is_process: bool = True
+    received: int = 0
+    status: UploadStatus = "pending"
+    lease_until: Optional[datetime] = None
+    paper_id: Optional[PydanticObjectId] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(
+        default_factory=lambda: datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+    )
+
+    class Settings:
+        name = "upload_sessions"
+        indexes = [
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ]
+
+    def to_public(self) -> "UploadSessionPublic":
+        return UploadSessionPublic(
+            id=self.id,
+            file_name=self.file_name,
+            total_size=self.total_size,
+            received=self.received,
+            status=self.status,
+            paper_id=self.paper_id,
+            expires_at=self.expires_at,
+        )
+
+
+class UploadSessionPublic(BaseModel):
+    id: PydanticObjectId
+    file_name: str
+    total_size: int
+    received: int
+    status: UploadStatus
+    paper_id: Optional[PydanticObjectId] = None
+    expires_at: datetime
@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr, Field
 from beanie import Document, Link, PydanticObjectId
+from pymongo import DESCENDING, IndexModel
 
 from app.models.base import TimestampMixin
 
@@ -27,6 +28,10 @@ class User(UserBase, Document):
     class Settings:
         name = "users"
         use_state_management = True
+        indexes = [
+            # 列表分页排序键 (created_at, _id)
+            IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
 
     def to_public(self) -> "UserPublic":
         """转换为公共用户模型"""
@@ -38,9 +43,39 @@ class User(UserBase, Document):
             is_superuser=self.is_superuser,
         )
 
+    def to_snapshot(self) -> "OwnerSnapshot":
+        """转换为嵌入在 items / papers 中的 owner 快照"""
+        return OwnerSnapshot(
+            id=self.id,
+            email=self.email,
+            full_name=self.full_name,
+            is_active=self.is_active,
+            is_superuser=self.is_superuser,
+        )
+
 class UserPublic(UserBase):
     id: PydanticObjectId = Field(alias="id")
 
+class OwnerSnapshot(BaseModel):
+    """嵌入文档中的 owner 快照，列表渲染 owner 时无需再查询 users 集合"""
+    id: PydanticObjectId
+    email: Optional[EmailStr] = None
+    full_name: Optional[str] = None
+    is_active: bool = True
+    is_superuser: bool = False
+
+    def to_public(self) -> UserPublic:
+        return UserPublic(
+            id=self.id,
+            email=self.email,
+            full_name=self.full_name,
+            is_active=self.is_active,
+            is_superuser=self.is_superuser,
+        )
+
+# 变更后需要同步到 owner 快照的字段
+OWNER_SNAPSHOT_FIELDS = ("email", "full_name", "is_active", "is_superuser")
+
 class UsersPublic(BaseModel):
     data: list[UserPublic]
     count: int
@@ -1,3 +1,38 @@
+from typing import Any, Optional, Sequence
 
-from typing import Optional
-from pydantic import BaseModel, Field
+from beanie import Link, PydanticObjectId
+from beanie.operators import In
+
+from app.models.user import User
+
+
+def get_link_id(link: Any) -> Optional[PydanticObjectId]:
+    """获取 Link 字段引用的文档 id（不触发数据库查询）"""
+    if link is None:
+        return None
+    link_id: Optional[PydanticObjectId] = link.ref.id if isinstance(link, Link) else getattr(link, "id", None)
+    return link_id
+
+
+async def fetch_owners(documents: Sequence[Any]) -> dict[PydanticObjectId, User]:
+    """
+    批量加载一组文档的 owner
+
+    文档可以是 Document 或列表投影模型。收集所有 owner 的 id，用一次 $in 查询取回尚未加载的用户，返回 id -> User 映射。
+    """
+    owners: dict[PydanticObjectId, User] = {}
+    missing: set[PydanticObjectId] = set()
+    for document in documents:
+        owner = getattr(document, "owner", None)
+        if isinstance(owner, User):
+            owners[owner.id] = owner
+            continue
+        owner_id = getattr(document, "owner_id", None) or get_link_id(owner)
+        if owner_id is not None:
+            missing.add(owner_id)
+
+    missing -= owners.keys()
+    if missing:
+        users = await User.find(In(User.id, list(missing))).to_list()
+        owners.update({user.id: user for user in users})
+    return owners
@@ -0,0 +1,49 @@
+from app.search.embedding import EMBEDDING_VERSION, embed_text
+from app.search.index import (
+    SearchIndex,
+    add_documents,
+    index_text_file,
+    index_text_files,
+    make_snippet,
+    read_manifest,
+    rebuild,
+    remove_documents,
+    replace_from,
+)
+from app.search.tokenizer import TOKENIZER_VERSION, tokenize
+from app.search.vectors import (
+    VectorIndex,
+    add_vectors,
+    embed_text_file,
+    embed_text_files,
+    live_keys,
+    nearest_neighbors,
+    read_vector_manifest,
+    remove_vectors,
+    replace_vectors_from,
+)
+
+__all__ = [
+    "SearchIndex",
+    "VectorIndex",
+    "add_documents",
+    "add_vectors",
+    "embed_text",
+    "embed_text_file",
+    "embed_text_files",
+    "index_text_file",
+    "index_text_files",
+    "make_snippet",
+    "live_keys",
+    "nearest_neighbors",
+    "read_manifest",
+    "read_vector_manifest",
+    "rebuild",
+    "remove_documents",
+    "remove_vectors",
+    "replace_from",
+    "replace_vectors_from",
+    "EMBEDDING_VERSION",
+    "TOKENIZER_VERSION",
+    "tokenize",
+]
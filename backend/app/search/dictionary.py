@@ -0,0 +1,198 @@
+"""
+中文分词词典
+
+词典源文件为 data/zh_words.txt.gz（gzip 压缩的"词 词频"，每行一个），取自 jieba 0.42.1 的 dict.txt
+中词频最高的 50000 个纯汉字词（https://github.com/fxsjy/jieba，MIT 许可证，见 data/LICENSE.jieba）。
+
+首次使用时编译为紧凑的二进制字典树，保存在 PAPER_DATA_DIR 下，之后以 mmap 方式只读打开，
+同一台机器上的所有 worker 进程共享同一份页缓存:
+    header      MAGIC(8) 节点数 N(uint32) 边数 E(uint32) 未登录字的对数概率(float32) 保留(uint32)
+    node_first  uint32[N+1]  节点的子边在边数组中的起止位置（同一节点的边按字符升序）
+    edge_char   uint32[E]    边上的字符（码位）
+    edge_child  uint32[E]    边指向的子节点
+    node_logp   float32[N]   以该节点结尾的词的对数概率，不成词的节点为 0
+编译结果的文件名包含源文件摘要，词典更新后自动重新编译；文件长度与头部不符（写入中断等）时也重新编译。
+"""
+import gzip
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from typing import IO, Any, Optional
+
+from app.core.config import settings
+
+SOURCE_PATH = os.path.join(os.path.dirname(__file__), "data", "zh_words.txt.gz")
+
+MAGIC = b"AXTRIE01"
+_HEADER = struct.Struct("<8sIIfI")
+
+
+def compile_dictionary(source: str, target: str) -> None:
+    """编译词典源文件为二进制字典树，先写临时文件再原子替换"""
+    words: dict[str, int] = {}
+    with _open_source(source) as file:
+        for line in file:
+            if not line.strip() or line.startswith("#"):
+                continue
+            word, freq = line.split()
+            words[word] = words.get(word, 0) + int(freq)
+    total = sum(words.values())
+
+    # 先建立嵌套字典形式的树，再按广度优先编号，使每个节点的边连续存放
+    root: dict[str, Any] = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = math.log(words[word] / total)
+
+    node_first = [0]
+    edge_char: list[int] = []
+    edge_child: list[int] = []
+    node_logp: list[float] = []
+    queue = [root]
+    for node in queue:
+        node_logp.append(node.get("", 0.0))
+        for char in sorted(key for key in node if key):
+            edge_char.append(ord(char))
+            edge_child.append(len(queue))
+            queue.append(node[char])
+        node_first.append(len(edge_char))
+
+    unknown_logp = math.log(min(words.values()) / total) - 1.0
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, len(queue), len(edge_char), unknown_logp, 0))
+            file.write(struct.pack(f"<{len(node_first)}I", *node_first))
+            file.write(struct.pack(f"<{len(edge_char)}I", *edge_char))
+            file.write(struct.pack(f"<{len(edge_child)}I", *edge_child))
+            file.write(struct.pack(f"<{len(node_logp)}f", *node_logp))
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _open_source(source: str) -> IO[str]:
+    if source.endswith(".gz"):
+        return gzip.open(source, "rt", encoding="utf-8")
+    return open(source, encoding="utf-8")
+
+
+class Dictionary:
+    """以 mmap 方式打开的只读字典树"""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, nodes, edges, unknown_logp = b"", 0, 0, 0.0
+        if len(self._mmap) >= _HEADER.size:
+            magic, nodes, edges, unknown_logp, _ = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or len(self._mmap) != _HEADER.size + (nodes * 2 + 1) * 4 + edges * 8:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a compiled dictionary")
+        self.unknown_logp = unknown_logp
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size
+        self._node_first = view[offset:offset + (nodes + 1) * 4].cast("I")
+        offset += (nodes + 1) * 4
+        self._edge_char = view[offset:offset + edges * 4].cast("I")
+        offset += edges * 4
+        self._edge_child = view[offset:offset + edges * 4].cast("I")
+        offset += edges * 4
+        self._node_logp = view[offset:offset + nodes * 4].cast("f")
+
+    def _child(self, node: int, char: str) -> int:
+        lo, hi = self._node_first[node], self._node_first[node + 1]
+        code = ord(char)
+        index = bisect_left(self._edge_char, code, lo, hi)
+        if index < hi and self._edge_char[index] == code:
+            return self._edge_child[index]
+        return -1
+
+    def prefixes(self, text: str, start: int, end: Optional[int] = None) -> list[tuple[int, float]]:
+        """text[start:] 中所有在词典里的前缀，返回 [(词尾位置, 对数概率)]"""
+        end = len(text) if end is None else end
+        found = []
+        node = 0
+        for position in range(start, end):
+            node = self._child(node, text[position])
+            if node < 0:
+                break
+            logp = self._node_logp[node]
+            if logp:
+                found.append((position + 1, logp))
+        return found
+
+    def __contains__(self, word: str) -> bool:
+        node = 0
+        for char in word:
+            node = self._child(node, char)
+            if node < 0:
+                return False
+        return bool(word) and self._node_logp[node] != 0
+
+    def segment(self, text: str) -> list[tuple[int, int]]:
+        """
+        切分一段连续的汉字，返回各词的 [(起, 止)]
+
+        对所有词典词构成的有向无环图，从后向前动态规划求概率最大的切分，未登录的字单独成词。
+        """
+        length = len(text)
+        if length == 1:
+            return [(0, 1)]
+        candidates = [self.prefixes(text, start) for start in range(length)]
+        route = [0.0] * (length + 1)
+        best_end = [0] * length
+        for start in range(length - 1, -1, -1):
+            best, end = self.unknown_logp + route[start + 1], start + 1
+            for candidate_end, logp in candidates[start]:
+                score = logp + route[candidate_end]
+                if score > best:
+                    best, end = score, candidate_end
+            route[start] = best
+            best_end[start] = end
+
+        words = []
+        start = 0
+        while start < length:
+            words.append((start, best_end[start]))
+            start = best_end[start]
+        return words
+
+
+_dictionary: Optional[Dictionary] = None
+_lock = threading.Lock()
+
+
+def _source_digest(source: str) -> str:
+    with open(source, "rb") as file:
+        return hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+
+
+def compiled_path(source: str = SOURCE_PATH) -> str:
+    """编译结果的路径，所有进程使用同一个文件以共享 mmap"""
+    return os.path.join(settings.PAPER_DATA_DIR, "dictionary", f"zh-{_source_digest(source)}.trie")
+
+
+def get_dictionary() -> Dictionary:
+    """进程内共享的词典，首次调用时加载（必要时先编译）"""
+    global _dictionary
+    if _dictionary is None:
+        with _lock:
+            if _dictionary is None:
+                path = compiled_path()
+                try:
+                    _dictionary = Dictionary(path)
+                except (FileNotFoundError, ValueError):
+                    compile_dictionary(SOURCE_PATH, path)
+                    _dictionary = Dictionary(path)
+    return _dictionary
@@ -0,0 +1,74 @@
+"""
+本地计算的文本向量
+
+不依赖模型：词（见 tokenizer.py）和相邻词对经哈希映射到 EMBEDDING_DIM 维（feature hashing，
+用哈希的另一位决定正负号以抵消冲突），取对数词频后做 L2 归一化，内积即余弦相似度。
+单字词和常见英文虚词降低权重。修改特征或维度时需递增 EMBEDDING_VERSION，旧向量会被重建。
+"""
+import zlib
+from typing import Sequence
+
+import numpy as np
+
+from app.search.porter import stem
+from app.search.tokenizer import tokenize
+
+EMBEDDING_DIM = 256
+EMBEDDING_VERSION = 1
+
+# 每个文本块的词数
+CHUNK_TOKENS = 256
+# 页尾少于该词数的块并入同一页的前一块
+MIN_CHUNK_TOKENS = 32
+
+_LOW_WEIGHT = 0.25
+# 与词一样做词干提取后比较
+STOPWORDS = frozenset(
+    stem(word)
+    for word in (
+        "the and for are was were with that this from have has had not but its into than then "
+        "which their there these those been also can our about"
+    ).split()
+)
+
+
+def _feature(term: str, weight: float, index: list[int], values: list[float]) -> None:
+    hashed = zlib.crc32(term.encode())
+    index.append(hashed % EMBEDDING_DIM)
+    values.append(weight if hashed & 0x80000000 else -weight)
+
+
+def embed_tokens(tokens: Sequence[str]) -> np.ndarray:
+    """一段文本（词序列）的向量，没有词时为零向量"""
+    index: list[int] = []
+    values: list[float] = []
+    previous = None
+    for token in tokens:
+        weight = _LOW_WEIGHT if len(token) == 1 or token in STOPWORDS else 1.0
+        _feature(token, weight, index, values)
+        if previous is not None:
+            _feature(f"{previous} {token}", weight * 0.5, index, values)
+        previous = token
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    np.add.at(vector, np.asarray(index, dtype=np.intp), np.asarray(values, dtype=np.float32))
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def embed_text(text: str) -> np.ndarray:
+    return embed_tokens(tokenize(text))
+
+
+def chunk_pages(pages: Sequence[str]) -> list[tuple[int, list[str]]]:
+    """把各页文本切成约 CHUNK_TOKENS 词的块，返回 [(页码（从 0 开始）, 词序列)]"""
+    chunks: list[tuple[int, list[str]]] = []
+    for page_number, page in enumerate(pages):
+        tokens = tokenize(page)
+        for start in range(0, len(tokens), CHUNK_TOKENS):
+            chunk = tokens[start:start + CHUNK_TOKENS]
+            if len(chunk) < MIN_CHUNK_TOKENS and chunks and chunks[-1][0] == page_number:
+                chunks[-1][1].extend(chunk)
+            else:
+                chunks.append((page_number, chunk))
+    return chunks
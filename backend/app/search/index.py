@@ -0,0 +1,342 @@
+"""
+BM25 倒排索引
+
+索引目录下有若干只读段（见 segment.py）和一个 manifest.json:
+    {"version": 版本号, "tokenizer": 分词器版本,
+     "segments": [{"name": 段名, "docs": 文档数}], "deleted": {段名: [段内序号, ...]}}
+
+写入（新增、删除、合并）在文件锁内完成，先写新段再原子替换 manifest；
+删除和重新索引只在 manifest 中记录墓碑，合并段时才真正丢弃。
+分词器版本变化后，在临时目录中重建完整索引，再由 replace_from 一次性替换 manifest。
+读取方在每次查询前检查 manifest 是否变化，段以 mmap 打开并在进程内复用。
+"""
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from app.search import segment as seg
+from app.search.segment import Segment
+from app.search.storage import file_lock, read_json, write_json_atomic
+from app.search.tokenizer import TOKENIZER_VERSION, iter_tokens, tokenize
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 分层合并：按存活文档数把段分到以 MERGE_FACTOR 为底的对数层级，某一层的段数达到 MERGE_FACTOR 时
+# 合并该层最小的 MERGE_FACTOR 个段。每个文档最多被重写约 log(总文档数) 次，段数约为 (MERGE_FACTOR - 1) × 层数
+MERGE_FACTOR = 4
+
+MANIFEST = "manifest.json"
+
+
+def _empty_manifest() -> dict[str, Any]:
+    return {"version": 0, "tokenizer": TOKENIZER_VERSION, "segments": [], "deleted": {}}
+
+
+def read_manifest(directory: str) -> dict[str, Any]:
+    return read_json(os.path.join(directory, MANIFEST), _empty_manifest())
+
+
+def _write_manifest(directory: str, manifest: dict[str, Any]) -> None:
+    manifest["version"] += 1
+    write_json_atomic(os.path.join(directory, MANIFEST), manifest)
+
+
+@contextmanager
+def _write_lock(directory: str) -> Iterator[dict[str, Any]]:
+    """独占写锁（跨进程），产出当前 manifest，退出时清理不再引用的段"""
+    with file_lock(directory):
+        manifest = read_manifest(directory)
+        yield manifest
+        _remove_unused_segments(directory, manifest)
+
+
+def _remove_unused_segments(directory: str, manifest: dict[str, Any]) -> None:
+    # 已打开这些段的读取方持有 mmap，删除目录不影响其读取
+    used = {segment["name"] for segment in manifest["segments"]}
+    for entry in os.scandir(directory):
+        if entry.is_dir() and entry.name not in used and entry.name.startswith(("seg-", ".seg-")):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _tombstone(directory: str, manifest: dict[str, Any], keys: Sequence[str]) -> int:
+    """在 manifest 中标记这些键的现有文档为已删除，返回标记的文档数"""
+    removed = 0
+    for info in manifest["segments"]:
+        segment = Segment(os.path.join(directory, info["name"]))
+        deleted = set(manifest["deleted"].get(info["name"], []))
+        for key in keys:
+            for local_id in segment.find(key).tolist():
+                if local_id not in deleted:
+                    deleted.add(local_id)
+                    removed += 1
+        if deleted:
+            manifest["deleted"][info["name"]] = sorted(deleted)
+    return removed
+
+
+def _live_docs(manifest: dict[str, Any], info: dict[str, Any]) -> int:
+    return int(info["docs"]) - len(manifest["deleted"].get(info["name"], []))
+
+
+def _size_class(docs: int) -> int:
+    """文档数所在的层级：floor(log_MERGE_FACTOR(docs))"""
+    size_class = 0
+    while docs >= MERGE_FACTOR:
+        docs //= MERGE_FACTOR
+        size_class += 1
+    return size_class
+
+
+def _merge_candidates(manifest: dict[str, Any]) -> Optional[list[dict[str, Any]]]:
+    """最低的段数达到 MERGE_FACTOR 的层中最小的 MERGE_FACTOR 个段，没有需要合并的层时返回 None"""
+    tiers: dict[int, list[dict[str, Any]]] = {}
+    for info in manifest["segments"]:
+        tiers.setdefault(_size_class(_live_docs(manifest, info)), []).append(info)
+    for size_class in sorted(tiers):
+        if len(tiers[size_class]) >= MERGE_FACTOR:
+            return sorted(tiers[size_class], key=lambda info: _live_docs(manifest, info))[:MERGE_FACTOR]
+    return None
+
+
+def _maybe_merge(directory: str, manifest: dict[str, Any]) -> None:
+    """合并同一层的段（同时清除其中的墓碑），直到每一层的段数都少于 MERGE_FACTOR"""
+    while (smallest := _merge_candidates(manifest)) is not None:
+        segments = [Segment(os.path.join(directory, info["name"])) for info in smallest]
+        deleted = {
+            name: np.asarray(ids, dtype=np.int64)
+            for name, ids in manifest["deleted"].items()
+            if name in {info["name"] for info in smallest}
+        }
+        name = seg.merge(directory, segments, deleted)
+        merged = {info["name"] for info in smallest}
+        manifest["segments"] = [info for info in manifest["segments"] if info["name"] not in merged]
+        for old in merged:
+            manifest["deleted"].pop(old, None)
+        if name is not None:
+            docs = sum(s.doc_count for s in segments) - sum(len(ids) for ids in deleted.values())
+            manifest["segments"].append({"name": name, "docs": docs})
+
+
+def add_documents(directory: str, documents: Sequence[tuple[str, Sequence[str]]]) -> int:
+    """索引 (键, 词列表)，已存在的同键文档会被替换，返回索引的文档数"""
+    with _write_lock(directory) as manifest:
+        _tombstone(directory, manifest, [key for key, _ in documents])
+        name = seg.build_from_documents(directory, documents)
+        if name is not None:
+            manifest["segments"].append({"name": name, "docs": len(documents)})
+        _maybe_merge(directory, manifest)
+        _write_manifest(directory, manifest)
+    return len(documents)
+
+
+def index_text_file(directory: str, key: str, text_path: str) -> int:
+    """分词并索引文本文件（在进程池中执行），返回词数"""
+    with open(text_path, encoding="utf-8") as file:
+        tokens = tokenize(file.read())
+    add_documents(directory, [(key, tokens)])
+    return len(tokens)
+
+
+def index_text_files(directory: str, items: Sequence[tuple[str, str]]) -> list[str]:
+    """批量分词并索引 (键, 文本文件)，写成一个段（在进程池中执行），返回索引的键；文件不存在的跳过"""
+    documents = []
+    for key, text_path in items:
+        try:
+            with open(text_path, encoding="utf-8") as file:
+                documents.append((key, tokenize(file.read())))
+        except FileNotFoundError:
+            continue
+    add_documents(directory, documents)
+    return [key for key, _ in documents]
+
+
+def remove_documents(directory: str, keys: Sequence[str]) -> int:
+    """删除文档（记录墓碑），返回删除的文档数"""
+    if not os.path.isfile(os.path.join(directory, MANIFEST)):
+        return 0
+    with _write_lock(directory) as manifest:
+        removed = _tombstone(directory, manifest, keys)
+        if removed:
+            _write_manifest(directory, manifest)
+    return removed
+
+
+def rebuild(directory: str, documents: Sequence[tuple[str, Sequence[str]]]) -> int:
+    """丢弃现有段，用给定文档重建索引（分词器版本变化后使用）"""
+    with _write_lock(directory) as manifest:
+        manifest["segments"] = []
+        manifest["deleted"] = {}
+        manifest["tokenizer"] = TOKENIZER_VERSION
+        name = seg.build_from_documents(directory, documents)
+        if name is not None:
+            manifest["segments"].append({"name": name, "docs": len(documents)})
+        _write_manifest(directory, manifest)
+    return len(documents)
+
+
+def replace_from(directory: str, staging: str) -> int:
+    """
+    用 staging 目录中重建好的索引替换 directory 的索引（分词器版本变化后使用），返回文档数
+
+    staging 须与 directory 在同一文件系统上，段目录直接改名移入；替换后删除 staging。
+    """
+    with _write_lock(staging) as staged, _write_lock(directory) as manifest:
+        for info in staged["segments"]:
+            os.rename(os.path.join(staging, info["name"]), os.path.join(directory, info["name"]))
+        manifest["segments"] = staged["segments"]
+        manifest["deleted"] = staged["deleted"]
+        manifest["tokenizer"] = staged["tokenizer"]
+        _write_manifest(directory, manifest)
+        staged["segments"] = []
+    shutil.rmtree(staging, ignore_errors=True)
+    return int(sum(info["docs"] for info in manifest["segments"])) - sum(
+        len(ids) for ids in manifest["deleted"].values()
+    )
+
+
+class SearchIndex:
+    """
+    索引的只读视图
+
+    每次查询前检查 manifest 的修改时间，变化时重新加载（段对象按段名复用）。
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple[int, int]] = None
+        self._segments: dict[str, Segment] = {}
+        self._live: dict[str, np.ndarray] = {}
+        self.tokenizer_version = TOKENIZER_VERSION
+        self.doc_count = 0
+        self.avg_length = 0.0
+
+    def refresh(self) -> None:
+        stamp = self._manifest_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            try:
+                self._load(stamp)
+            except FileNotFoundError:
+                # 读取 manifest 后段被合并删除，重新读取最新的 manifest
+                self._load(self._manifest_stamp())
+
+    def _manifest_stamp(self) -> Optional[tuple[int, int]]:
+        # manifest 每次通过 os.replace 更新，inode 和修改时间一起判断是否变化
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self, stamp: Optional[tuple[int, int]]) -> None:
+        manifest = read_manifest(self.directory)
+        segments: dict[str, Segment] = {}
+        live: dict[str, np.ndarray] = {}
+        doc_count = 0
+        total_length = 0
+        for info in manifest["segments"]:
+            name = info["name"]
+            segment = self._segments.get(name) or Segment(os.path.join(self.directory, name))
+            mask = np.ones(segment.doc_count, dtype=bool)
+            mask[np.asarray(manifest["deleted"].get(name, []), dtype=np.int64)] = False
+            segments[name] = segment
+            live[name] = mask
+            doc_count += int(mask.sum())
+            total_length += int(np.asarray(segment.doc_lengths, dtype=np.int64)[mask].sum())
+        self._segments = segments
+        self._live = live
+        self.tokenizer_version = manifest["tokenizer"]
+        self.doc_count = doc_count
+        self.avg_length = total_length / doc_count if doc_count else 0.0
+        self._stamp = stamp
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        """BM25 排序，返回 [(键, 得分)]，按得分降序"""
+        self.refresh()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+        segments, live = self._segments, self._live
+        hashes = [seg.term_hash(term) for term in terms]
+
+        # 先取出所有倒排表并统计全局文档频率
+        postings = {
+            name: [segment.postings(hashed) for hashed in hashes]
+            for name, segment in segments.items()
+        }
+        df = np.zeros(len(terms), dtype=np.int64)
+        for name, lists in postings.items():
+            mask = live[name]
+            for index, (docs, _) in enumerate(lists):
+                if len(docs):
+                    df[index] += int(np.count_nonzero(mask[docs]))
+        idf = np.log1p((self.doc_count - df + 0.5) / (df + 0.5))
+
+        candidates: list[tuple[float, str]] = []
+        for name, segment in segments.items():
+            lists = postings[name]
+            if not any(len(docs) for docs, _ in lists):
+                continue
+            scores = np.zeros(segment.doc_count, dtype=np.float32)
+            lengths = segment.doc_lengths
+            for index, (docs, freqs) in enumerate(lists):
+                if not len(docs):
+                    continue
+                tf = freqs.astype(np.float32)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / self.avg_length)
+                scores[docs] += idf[index] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores[~live[name]] = 0
+            top = _top_k(scores, limit)
+            keys = segment.keys[top]
+            candidates.extend(zip(scores[top].tolist(), (key.decode() for key in keys), strict=True))
+
+        candidates.sort(reverse=True)
+        return [(key, score) for score, key in candidates[:limit]]
+
+    def document_frequencies(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        词哈希（uint64 数组）的文档频率，所有词一次二分查找
+
+        按倒排表长度计算，已删除但尚未合并掉的文档仍被计入。
+        """
+        self.refresh()
+        df = np.zeros(len(hashes), dtype=np.int64)
+        for segment in list(self._segments.values()):
+            term_hashes = segment.term_hashes
+            if not len(term_hashes):
+                continue
+            index = np.minimum(np.searchsorted(term_hashes, hashes), len(term_hashes) - 1)
+            found = np.flatnonzero(term_hashes[index] == hashes)
+            offsets = segment.term_offsets
+            df[found] += offsets[index[found] + 1] - offsets[index[found]]
+        return df
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """得分大于 0 的前 k 个下标（降序）"""
+    hits = np.flatnonzero(scores > 0)
+    if len(hits) > k:
+        hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+    return hits[np.argsort(-scores[hits], kind="stable")]
+
+
+def make_snippet(text: str, query: str, width: int = 160) -> str:
+    """取第一个命中查询词的位置附近的片段"""
+    terms = set(tokenize(query))
+    text = text.replace("\f", " ")
+    position = next((start for token, start in iter_tokens(text) if token in terms), 0)
+    start = max(position - width // 4, 0)
+    snippet = " ".join(text[start:start + width].split())
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(text) else ""
+    return f"{prefix}{snippet}{suffix}"
+
@@ -0,0 +1,77 @@
+"""
+MinHash 签名和 LSH 分桶，用于发现近似重复的文档
+
+文档表示为相邻 SHINGLE_SIZE 个词（见 tokenizer.py）组成的片段集合，两个文档片段集合的
+Jaccard 相似度用 NUM_PERM 个哈希函数下最小值相同的比例来估计。
+签名分为 BANDS 段，每段 ROWS 个值，任一段完全相同的文档成为候选（相似度约
+(1 / BANDS) ** (1 / ROWS) ≈ 0.71 以上时大概率成为候选），再用签名估计相似度确认。
+"""
+import hashlib
+import zlib
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.search.tokenizer import TOKENIZER_VERSION, tokenize
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# 每次参与计算的片段数，限制中间矩阵 [NUM_PERM, _BLOCK] 的大小
+_BLOCK = 8192
+
+# 固定种子，签名可以持久化并在进程间比较
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+
+
+def shingles(tokens: Sequence[str]) -> np.ndarray:
+    """相邻 SHINGLE_SIZE 个词的哈希（去重），词数不足时以单个词为片段"""
+    hashes = np.array([zlib.crc32(token.encode()) for token in tokens], dtype=np.uint64)
+    if len(hashes) < SHINGLE_SIZE:
+        return np.unique(hashes)
+    mixed = hashes[:len(hashes) - SHINGLE_SIZE + 1] * _MIX[0]
+    for offset in range(1, SHINGLE_SIZE):
+        mixed ^= hashes[offset:len(hashes) - SHINGLE_SIZE + 1 + offset] * _MIX[offset]
+    return np.unique(mixed)
+
+
+def signature(values: np.ndarray) -> np.ndarray:
+    """片段哈希集合的 MinHash 签名 uint32[NUM_PERM]，空集合为全 0xFFFFFFFF"""
+    result = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(values), _BLOCK):
+        block = values[start:start + _BLOCK]
+        # 乘加取高 32 位（按 2^64 回绕）作为各哈希函数的值
+        hashed = ((_A[:, None] * block[None, :] + _B[:, None]) >> np.uint64(32)).astype(np.uint32)
+        np.minimum(result, hashed.min(axis=1), out=result)
+    return result
+
+
+def minhash_text_file(text_path: str) -> Optional[bytes]:
+    """文本文件的签名（在进程池中执行），以字节返回便于保存；没有文字时为 None"""
+    with open(text_path, encoding="utf-8") as file:
+        values = shingles(tokenize(file.read()))
+    return signature(values).tobytes() if len(values) else None
+
+
+def band_keys(packed: bytes) -> list[int]:
+    """各段的桶键（有符号 64 位整数，可直接存入 MongoDB），分词器版本不同的签名不会落入同一桶"""
+    values = np.frombuffer(packed, dtype=np.uint32)
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            values[band * ROWS:(band + 1) * ROWS].tobytes(),
+            digest_size=8,
+            person=f"{TOKENIZER_VERSION}:{band}".encode(),
+        ).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def similarity(first: bytes, second: bytes) -> float:
+    """由两个签名估计的 Jaccard 相似度"""
+    return float(np.mean(np.frombuffer(first, dtype=np.uint32) == np.frombuffer(second, dtype=np.uint32)))
@@ -0,0 +1,161 @@
+"""
+倒排索引的磁盘段
+
+段写入后不再修改，每个段是一个目录，包含以下 .npy 文件（以 mmap 方式加载，多个进程共享页缓存）:
+    term_hashes   uint64[T]  词的 64 位哈希，升序，用二分查找定位
+    term_offsets  int64[T+1] 每个词的倒排表在 postings 中的起止位置
+    doc_ids       uint32[P]  倒排表：段内文档序号
+    term_freqs    uint16[P]  倒排表：词频
+    doc_lengths   uint32[D]  文档长度（词数）
+    keys          S24[D]     文档键（论文 id 的十六进制）
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from collections import Counter
+from typing import Optional, Sequence
+
+import numpy as np
+
+_ARRAYS = ("term_hashes", "term_offsets", "doc_ids", "term_freqs", "doc_lengths", "keys")
+
+KEY_DTYPE = np.dtype("S24")
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+
+
+class Segment:
+    """只读段，数组以 mmap 方式打开"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = os.path.basename(path)
+        for array in _ARRAYS:
+            setattr(self, array, np.load(os.path.join(path, f"{array}.npy"), mmap_mode="r"))
+        self.term_hashes: np.ndarray
+        self.term_offsets: np.ndarray
+        self.doc_ids: np.ndarray
+        self.term_freqs: np.ndarray
+        self.doc_lengths: np.ndarray
+        self.keys: np.ndarray
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.keys)
+
+    def postings(self, hashed: int) -> tuple[np.ndarray, np.ndarray]:
+        """返回词的 (段内文档序号, 词频)，词不存在时为空数组"""
+        index = int(np.searchsorted(self.term_hashes, np.uint64(hashed)))
+        if index >= len(self.term_hashes) or int(self.term_hashes[index]) != hashed:
+            return _EMPTY_DOCS, _EMPTY_FREQS
+        start, end = int(self.term_offsets[index]), int(self.term_offsets[index + 1])
+        return self.doc_ids[start:end], self.term_freqs[start:end]
+
+    def find(self, key: str) -> np.ndarray:
+        """文档键对应的段内序号"""
+        return np.flatnonzero(self.keys == key.encode())
+
+
+_EMPTY_DOCS = np.zeros(0, dtype=np.uint32)
+_EMPTY_FREQS = np.zeros(0, dtype=np.uint16)
+
+
+def build_from_documents(directory: str, documents: Sequence[tuple[str, Sequence[str]]]) -> Optional[str]:
+    """由 (键, 词列表) 构建新段，返回段名；没有文档时返回 None"""
+    if not documents:
+        return None
+    hashes: list[int] = []
+    docs: list[int] = []
+    freqs: list[int] = []
+    lengths = np.zeros(len(documents), dtype=np.uint32)
+    # 同一批文档中的词只计算一次哈希
+    cache: dict[str, int] = {}
+    for local_id, (_, tokens) in enumerate(documents):
+        lengths[local_id] = len(tokens)
+        for term, count in Counter(tokens).items():
+            hashed = cache.get(term)
+            if hashed is None:
+                hashed = cache[term] = term_hash(term)
+            hashes.append(hashed)
+            docs.append(local_id)
+            freqs.append(min(count, np.iinfo(np.uint16).max))
+    keys = np.array([key.encode() for key, _ in documents], dtype=KEY_DTYPE)
+    return _write(
+        directory,
+        np.array(hashes, dtype=np.uint64),
+        np.array(docs, dtype=np.uint32),
+        np.array(freqs, dtype=np.uint16),
+        lengths,
+        keys,
+    )
+
+
+def merge(directory: str, segments: Sequence[Segment], deleted: dict[str, np.ndarray]) -> Optional[str]:
+    """合并多个段并丢弃已删除的文档，返回新段名；没有剩余文档时返回 None"""
+    hashes, docs, freqs, lengths, keys = [], [], [], [], []
+    base = 0
+    for segment in segments:
+        live = np.ones(segment.doc_count, dtype=bool)
+        live[deleted.get(segment.name, _EMPTY_DOCS)] = False
+        # 段内旧序号 -> 合并后的新序号
+        remap = np.cumsum(live, dtype=np.int64) - 1 + base
+        posting_terms = np.repeat(segment.term_hashes, np.diff(segment.term_offsets))
+        keep = live[segment.doc_ids]
+        hashes.append(posting_terms[keep])
+        docs.append(remap[segment.doc_ids[keep]].astype(np.uint32))
+        freqs.append(np.asarray(segment.term_freqs)[keep])
+        lengths.append(np.asarray(segment.doc_lengths)[live])
+        keys.append(np.asarray(segment.keys)[live])
+        base += int(live.sum())
+    if base == 0:
+        return None
+    return _write(
+        directory,
+        np.concatenate(hashes),
+        np.concatenate(docs),
+        np.concatenate(freqs),
+        np.concatenate(lengths),
+        np.concatenate(keys),
+    )
+
+
+def _write(
+    directory: str,
+    hashes: np.ndarray,
+    docs: np.ndarray,
+    freqs: np.ndarray,
+    lengths: np.ndarray,
+    keys: np.ndarray,
+) -> str:
+    """按 (词哈希, 文档序号) 排序后写出段，先写临时目录再改名"""
+    order = np.lexsort((docs, hashes))
+    hashes, docs, freqs = hashes[order], docs[order], freqs[order]
+    term_hashes, starts = np.unique(hashes, return_index=True)
+    term_offsets = np.append(starts, len(hashes)).astype(np.int64)
+
+    name = f"seg-{uuid.uuid4().hex[:16]}"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    os.makedirs(tmp_path)
+    try:
+        arrays = {
+            "term_hashes": term_hashes,
+            "term_offsets": term_offsets,
+            "doc_ids": docs,
+            "term_freqs": freqs,
+            "doc_lengths": lengths,
+            "keys": keys,
+        }
+        # 落盘后再改名，manifest 引用段时段文件已持久化
+        for array_name, array in arrays.items():
+            with open(os.path.join(tmp_path, f"{array_name}.npy"), "wb") as file:
+                np.save(file, array)
+                file.flush()
+                os.fsync(file.fileno())
+        os.rename(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return name
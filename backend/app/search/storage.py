@@ -0,0 +1,39 @@
+"""
+索引目录的公共操作：跨进程写锁和 JSON 文件的原子替换
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+@contextmanager
+def file_lock(directory: str) -> Iterator[None]:
+    """目录级独占写锁（flock，跨进程），目录不存在时创建"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "write.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_json(path: str, default: dict[str, Any]) -> dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            data: dict[str, Any] = json.load(file)
+            return data
+    except FileNotFoundError:
+        return default
+
+
+def write_json_atomic(path: str, data: dict[str, Any]) -> None:
+    """先写临时文件并落盘，再原子替换"""
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
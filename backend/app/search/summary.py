@@ -0,0 +1,249 @@
+"""
+论文的关键词和抽取式摘要
+
+关键词按 TF-IDF 排序：词频取对数，文档频率取自全文检索索引（语料越大越准确），
+英文词显示为其在文中第一次出现的形式（而不是词干）。
+摘要用 TextRank：句子表示为 TF-IDF 加权的词袋（哈希到 SUMMARY_DIM 维），句子间的余弦相似度
+作为边权，在相似度图上迭代 PageRank，取得分最高的 SUMMARY_SENTENCES 句按原文顺序拼接。
+
+一批论文一起计算：词频统计、文档频率、句子向量、相似度矩阵和 PageRank 迭代都是整批的数组运算
+（各论文补齐到相同的句子数后做批量矩阵乘法），只有分句和分词逐句进行。
+这里的函数在进程池中执行。修改算法或参数时需递增 SUMMARY_VERSION，已有结果会被重新计算。
+"""
+import re
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.search.embedding import STOPWORDS
+from app.search.index import SearchIndex
+from app.search.segment import term_hash
+from app.search.tokenizer import iter_tokens
+
+SUMMARY_VERSION = 1
+
+KEYWORD_COUNT = 10
+SUMMARY_SENTENCES = 5
+
+# 每篇论文参与 TextRank 的句子数（取最前面的句子，摘要和引言在论文开头）
+MAX_SENTENCES = 300
+# 关键词候选（去掉停用词、数字和单字）少于该数的句子、过长的句子（表格、参考文献）不参与
+MIN_SENTENCE_TERMS = 4
+MAX_SENTENCE_CHARS = 400
+
+SUMMARY_DIM = 512
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\f")
+# PDF 抽取的文本在句中换行：汉字之间的换行直接去掉，其他换行视为空格
+_CJK_BREAK_RE = re.compile(r"(?<=[^\x00-\x7f])\n(?=[^\x00-\x7f])")
+_SENTENCE_RE = re.compile(r"(?<=[。！？；])|(?<=[.!?;])\s+")
+_MARKUP_RE = re.compile(r"^[#>*+\-|\s]+")
+_LATIN_RE = re.compile(r"[0-9a-z]+")
+_CJK_END = "。！？；"
+
+# 常见的中文虚词和论文套话（英文停用词见 embedding.STOPWORDS），不作为关键词
+_ZH_STOPWORDS = frozenset(
+    "我们 本文 一种 一个 通过 进行 以及 可以 这个 这些 这种 其中 由于 因此 但是 如果 没有 他们 它们 "
+    "提出 使用 利用 基于 方法 研究 结果 表明 分析 问题 具有 能够 已经 同时 不同 其他 之间 对于 以下".split()
+)
+
+
+class ParsedDocument(NamedTuple):
+    # 参与 TextRank 的句子
+    sentences: list[str]
+    # 全文的关键词候选（词干），按出现顺序
+    terms: list[str]
+    # 每个候选所在的句子在 sentences 中的序号，不参与 TextRank 的句子为 -1
+    sentence_of: list[int]
+    # 词干 -> 第一次出现的形式
+    surfaces: dict[str, str]
+
+
+def split_sentences(text: str) -> list[str]:
+    """按段落和句末标点分句，去掉 Markdown 标记"""
+    sentences = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = _CJK_BREAK_RE.sub("", paragraph).replace("\n", " ")
+        for sentence in _SENTENCE_RE.split(paragraph):
+            sentence = _MARKUP_RE.sub("", " ".join(sentence.split()))
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _is_candidate(token: str) -> bool:
+    if token.isdigit() or token in STOPWORDS or token in _ZH_STOPWORDS:
+        return False
+    return len(token) >= (3 if token.isascii() else 2)
+
+
+def parse_document(text: str) -> ParsedDocument:
+    parsed = ParsedDocument([], [], [], {})
+    for sentence in split_sentences(text):
+        lowered = sentence.lower()
+        terms = []
+        covered = 0
+        for token, start in iter_tokens(sentence):
+            # 分词器另外产出的长词内的子词（"注意力" 中的 "注意"）不重复计数
+            if start < covered:
+                continue
+            match = _LATIN_RE.match(lowered, start) if token.isascii() else None
+            surface = match.group() if match else token
+            covered = start + len(surface)
+            if not _is_candidate(token):
+                continue
+            terms.append(token)
+            parsed.surfaces.setdefault(token, surface)
+        index = -1
+        if (
+            len(terms) >= MIN_SENTENCE_TERMS
+            and len(sentence) <= MAX_SENTENCE_CHARS
+            and len(parsed.sentences) < MAX_SENTENCES
+        ):
+            index = len(parsed.sentences)
+            parsed.sentences.append(sentence)
+        parsed.terms.extend(terms)
+        parsed.sentence_of.extend([index] * len(terms))
+    return parsed
+
+
+def summarize(
+    documents: Sequence[ParsedDocument], index: Optional[SearchIndex] = None
+) -> list[tuple[list[str], Optional[str]]]:
+    """批量计算 [(关键词, 摘要)]；不给出索引时文档频率只按这一批论文统计"""
+    results: list[tuple[list[str], Optional[str]]] = [([], None) for _ in documents]
+    lengths = np.array([len(document.terms) for document in documents], dtype=np.int64)
+    if not lengths.sum():
+        return results
+
+    vocabulary, term_ids = np.unique(
+        np.array([term for document in documents for term in document.terms]), return_inverse=True
+    )
+    doc_of = np.repeat(np.arange(len(documents)), lengths)
+    hashes = np.array([term_hash(term) for term in vocabulary], dtype=np.uint64)
+
+    # 每篇论文的 (词, 词频)
+    pairs, counts = np.unique(doc_of * len(vocabulary) + term_ids, return_counts=True)
+    pair_docs, pair_terms = np.divmod(pairs, len(vocabulary))
+    df = np.bincount(pair_terms, minlength=len(vocabulary))
+    doc_count = len(documents)
+    if index is not None:
+        # 当前这批论文已在索引中时，两者取较大值不会重复计算
+        df = np.maximum(df, index.document_frequencies(hashes))
+        doc_count = max(doc_count, index.doc_count)
+    idf = (np.log((1 + doc_count) / (1 + df)) + 1).astype(np.float32)
+
+    keywords = _keywords(documents, vocabulary, pair_docs, pair_terms, (1 + np.log(counts)) * idf[pair_terms])
+    summaries = _summaries(documents, term_ids, doc_of, hashes, idf)
+    return [(keywords[i], summaries[i]) for i in range(len(documents))]
+
+
+def _keywords(
+    documents: Sequence[ParsedDocument],
+    vocabulary: np.ndarray,
+    pair_docs: np.ndarray,
+    pair_terms: np.ndarray,
+    scores: np.ndarray,
+) -> list[list[str]]:
+    # 按 (论文, 得分降序) 排列，每篇只取前若干个候选再去重
+    order = np.lexsort((-scores, pair_docs))
+    pair_docs, pair_terms = pair_docs[order], pair_terms[order]
+    first = np.searchsorted(pair_docs, pair_docs)
+    keep = np.arange(len(pair_docs)) - first < KEYWORD_COUNT * 3
+
+    keywords: list[list[str]] = [[] for _ in documents]
+    for doc, term in zip(pair_docs[keep].tolist(), pair_terms[keep].tolist(), strict=True):
+        chosen = keywords[doc]
+        if len(chosen) >= KEYWORD_COUNT:
+            continue
+        surface = documents[doc].surfaces[str(vocabulary[term])]
+        # "学习" 已包含在 "机器学习" 中时不再列出（反之亦然）
+        if any(surface in other or other in surface for other in chosen):
+            continue
+        chosen.append(surface)
+    return keywords
+
+
+def _summaries(
+    documents: Sequence[ParsedDocument],
+    term_ids: np.ndarray,
+    doc_of: np.ndarray,
+    hashes: np.ndarray,
+    idf: np.ndarray,
+) -> list[Optional[str]]:
+    sizes = np.array([len(document.sentences) for document in documents], dtype=np.int64)
+    width = int(sizes.max())
+    if width == 0:
+        return [None] * len(documents)
+
+    # 句子向量 [论文, 句子, SUMMARY_DIM]：各词按 TF-IDF 加权，哈希的另一位决定正负号
+    sentence_of = np.array([index for document in documents for index in document.sentence_of], dtype=np.int64)
+    inside = sentence_of >= 0
+    rows = doc_of[inside] * width + sentence_of[inside]
+    terms = term_ids[inside]
+    cells, counts = np.unique(rows * len(hashes) + terms, return_counts=True)
+    rows, terms = np.divmod(cells, len(hashes))
+    columns = (hashes[terms] % np.uint64(SUMMARY_DIM)).astype(np.int64)
+    signs = np.where((hashes[terms] >> np.uint64(63)) == 1, -1.0, 1.0).astype(np.float32)
+    vectors = np.zeros((len(documents) * width, SUMMARY_DIM), dtype=np.float32)
+    np.add.at(vectors, (rows, columns), signs * (1 + np.log(counts)).astype(np.float32) * idf[terms])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    vectors = vectors.reshape(len(documents), width, SUMMARY_DIM)
+
+    # 相似度图（补齐的句子是零向量，没有边），按行归一化为转移概率
+    weights = np.maximum(vectors @ vectors.transpose(0, 2, 1), 0)
+    diagonal = np.arange(width)
+    weights[:, diagonal, diagonal] = 0
+    out_degree = weights.sum(axis=2, keepdims=True)
+    transition = np.divide(weights, out_degree, out=np.zeros_like(weights), where=out_degree > 0)
+
+    valid = diagonal[None, :] < sizes[:, None]
+    teleport = np.where(valid, (1 - DAMPING) / np.maximum(sizes, 1)[:, None], 0).astype(np.float32)
+    ranks = np.where(valid, 1 / np.maximum(sizes, 1)[:, None], 0).astype(np.float32)
+    for _ in range(MAX_ITERATIONS):
+        updated = teleport + DAMPING * np.einsum("bij,bi->bj", transition, ranks)
+        converged = float(np.abs(updated - ranks).max()) < TOLERANCE
+        ranks = updated
+        if converged:
+            break
+
+    ranks[~valid] = -np.inf
+    top = np.argsort(-ranks, axis=1, kind="stable")[:, :SUMMARY_SENTENCES]
+    summaries: list[Optional[str]] = []
+    for document, size, chosen in zip(documents, sizes.tolist(), top, strict=True):
+        selected = sorted(index for index in chosen.tolist() if index < size)
+        summaries.append(_join([document.sentences[index] for index in selected]) or None)
+    return summaries
+
+
+def _join(sentences: Sequence[str]) -> str:
+    text = ""
+    for sentence in sentences:
+        if text and text[-1] not in _CJK_END:
+            text += " "
+        text += sentence
+    return text
+
+
+def summarize_text_files(
+    index_directory: str, items: Sequence[tuple[str, str]]
+) -> list[tuple[str, list[str], Optional[str]]]:
+    """
+    批量计算文本文件的关键词和摘要（在进程池中执行），返回 [(键, 关键词, 摘要)]
+
+    文本缓存不存在的项被跳过。
+    """
+    keys, documents = [], []
+    for key, text_path in items:
+        try:
+            with open(text_path, encoding="utf-8") as file:
+                documents.append(parse_document(file.read()))
+        except FileNotFoundError:
+            continue
+        keys.append(key)
+    results = summarize(documents, SearchIndex(index_directory))
+    return [(key, keywords, summary) for key, (keywords, summary) in zip(keys, results, strict=True)]
@@ -0,0 +1,58 @@
+"""
+检索用的分词
+
+英文和数字按词切分并转为小写，英文词再做 Porter 词干提取（"networks" 与 "network" 视为同一词）；
+汉字按词典做最大概率分词（见 dictionary.py），较长的词另外产出其中包含的词典词，
+使查询 "学习" 也能命中 "机器学习"；日文假名、韩文没有词典，按相邻两字（bigram）切分。
+索引和查询必须使用同一个分词器，修改分词规则时需递增 TOKENIZER_VERSION，旧版本的索引会被重建。
+"""
+import re
+from typing import Iterator
+
+from app.search.dictionary import get_dictionary
+from app.search.porter import stem
+
+TOKENIZER_VERSION = 3
+
+# 长度超过该值的词额外产出其中的 2、3 字词典词
+_SUBWORD_MIN_LENGTH = 3
+
+_TOKEN_RE = re.compile(
+    r"(?P<latin>[0-9a-z]+)(?:['’](?:s|[a-z]+))?"
+    r"|(?P<han>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)"
+    r"|(?P<other>[\u3040-\u30ff\uac00-\ud7af]+)"
+)
+
+
+def iter_tokens(text: str) -> Iterator[tuple[str, int]]:
+    """逐个产出 (词, 在原文中的起始位置)"""
+    for match in _TOKEN_RE.finditer(text.lower()):
+        start = match.start()
+        if match.group("latin"):
+            token = match.group("latin")
+            yield (token if token.isdigit() else stem(token)), start
+        elif match.group("han"):
+            yield from _iter_han(match.group("han"), start)
+        else:
+            token = match.group("other")
+            if len(token) == 1:
+                yield token, start
+                continue
+            for offset in range(len(token) - 1):
+                yield token[offset:offset + 2], start + offset
+
+
+def _iter_han(run: str, base: int) -> Iterator[tuple[str, int]]:
+    dictionary = get_dictionary()
+    for start, end in dictionary.segment(run):
+        yield run[start:end], base + start
+        if end - start < _SUBWORD_MIN_LENGTH:
+            continue
+        for inner in range(start, end):
+            for inner_end, _ in dictionary.prefixes(run, inner, end):
+                if 2 <= inner_end - inner <= 3 and inner_end - inner < end - start:
+                    yield run[inner:inner_end], base + inner
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token, _ in iter_tokens(text)]
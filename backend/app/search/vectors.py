@@ -0,0 +1,563 @@
+"""
+文本块向量索引
+
+索引目录下的文件:
+    manifest.json      {"version": 版本号, "generation": 代, "embedding": 向量版本, "tokenizer": 分词器版本,
+                        "dim": 维度, "rows": 已提交的行数, "deleted": [[起, 止), ...],
+                        "ivf": {"name": 分区目录, "rows": 建分区时的行数, "lists": 分区数} 或 null}
+    vectors-<代>.f32   float32[rows, dim]，只追加，以 np.memmap 只读打开
+    rows-<代>.bin      ROW_DTYPE[rows]，每行向量所属的文档键和页码
+    ivf-<id>/          centroids.npy float32[lists, dim]，offsets.npy int64[lists+1]，
+                       members.npy uint32[M]（按分区排列的行号），
+                       vectors.npy float32[M, dim]（按分区排列的向量副本，查询时连续读取）
+
+写入在文件锁内完成：先追加数据文件，再原子替换 manifest；读取方只读取 manifest 记录的行数，
+写入中途崩溃留下的多余数据在下次写入时截掉。删除只记录墓碑区间，墓碑超过 COMPACT_RATIO 时
+把存活的行重写为新的一代。
+
+行数较少时逐块精确计算内积；达到 IVF_MIN_ROWS 后用球面 k-means 把向量划分为约 sqrt(N) 个分区，
+查询只扫描质心最接近的 nprobe 个分区，以及建分区之后追加的行；追加的行超过 IVF_REBUILD_RATIO 时重建分区。
+
+同一格式也用于文档向量（每个文档一行，为各块向量的均值），供相关论文使用。
+"""
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from app.search.embedding import (
+    EMBEDDING_DIM,
+    EMBEDDING_VERSION,
+    chunk_pages,
+    embed_tokens,
+)
+from app.search.storage import file_lock, read_json, write_json_atomic
+from app.search.tokenizer import TOKENIZER_VERSION
+
+ROW_DTYPE = np.dtype([("key", "S24"), ("page", "<u4")])
+
+IVF_MIN_ROWS = 50_000
+IVF_REBUILD_RATIO = 0.25
+IVF_MAX_LISTS = 1024
+# 每次查询至少扫描的分区数，分区较多时扫描 1/16 的分区
+IVF_NPROBE = 16
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_SAMPLE = 100_000
+
+COMPACT_RATIO = 0.25
+COMPACT_MIN_ROWS = 1024
+
+# 每次读入内存计算的行数
+BLOCK_ROWS = 65_536
+# 同一文档有多个块，按块取候选时多取的倍数
+CHUNK_OVERFETCH = 8
+# nearest_neighbors 每块得分矩阵的元素数上限（float32，约 64MB）
+NEIGHBOR_BLOCK_CELLS = 1 << 24
+
+MANIFEST = "manifest.json"
+
+
+def _empty_manifest() -> dict[str, Any]:
+    return {
+        "version": 0,
+        "generation": 0,
+        "embedding": EMBEDDING_VERSION,
+        "tokenizer": TOKENIZER_VERSION,
+        "dim": EMBEDDING_DIM,
+        "rows": 0,
+        "deleted": [],
+        "ivf": None,
+    }
+
+
+def read_vector_manifest(directory: str) -> dict[str, Any]:
+    return read_json(os.path.join(directory, MANIFEST), _empty_manifest())
+
+
+def _write_manifest(directory: str, manifest: dict[str, Any]) -> None:
+    manifest["version"] += 1
+    write_json_atomic(os.path.join(directory, MANIFEST), manifest)
+
+
+def _paths(directory: str, generation: int) -> tuple[str, str]:
+    return (
+        os.path.join(directory, f"vectors-{generation}.f32"),
+        os.path.join(directory, f"rows-{generation}.bin"),
+    )
+
+
+def _open_vectors(directory: str, manifest: dict[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+    """以 memmap 打开已提交的 (向量, 行信息)"""
+    rows = manifest["rows"]
+    if not rows:
+        return np.zeros((0, manifest["dim"]), dtype=np.float32), np.zeros(0, dtype=ROW_DTYPE)
+    vectors_path, rows_path = _paths(directory, manifest["generation"])
+    return (
+        np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, manifest["dim"])),
+        np.memmap(rows_path, dtype=ROW_DTYPE, mode="r", shape=(rows,)),
+    )
+
+
+def _deleted_mask(manifest: dict[str, Any]) -> np.ndarray:
+    mask = np.zeros(manifest["rows"], dtype=bool)
+    for start, end in manifest["deleted"]:
+        mask[start:end] = True
+    return mask
+
+
+def _ranges(mask: np.ndarray) -> list[list[int]]:
+    """布尔数组中连续为 True 的 [起, 止) 区间"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges.reshape(-1, 2).tolist()
+
+
+@contextmanager
+def _write_lock(directory: str) -> Iterator[dict[str, Any]]:
+    """独占写锁（跨进程），产出当前 manifest，退出时清理不再引用的文件"""
+    with file_lock(directory):
+        manifest = read_vector_manifest(directory)
+        _truncate_uncommitted(directory, manifest)
+        yield manifest
+        _remove_unused_files(directory, manifest)
+
+
+def _truncate_uncommitted(directory: str, manifest: dict[str, Any]) -> None:
+    vectors_path, rows_path = _paths(directory, manifest["generation"])
+    sizes = (
+        (vectors_path, manifest["rows"] * manifest["dim"] * 4),
+        (rows_path, manifest["rows"] * ROW_DTYPE.itemsize),
+    )
+    for path, size in sizes:
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+
+
+def _remove_unused_files(directory: str, manifest: dict[str, Any]) -> None:
+    # 已打开这些文件的读取方持有 mmap，删除不影响其读取
+    used = set(_paths(directory, manifest["generation"]))
+    ivf = manifest["ivf"]["name"] if manifest["ivf"] else None
+    for entry in os.scandir(directory):
+        if entry.name.startswith(("vectors-", "rows-")) and entry.path not in used:
+            os.remove(entry.path)
+        elif entry.is_dir() and entry.name.startswith(("ivf-", ".ivf-")) and entry.name != ivf:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _tombstone(directory: str, manifest: dict[str, Any], keys: Sequence[str]) -> int:
+    """标记这些键的现有向量为已删除，返回标记的行数"""
+    if not manifest["rows"] or not keys:
+        return 0
+    _, rows = _open_vectors(directory, manifest)
+    deleted = _deleted_mask(manifest)
+    hits = np.isin(rows["key"], [key.encode() for key in keys]) & ~deleted
+    removed = int(hits.sum())
+    if removed:
+        manifest["deleted"] = _ranges(deleted | hits)
+    return removed
+
+
+def _maybe_compact(directory: str, manifest: dict[str, Any]) -> None:
+    """墓碑过多时把存活的行重写为新的一代（同时丢弃分区）"""
+    deleted = _deleted_mask(manifest)
+    if manifest["rows"] < COMPACT_MIN_ROWS or deleted.sum() <= COMPACT_RATIO * manifest["rows"]:
+        return
+    vectors, rows = _open_vectors(directory, manifest)
+    live = np.flatnonzero(~deleted)
+    generation = manifest["generation"] + 1
+    vectors_path, rows_path = _paths(directory, generation)
+    with open(vectors_path, "wb") as vectors_file, open(rows_path, "wb") as rows_file:
+        for start in range(0, len(live), BLOCK_ROWS):
+            block = live[start:start + BLOCK_ROWS]
+            vectors_file.write(np.ascontiguousarray(vectors[block]).tobytes())
+            rows_file.write(np.ascontiguousarray(rows[block]).tobytes())
+        for file in (vectors_file, rows_file):
+            file.flush()
+            os.fsync(file.fileno())
+    manifest.update(generation=generation, rows=len(live), deleted=[], ivf=None)
+
+
+def _maybe_build_ivf(directory: str, manifest: dict[str, Any]) -> None:
+    ivf = manifest["ivf"]
+    if manifest["rows"] < IVF_MIN_ROWS:
+        manifest["ivf"] = None
+    elif ivf is None or manifest["rows"] - ivf["rows"] > IVF_REBUILD_RATIO * ivf["rows"]:
+        manifest["ivf"] = _build_ivf(directory, manifest)
+
+
+def _build_ivf(directory: str, manifest: dict[str, Any]) -> dict[str, Any]:
+    """对存活的行做球面 k-means 分区，写入新的分区目录"""
+    vectors, _ = _open_vectors(directory, manifest)
+    live = np.flatnonzero(~_deleted_mask(manifest))
+    lists = int(np.clip(np.sqrt(len(live)), 16, IVF_MAX_LISTS))
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(live, size=min(len(live), KMEANS_MAX_SAMPLE), replace=False))
+    centroids = _kmeans(np.asarray(vectors[sample]), lists, rng)
+
+    assignments = np.concatenate([
+        _nearest(np.asarray(vectors[live[start:start + BLOCK_ROWS]]), centroids)
+        for start in range(0, len(live), BLOCK_ROWS)
+    ])
+    order = np.argsort(assignments, kind="stable")
+    members = live[order].astype(np.uint32)
+    offsets = np.searchsorted(assignments[order], np.arange(lists + 1)).astype(np.int64)
+
+    name = f"ivf-{uuid.uuid4().hex[:16]}"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    os.makedirs(tmp_path)
+    try:
+        np.save(os.path.join(tmp_path, "centroids.npy"), centroids)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "members.npy"), members)
+        copy = np.lib.format.open_memmap(
+            os.path.join(tmp_path, "vectors.npy"),
+            mode="w+",
+            dtype=np.float32,
+            shape=(len(members), vectors.shape[1]),
+        )
+        for start in range(0, len(members), BLOCK_ROWS):
+            copy[start:start + BLOCK_ROWS] = vectors[members[start:start + BLOCK_ROWS]]
+        copy.flush()
+        del copy
+        os.rename(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return {"name": name, "rows": manifest["rows"], "lists": lists}
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    nearest: np.ndarray = np.argmax(vectors @ centroids.T, axis=1)
+    return nearest
+
+
+def _kmeans(sample: np.ndarray, lists: int, rng: np.random.Generator) -> np.ndarray:
+    """球面 k-means：按内积分配，质心归一化；空分区用随机样本重新初始化"""
+    centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = _nearest(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=lists)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms > 0, norms, 1)
+    return centroids.astype(np.float32)
+
+
+def add_vectors(directory: str, items: Sequence[tuple[str, np.ndarray, Sequence[int]]]) -> int:
+    """追加 (键, 向量 [n, dim], 页码 [n])，已存在的同键向量会被替换，返回追加的行数"""
+    added = 0
+    with _write_lock(directory) as manifest:
+        _tombstone(directory, manifest, [key for key, _, _ in items])
+        vectors_path, rows_path = _paths(directory, manifest["generation"])
+        with open(vectors_path, "ab") as vectors_file, open(rows_path, "ab") as rows_file:
+            for key, vectors, pages in items:
+                rows = np.zeros(len(vectors), dtype=ROW_DTYPE)
+                rows["key"] = key.encode()
+                rows["page"] = pages
+                vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                rows_file.write(rows.tobytes())
+                added += len(vectors)
+            for file in (vectors_file, rows_file):
+                file.flush()
+                os.fsync(file.fileno())
+        manifest["rows"] += added
+        _maybe_compact(directory, manifest)
+        _maybe_build_ivf(directory, manifest)
+        _write_manifest(directory, manifest)
+    return added
+
+
+def remove_vectors(directory: str, keys: Sequence[str]) -> int:
+    """删除文档的向量（记录墓碑），返回删除的行数"""
+    if not os.path.isfile(os.path.join(directory, MANIFEST)):
+        return 0
+    with _write_lock(directory) as manifest:
+        removed = _tombstone(directory, manifest, keys)
+        if removed:
+            _maybe_compact(directory, manifest)
+            _write_manifest(directory, manifest)
+    return removed
+
+
+def _embed_file(text_path: str) -> tuple[np.ndarray, list[int]]:
+    with open(text_path, encoding="utf-8") as file:
+        chunks = chunk_pages(file.read().split("\f"))
+    vectors = np.zeros((len(chunks), EMBEDDING_DIM), dtype=np.float32)
+    for row, (_, tokens) in enumerate(chunks):
+        vectors[row] = embed_tokens(tokens)
+    return vectors, [page for page, _ in chunks]
+
+
+def _document_vector(vectors: np.ndarray) -> np.ndarray:
+    """文档向量：各块向量的均值再归一化，[0 或 1, dim]"""
+    if not len(vectors):
+        return vectors
+    mean: np.ndarray = vectors.mean(axis=0, keepdims=True)
+    norm = float(np.linalg.norm(mean))
+    return mean / norm if norm else mean
+
+
+def embed_text_file(
+    directory: str, key: str, text_path: str, document_directory: Optional[str] = None
+) -> int:
+    """
+    把文本文件切块并计算向量后写入索引（在进程池中执行），返回块数
+
+    给出 document_directory 时同时把文档向量（每个文档一行）写入该索引。
+    """
+    vectors, pages = _embed_file(text_path)
+    add_vectors(directory, [(key, vectors, pages)])
+    if document_directory is not None:
+        document = _document_vector(vectors)
+        add_vectors(document_directory, [(key, document, [0] * len(document))])
+    return len(vectors)
+
+
+def embed_text_files(
+    directory: str, items: Sequence[tuple[str, str]], document_directory: Optional[str] = None
+) -> list[str]:
+    """批量处理 (键, 文本文件)（在进程池中执行），返回写入的键；文件不存在的跳过"""
+    batch = []
+    for key, text_path in items:
+        try:
+            vectors, pages = _embed_file(text_path)
+        except FileNotFoundError:
+            continue
+        batch.append((key, vectors, pages))
+    add_vectors(directory, batch)
+    if document_directory is not None:
+        documents = [(key, _document_vector(vectors)) for key, vectors, _ in batch]
+        add_vectors(document_directory, [(key, vector, [0] * len(vector)) for key, vector in documents])
+    return [key for key, _, _ in batch]
+
+
+def _open_live(directory: str) -> tuple[list[str], np.ndarray]:
+    """存活行的 (键, 向量)；读取 manifest 后数据文件被压缩替换时重新读取"""
+    try:
+        manifest = read_vector_manifest(directory)
+        vectors, rows = _open_vectors(directory, manifest)
+    except FileNotFoundError:
+        manifest = read_vector_manifest(directory)
+        vectors, rows = _open_vectors(directory, manifest)
+    live = np.flatnonzero(~_deleted_mask(manifest))
+    return [key.decode() for key in np.asarray(rows["key"])[live]], np.asarray(vectors[live])
+
+
+def live_keys(directory: str) -> list[str]:
+    """全部存活行的键（按行序）"""
+    return _open_live(directory)[0]
+
+
+def nearest_neighbors(
+    directory: str, k: int, keys: Optional[Sequence[str]] = None
+) -> list[tuple[str, list[tuple[str, float]]]]:
+    """
+    keys 中各文档的前 k 个最近邻（精确，分块矩阵乘法，在进程池中执行），默认为全部存活的文档
+
+    返回 [(键, [(近邻键, 得分), ...])]，近邻按得分降序；已删除的键被跳过。
+    大量文档时先取一次 live_keys 再分批调用，批次之间的删除和压缩不影响其余的键。
+    """
+    all_keys, matrix = _open_live(directory)
+    count = len(all_keys)
+    if keys is None:
+        targets = list(range(count))
+    else:
+        position = {key: index for index, key in enumerate(all_keys)}
+        targets = [position[key] for key in keys if key in position]
+    k = min(k, count - 1)
+    if k <= 0:
+        return [(all_keys[row], []) for row in targets]
+
+    result = []
+    # 每块的得分矩阵不超过 NEIGHBOR_BLOCK_CELLS 个元素
+    block = int(np.clip(NEIGHBOR_BLOCK_CELLS // count, 1, 4096))
+    for block_start in range(0, len(targets), block):
+        rows = targets[block_start:block_start + block]
+        similarity = matrix[rows] @ matrix.T
+        similarity[np.arange(len(rows)), rows] = -np.inf
+        top = np.argpartition(similarity, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        for offset, row in enumerate(rows):
+            result.append((
+                all_keys[row],
+                [
+                    (all_keys[index], score)
+                    for index, score in zip(top[offset].tolist(), top_scores[offset].tolist(), strict=True)
+                ],
+            ))
+    return result
+
+
+def replace_vectors_from(directory: str, staging: str) -> int:
+    """用 staging 目录中重建好的向量索引替换 directory 的索引，返回行数；替换后删除 staging"""
+    with _write_lock(staging) as staged, _write_lock(directory) as manifest:
+        generation = manifest["generation"] + 1
+        for source, target in zip(
+            _paths(staging, staged["generation"]), _paths(directory, generation), strict=True
+        ):
+            if os.path.exists(source):
+                os.rename(source, target)
+        if staged["ivf"]:
+            os.rename(os.path.join(staging, staged["ivf"]["name"]), os.path.join(directory, staged["ivf"]["name"]))
+        for field in ("embedding", "tokenizer", "dim", "rows", "deleted", "ivf"):
+            manifest[field] = staged[field]
+        manifest["generation"] = generation
+        _write_manifest(directory, manifest)
+        staged["ivf"] = None
+    shutil.rmtree(staging, ignore_errors=True)
+    return int(manifest["rows"])
+
+
+class VectorIndex:
+    """
+    向量索引的只读视图
+
+    每次查询前检查 manifest 是否变化，变化时重新打开数据文件。
+    """
+
+    def __init__(self, directory: str, nprobe: int = IVF_NPROBE) -> None:
+        self.directory = directory
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple[int, int]] = None
+        self._vectors = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._live = np.zeros(0, dtype=bool)
+        self._ivf: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]] = None
+
+    def refresh(self) -> None:
+        stamp = self._manifest_stamp()
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            try:
+                self._load(stamp)
+            except FileNotFoundError:
+                # 读取 manifest 后数据文件被压缩替换，重新读取最新的 manifest
+                self._load(self._manifest_stamp())
+
+    def _manifest_stamp(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self, stamp: Optional[tuple[int, int]]) -> None:
+        manifest = read_vector_manifest(self.directory)
+        vectors, rows = _open_vectors(self.directory, manifest)
+        ivf = None
+        if manifest["ivf"]:
+            path = os.path.join(self.directory, manifest["ivf"]["name"])
+            ivf = (
+                np.load(os.path.join(path, "centroids.npy")),
+                np.load(os.path.join(path, "offsets.npy")),
+                np.load(os.path.join(path, "members.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+                manifest["ivf"]["rows"],
+            )
+        self._vectors, self._rows, self._ivf = vectors, rows, ivf
+        self._live = ~_deleted_mask(manifest)
+        self._stamp = stamp
+
+    @property
+    def row_count(self) -> int:
+        self.refresh()
+        return int(self._live.sum())
+
+    def vectors_of(self, key: str) -> np.ndarray:
+        """文档的全部存活向量"""
+        self.refresh()
+        rows = np.flatnonzero((self._rows["key"] == key.encode()) & self._live)
+        return np.asarray(self._vectors[rows])
+
+    def search(self, query: np.ndarray, limit: int = 10, exclude: Sequence[str] = ()) -> list[tuple[str, int, float]]:
+        """
+        按内积（余弦相似度）检索，每个文档只取最相似的块
+
+        query 为单个向量 [dim] 或多个向量 [n, dim]（取各向量得分的最大值），
+        返回 [(键, 页码, 得分)]，按得分降序。
+        """
+        self.refresh()
+        vectors, rows, live = self._vectors, self._rows, self._live
+        if not len(vectors):
+            return []
+        queries = np.atleast_2d(np.asarray(query, dtype=np.float32))
+        fetch = (limit + len(exclude)) * CHUNK_OVERFETCH
+        if self._ivf is None:
+            candidates, scores = self._search_exact(vectors, live, queries, fetch)
+        else:
+            candidates, scores = self._search_ivf(vectors, live, queries, fetch)
+
+        excluded = {key.encode() for key in exclude}
+        hits: dict[bytes, tuple[int, float]] = {}
+        for row, score in zip(candidates.tolist(), scores.tolist(), strict=True):
+            key = bytes(rows["key"][row])
+            if key in excluded or key in hits or score <= 0:
+                continue
+            hits[key] = (int(rows["page"][row]), score)
+            if len(hits) >= limit:
+                break
+        return [(key.decode(), page, score) for key, (page, score) in hits.items()]
+
+    @staticmethod
+    def _score(block: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        scores: np.ndarray = (block @ queries.T).max(axis=1)
+        return scores
+
+    def _search_exact(
+        self, vectors: np.ndarray, live: np.ndarray, queries: np.ndarray, fetch: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """逐块计算全部行的得分，每块保留前 fetch 个候选"""
+        candidates, scores = [], []
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block_scores = self._score(np.asarray(vectors[start:start + BLOCK_ROWS]), queries)
+            block_scores[~live[start:start + BLOCK_ROWS]] = -np.inf
+            top = _top_k(block_scores, fetch)
+            candidates.append(top + start)
+            scores.append(block_scores[top])
+        return _merge_top(np.concatenate(candidates), np.concatenate(scores), fetch)
+
+    def _search_ivf(
+        self, vectors: np.ndarray, live: np.ndarray, queries: np.ndarray, fetch: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """扫描质心最接近的 nprobe 个分区和建分区之后追加的行"""
+        assert self._ivf is not None
+        centroids, offsets, members, list_vectors, covered = self._ivf
+        nprobe = max(self.nprobe, len(centroids) // 16)
+        probe = np.unique(np.argsort(-(queries @ centroids.T), axis=1)[:, :nprobe])
+        # 每个分区的向量连续存放，按分区切片读取
+        slices = [slice(int(offsets[index]), int(offsets[index + 1])) for index in probe]
+        rows = np.concatenate([members[part] for part in slices]).astype(np.int64)
+        scores = self._score(np.concatenate([list_vectors[part] for part in slices]), queries)
+        tail_rows, tail_scores = self._search_exact(vectors[covered:], live[covered:], queries, fetch)
+        rows = np.concatenate((rows, tail_rows + covered))
+        scores = np.concatenate((scores, tail_scores))
+        scores[~live[rows]] = -np.inf
+        return _merge_top(rows, scores, fetch)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """前 k 个下标（未排序）"""
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(scores, -k)[-k:]
+
+
+def _merge_top(rows: np.ndarray, scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    top = _top_k(scores, k)
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return rows[top], scores[top]
@@ -0,0 +1,75 @@
+import logging
+from typing import Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+
+from app.core.config import settings
+from app.models import Paper, PaperSignature
+from app.search.minhash import band_keys, similarity
+
+logger = logging.getLogger(__name__)
+
+# 每次最多比较的候选数（同一桶中的论文）
+_MAX_CANDIDATES = 200
+
+
+async def signature_for_content(content_hash: str) -> Optional[bytes]:
+    """相同内容的论文已计算过的签名"""
+    existing = await PaperSignature.find_one(PaperSignature.content_hash == content_hash)
+    return existing.signature if existing else None
+
+
+async def find_near_duplicate(
+    paper_id: PydanticObjectId, owner_id: Optional[PydanticObjectId], signature: bytes
+) -> Optional[tuple[PydanticObjectId, float]]:
+    """
+    通过 LSH 桶查找与签名最相似的同一用户的其他论文
+
+    只比较同一用户的、至少有一个桶相同的论文（走 (owner_id, buckets) 索引，不与全部论文比较），
+    估计相似度不低于 PAPER_NEAR_DUPLICATE_THRESHOLD 时返回 (论文 id, 相似度)；
+    相似度相同时取较早的论文。其他用户的论文不作为近似重复（不泄露他人上传过的内容）。
+    """
+    candidates = await PaperSignature.find(
+        PaperSignature.owner_id == owner_id,
+        In(PaperSignature.buckets, band_keys(signature)),
+        PaperSignature.id != paper_id,
+    ).limit(_MAX_CANDIDATES).to_list()
+    best: Optional[tuple[PydanticObjectId, float]] = None
+    for candidate in candidates:
+        score = similarity(signature, candidate.signature)
+        if score < settings.PAPER_NEAR_DUPLICATE_THRESHOLD:
+            continue
+        if best is None or score > best[1] or (score == best[1] and candidate.id < best[0]):
+            best = (candidate.id, score)
+    return best
+
+
+async def save_signature(
+    paper_id: PydanticObjectId, owner_id: Optional[PydanticObjectId], content_hash: str, signature: bytes
+) -> None:
+    await PaperSignature(
+        id=paper_id,
+        owner_id=owner_id,
+        content_hash=content_hash,
+        signature=signature,
+        buckets=band_keys(signature),
+    ).save()
+
+
+async def mark_near_duplicate(paper: Paper, match: Optional[tuple[PydanticObjectId, float]]) -> None:
+    """记录（或清除）论文的近似重复标记"""
+    paper.near_duplicate_of, paper.near_duplicate_score = match if match else (None, None)
+    await Paper.get_motor_collection().update_one(
+        {"_id": paper.id},
+        {"$set": {"near_duplicate_of": paper.near_duplicate_of, "near_duplicate_score": paper.near_duplicate_score}},
+    )
+
+
+async def remove_signature(paper_id: PydanticObjectId) -> None:
+    """删除论文的签名，并清除指向它的近似重复标记"""
+    await PaperSignature.get_motor_collection().delete_one({"_id": paper_id})
+    await Paper.get_motor_collection().update_many(
+        {"near_duplicate_of": paper_id},
+        {"$set": {"near_duplicate_of": None, "near_duplicate_score": None}},
+    )
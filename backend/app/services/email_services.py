@@ -0,0 +1,217 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import uuid4
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.exceptions.base import EmailNotConfigured
+from app.models import OutboxEmail
+from app.utils.email_helper import (
+    SMTPConnectionPool,
+    build_message,
+    is_permanent_failure,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _due_query(now: datetime) -> dict[str, Any]:
+    """到期的邮件，或租约已过期（发送任务崩溃）的发送中邮件"""
+    return {
+        "$or": [
+            {"status": "queued", "run_after": {"$lte": now}},
+            {"status": "sending", "locked_until": {"$lt": now}},
+        ]
+    }
+
+
+class EmailSender:
+    """
+    发件箱的后台发送任务
+
+    每轮认领最多 EMAIL_BATCH_SIZE 封到期的邮件，分给连接池中的各个连接在线程中并行发送
+    （每个连接依次发送分到的邮件），结果一次批量写回。本进程内入队时立即唤醒，
+    其他进程写入的邮件靠轮询发现。没有配置 SMTP 时不启动，邮件留在发件箱中。
+
+    指标:
+        email.sent / retried / failed  计数器
+        email.smtp_connects            建立过的 SMTP 连接数
+    """
+
+    def __init__(self) -> None:
+        self.pool = SMTPConnectionPool()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if not settings.emails_enabled:
+            logger.info("Email is not configured, outbox sender not started")
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="email-sender")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await run_in_threadpool(self.pool.close)
+
+    def wakeup(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def claim(self) -> list[OutboxEmail]:
+        """认领一批到期的邮件（同一租约标识），按 run_after 顺序"""
+        now = datetime.utcnow()
+        collection = OutboxEmail.get_motor_collection()
+        rows = await collection.find(_due_query(now), projection={"_id": 1}).sort("run_after", 1).limit(
+            settings.EMAIL_BATCH_SIZE
+        ).to_list(None)
+        if not rows:
+            return []
+        lease = uuid4().hex
+        # 条件中再次检查状态：其他进程同时认领时每封邮件只归一方
+        await collection.update_many(
+            {"_id": {"$in": [row["_id"] for row in rows]}, **_due_query(now)},
+            {
+                "$set": {
+                    "status": "sending",
+                    "lease": lease,
+                    "locked_until": now + timedelta(seconds=settings.EMAIL_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        documents = await collection.find({"lease": lease}).sort("run_after", 1).to_list(None)
+        return [OutboxEmail.model_validate(document) for document in documents]
+
+    async def run_once(self) -> int:
+        """认领并发送一批邮件，返回处理的封数"""
+        emails = await self.claim()
+        if not emails:
+            return 0
+        errors: list[Optional[Exception]] = [None] * len(emails)
+        messages = []
+        for index, email in enumerate(emails):
+            try:
+                messages.append((index, build_message(
+                    message_id=str(email.id),
+                    email_to=email.email_to,
+                    subject=email.subject,
+                    html_content=email.html_content,
+                )))
+            except ValueError as e:
+                # 地址或标题不合法，重试也不会成功
+                errors[index] = e
+
+        # 按连接数轮流分组，每组在一个线程中用一个连接发送
+        groups = [messages[start::self.pool.size] for start in range(self.pool.size)]
+        groups = [group for group in groups if group]
+        results = await asyncio.gather(*(
+            run_in_threadpool(self.pool.send_messages, [message for _, message in group]) for group in groups
+        ))
+        for group, group_errors in zip(groups, results, strict=True):
+            for (index, _), error in zip(group, group_errors, strict=True):
+                errors[index] = error
+        metrics.set_gauge("email.smtp_connects", self.pool.connects)
+
+        await self._record(emails, errors)
+        return len(emails)
+
+    async def _record(self, emails: list[OutboxEmail], errors: list[Optional[Exception]]) -> None:
+        now = datetime.utcnow()
+        expire_at = now + timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION_SECONDS)
+        operations = []
+        counts = {"sent": 0, "retried": 0, "failed": 0}
+        for email, error in zip(emails, errors, strict=True):
+            update: dict[str, Any] = {"lease": None, "locked_until": None}
+            if error is None:
+                # 正文可能含密码等，发送后不再保留
+                update.update(status="sent", sent_at=now, error=None, html_content="", expire_at=expire_at)
+                counts["sent"] += 1
+            else:
+                message = f"{type(error).__name__}: {error}"
+                if is_permanent_failure(error) or isinstance(error, ValueError) or email.attempts >= email.max_attempts:
+                    logger.error(f"Email {email.id} to {email.email_to} failed: {message}")
+                    update.update(status="failed", error=message, html_content="", expire_at=expire_at)
+                    counts["failed"] += 1
+                else:
+                    delay = settings.EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+                    logger.warning(f"Email {email.id} attempt {email.attempts} failed, retry in {delay}s: {message}")
+                    update.update(status="queued", error=message, run_after=now + timedelta(seconds=delay))
+                    counts["retried"] += 1
+            # 租约已过期并被其他发送任务重新认领时不覆盖
+            operations.append(UpdateOne({"_id": email.id, "lease": email.lease}, {"$set": update}))
+        await OutboxEmail.get_motor_collection().bulk_write(operations, ordered=False)
+        for name, count in counts.items():
+            if count:
+                metrics.incr(f"email.{name}", count)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                # 取满一批时可能还有到期的邮件，立即继续
+                if await self.run_once() >= settings.EMAIL_BATCH_SIZE:
+                    continue
+            except asyncio.CancelledError:
+                # 已认领的邮件在租约过期后重新发送
+                raise
+            except Exception as e:
+                logger.error(f"Email sender error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.EMAIL_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+email_sender = EmailSender()
+
+
+async def enqueue_email(
+    *, email_to: str, subject: str, html_content: str, dedup_key: Optional[str] = None
+) -> OutboxEmail:
+    """
+    写入发件箱，由后台发送任务发送
+
+    dedup_key 相同的邮件只保留第一封（重复请求返回已有的邮件）。没有配置 SMTP 时抛出
+    EmailNotConfigured（邮件不会被发送，不写入发件箱）。写入时即设置 expire_at，
+    发送任务长期未运行时正文（可能含重置令牌等）也不会永久保留。
+
+    异常:
+        EmailNotConfigured: 没有配置 SMTP
+    """
+    if not settings.emails_enabled:
+        raise EmailNotConfigured()
+    email = OutboxEmail(
+        email_to=email_to,
+        subject=subject,
+        html_content=html_content,
+        dedup_key=dedup_key,
+        max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+        expire_at=datetime.utcnow() + timedelta(seconds=settings.EMAIL_OUTBOX_RETENTION_SECONDS),
+    )
+    try:
+        await email.insert()
+    except DuplicateKeyError:
+        if dedup_key is None:
+            raise
+        existing = await OutboxEmail.find_one(OutboxEmail.dedup_key == dedup_key)
+        if existing is not None:
+            return existing
+        raise
+    email_sender.wakeup()
+    return email
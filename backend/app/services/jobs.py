@@ -0,0 +1,270 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class PermanentJobError(Exception):
+    """重试也不会成功的错误，任务直接标记为 failed"""
+
+
+class JobWorker:
+    """
+    MongoDB 任务队列的后台 worker
+
+    每个进程启动 concurrency 个协程轮询认领任务（find_one_and_update 保证同一任务只被一个 worker 认领），
+    按 kind 分发给注册的处理函数。本进程内入队时立即唤醒 worker，其他进程的任务靠轮询发现。
+
+    指标:
+        jobs.<kind>.done / retried / failed 计数器
+        jobs.running                        本进程正在执行的任务数
+    """
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, JobHandler] = {}
+        self._hooks: dict[str, list[Callable[[Job, bool], Awaitable[None]]]] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def on_finished(self, kind: str, hook: Callable[[Job, bool], Awaitable[None]]) -> None:
+        """注册任务结束（成功或最终失败）时的回调，参数为任务和是否成功"""
+        self._hooks.setdefault(kind, []).append(hook)
+
+    def start(self, concurrency: Optional[int] = None) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        for index in range(concurrency or settings.JOB_WORKER_CONCURRENCY):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"job-worker-{index}"))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Optional[dict[str, Any]] = None,
+        *,
+        paper_id: Any = None,
+        max_attempts: Optional[int] = None,
+        run_after: Optional[datetime] = None,
+        dedupe_key: Optional[str] = None,
+    ) -> Job:
+        """
+        登记任务，run_after 为最早执行时间（默认立即）
+
+        给出 dedupe_key 时，已有相同 dedupe_key 的排队或执行中任务则不重复登记，返回已有的任务。
+        判重依靠唯一索引，多个进程同时登记也只会插入一个任务。
+        """
+        while True:
+            job = Job(
+                kind=kind,
+                payload=payload or {},
+                paper_id=paper_id,
+                dedupe_key=dedupe_key,
+                max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+                run_after=run_after or datetime.utcnow(),
+            )
+            try:
+                await job.insert()
+                break
+            except DuplicateKeyError:
+                if dedupe_key is None:
+                    raise
+            pending = await Job.find_one(
+                {"dedupe_key": dedupe_key, "status": {"$in": ["queued", "running"]}}
+            )
+            # 已有的任务恰好在此期间结束时重新登记
+            if pending is not None:
+                return pending
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def schedule_once(
+        self,
+        kind: str,
+        run_after: datetime,
+        payload: Optional[dict[str, Any]] = None,
+        *,
+        queued_key: Optional[str] = None,
+    ) -> Job:
+        """
+        登记可以合并的任务（默认按 kind 合并，queued_key 可指定更细的合并范围）
+
+        已有排队中的同类任务时不重复登记，只在需要更早执行时提前其执行时间。执行中的任务不参与合并
+        （可能已经读取了变更前的数据）。判重依靠 queued_key 上的唯一索引，多个进程同时登记也只会
+        插入一个任务。
+        """
+        queued_key = queued_key or kind
+        collection = Job.get_motor_collection()
+        while True:
+            document = await collection.find_one_and_update(
+                {"queued_key": queued_key, "status": "queued"},
+                {"$min": {"run_after": run_after}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if document is not None:
+                job: Job = Job.model_validate(document)
+                break
+            job = Job(
+                kind=kind,
+                payload=payload or {},
+                queued_key=queued_key,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+                run_after=run_after,
+            )
+            try:
+                await job.insert()
+                break
+            except DuplicateKeyError:
+                # 其他进程刚刚登记了同类任务，合并到该任务
+                continue
+        if self._wakeup is not None and job.run_after <= datetime.utcnow():
+            self._wakeup.set()
+        return job
+
+    async def claim(self) -> Optional[Job]:
+        """认领一个到期的任务，或租约已过期（worker 崩溃）的运行中任务"""
+        now = datetime.utcnow()
+        document = await Job.get_motor_collection().find_one_and_update(
+            {
+                "kind": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": "queued", "run_after": {"$lte": now}},
+                    {"status": "running", "locked_until": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    # 认领后不再合并新登记的任务，失败重新排队时也不与新任务冲突
+                    "queued_key": None,
+                    "started_at": now,
+                    "locked_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return Job.model_validate(document) if document else None
+
+    async def run_once(self) -> bool:
+        """认领并执行一个任务，没有任务时返回 False"""
+        job = await self.claim()
+        if job is None:
+            return False
+        self._running += 1
+        metrics.set_gauge("jobs.running", self._running)
+        try:
+            await self._execute(job)
+        finally:
+            self._running -= 1
+            metrics.set_gauge("jobs.running", self._running)
+        return True
+
+    async def _execute(self, job: Job) -> None:
+        handler = self._handlers[job.kind]
+        collection = Job.get_motor_collection()
+        try:
+            await handler(job)
+        except asyncio.CancelledError:
+            # 进程退出：放回队列，由其他 worker 重新执行（不计入重试次数）
+            await collection.update_one(
+                {"_id": job.id},
+                {"$set": {"status": "queued", "locked_until": None}, "$inc": {"attempts": -1}},
+            )
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            permanent = isinstance(e, PermanentJobError)
+            if permanent or job.attempts >= job.max_attempts:
+                logger.error(f"Job {job.id} ({job.kind}) failed: {error}")
+                await collection.update_one(
+                    {"_id": job.id},
+                    {"$set": {
+                        "status": "failed",
+                        "error": error,
+                        "locked_until": None,
+                        "finished_at": datetime.utcnow(),
+                    }},
+                )
+                metrics.incr(f"jobs.{job.kind}.failed")
+                await self._finished(job, False)
+                return
+            delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retry in {delay}s: {error}")
+            await collection.update_one(
+                {"_id": job.id},
+                {"$set": {
+                    "status": "queued",
+                    "error": error,
+                    "locked_until": None,
+                    "run_after": datetime.utcnow() + timedelta(seconds=delay),
+                }},
+            )
+            metrics.incr(f"jobs.{job.kind}.retried")
+            return
+
+        await collection.update_one(
+            {"_id": job.id},
+            {"$set": {
+                "status": "done",
+                "progress": 1.0,
+                "error": None,
+                "locked_until": None,
+                "finished_at": datetime.utcnow(),
+            }},
+        )
+        metrics.incr(f"jobs.{job.kind}.done")
+        await self._finished(job, True)
+
+    async def _finished(self, job: Job, succeeded: bool) -> None:
+        for hook in self._hooks.get(job.kind, []):
+            try:
+                await hook(job, succeeded)
+            except Exception as e:
+                logger.error(f"Finish hook for job {job.id} failed: {e}")
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+            # 没有任务时等待入队唤醒或轮询间隔
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+job_worker = JobWorker()
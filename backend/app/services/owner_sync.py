@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+
+from beanie import PydanticObjectId
+
+from app.core.metrics import metrics
+from app.models import Item, Job, Paper, User
+from app.services.jobs import job_worker
+
+logger = logging.getLogger(__name__)
+
+OWNER_SYNC_JOB = "owner.sync"
+
+
+class OwnerSnapshotSync:
+    """
+    owner 快照的后台同步
+
+    用户的 email / full_name / is_active 变更后调用 schedule 登记同步任务，任务读取用户最新数据，
+    批量更新该用户所有 items / papers 中的 owner_snapshot。任务保存在任务队列中，进程重启不会丢失，
+    失败时按 JOB_RETRY_BACKOFF_SECONDS 退避重试。同一用户已有排队中的任务时多次变更合并为一次。
+
+    指标:
+        owner_sync.lag_seconds      最近一次同步从变更到完成的耗时
+        owner_sync.max_lag_seconds  同步耗时峰值
+        owner_sync.documents        已更新的文档数（计数器）
+        jobs.owner.sync.*           任务的完成 / 重试 / 失败次数
+    """
+
+    models = (Item, Paper)
+
+    async def schedule(self, user_id: PydanticObjectId) -> Job:
+        """登记一次用户变更，后台异步同步快照"""
+        # 只合并到排队中的任务：执行中的任务可能已经读取了变更前的用户数据
+        return await job_worker.schedule_once(
+            OWNER_SYNC_JOB,
+            datetime.utcnow(),
+            {"user_id": str(user_id)},
+            queued_key=f"{OWNER_SYNC_JOB}:{user_id}",
+        )
+
+    async def sync_user(self, user_id: PydanticObjectId) -> int:
+        """把用户的最新快照写入其所有 items / papers，返回更新的文档数"""
+        user = await User.get(user_id)
+        if user is None:
+            return 0
+        snapshot = user.to_snapshot().model_dump()
+        updated = 0
+        for model in self.models:
+            result = await model.get_motor_collection().update_many(
+                {"owner_id": user_id}, {"$set": {"owner_snapshot": snapshot}}
+            )
+            updated += result.modified_count
+        return updated
+
+    async def _run_job(self, job: Job) -> None:
+        updated = await self.sync_user(PydanticObjectId(job.payload["user_id"]))
+        lag = (datetime.utcnow() - job.created_at).total_seconds()
+        metrics.incr("owner_sync.documents", updated)
+        metrics.set_gauge("owner_sync.lag_seconds", lag)
+        metrics.max_gauge("owner_sync.max_lag_seconds", lag)
+
+
+owner_snapshot_sync = OwnerSnapshotSync()
+job_worker.register(OWNER_SYNC_JOB, owner_snapshot_sync._run_job)
@@ -0,0 +1,357 @@
+import glob
+import logging
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import GTE
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.exceptions.base import ServiceTimeout
+from app.models import Job, Paper, PaperListView
+from app.search import (
+    EMBEDDING_VERSION,
+    TOKENIZER_VERSION,
+    embed_text_file,
+    embed_text_files,
+    index_text_file,
+    index_text_files,
+    read_manifest,
+    read_vector_manifest,
+    replace_from,
+    replace_vectors_from,
+)
+from app.search.minhash import minhash_text_file
+from app.services import duplicate_services
+from app.services.jobs import PermanentJobError, job_worker
+from app.services.preview_services import generate_preview
+from app.services.process_pool import paper_process_pool
+from app.services.related_services import schedule_related_rebuild, update_related
+from app.services.search_services import (
+    document_vector_dir,
+    remove_from_indexes,
+    remove_paper_from_index,
+    search_index_dir,
+    vector_index_dir,
+)
+from app.services.summary_services import schedule_summaries
+from app.utils.file_helper import FileHelper
+from app.utils.text_helper import (
+    UnsupportedDocument,
+    adopt_text,
+    detect_format,
+    extract_to_cache,
+    index_text_path,
+    paper_text_path,
+    remove_paper_text,
+    text_cache_path,
+)
+
+logger = logging.getLogger(__name__)
+
+PAPER_PROCESS_JOB = "paper.process"
+SEARCH_REINDEX_JOB = "search.reindex"
+
+# 重建索引时每批处理的论文数（每批写成一个段）
+REINDEX_BATCH_SIZE = 200
+
+@dataclass
+class PaperContext:
+    """一次论文处理中各阶段共享的状态"""
+    paper: Paper
+    job: Job
+    source_path: str
+    text_path: str
+    # 写入全文检索索引的文本，采用近似重复原件的文本时与 text_path 不同
+    index_text_path: str
+    # 各阶段的产出，如抽取的页数
+    results: dict[str, Any] = field(default_factory=dict)
+
+
+Stage = Callable[[PaperContext], Awaitable[None]]
+
+
+class PaperProcessor:
+    """
+    论文处理流水线
+
+    按顺序执行 stages，每个阶段完成后更新任务进度并续租。
+    阶段以内容哈希为键缓存产出，相同内容的论文（重复上传）直接复用。
+    """
+
+    def __init__(self) -> None:
+        self.stages: list[tuple[str, Stage]] = []
+        self.file_helper = FileHelper(settings.DOWNLOAD_DIR)
+
+    def stage(self, name: str) -> Callable[[Stage], Stage]:
+        """注册处理阶段（按注册顺序执行）"""
+        def decorator(func: Stage) -> Stage:
+            self.stages.append((name, func))
+            return func
+        return decorator
+
+    async def run(self, job: Job) -> None:
+        paper = await Paper.get(job.paper_id)
+        if paper is None:
+            logger.info(f"Paper {job.paper_id} was deleted before processing")
+            return
+        if not paper.content_hash:
+            raise PermanentJobError("paper has no stored content")
+        source_path = self.file_helper.gen_full_path(paper.content_hash)
+        if not source_path:
+            raise PermanentJobError("paper file is missing")
+
+        await set_process_status(paper, "running")
+        text_path = text_cache_path(paper.content_hash)
+        context = PaperContext(
+            paper=paper,
+            job=job,
+            source_path=source_path,
+            text_path=text_path,
+            index_text_path=text_path,
+        )
+        for index, (name, stage) in enumerate(self.stages):
+            await job.set_progress(index / len(self.stages), name, settings.JOB_LEASE_SECONDS)
+            try:
+                await stage(context)
+            except ServiceTimeout as e:
+                # 同一文档重试仍会超时（如构造的 PDF），不再重试
+                raise PermanentJobError(f"stage {name} timed out") from e
+
+        paper.process_status = "done"
+        paper.processed_at = datetime.utcnow()
+        await Paper.get_motor_collection().update_one(
+            {"_id": paper.id},
+            {"$set": {"process_status": paper.process_status, "processed_at": paper.processed_at}},
+        )
+
+
+async def set_process_status(paper: Paper, status: Optional[str]) -> None:
+    paper.process_status = status
+    await Paper.get_motor_collection().update_one(
+        {"_id": paper.id}, {"$set": {"process_status": status}}
+    )
+
+
+paper_processor = PaperProcessor()
+
+
+@paper_processor.stage("extract")
+async def extract_text(context: PaperContext) -> None:
+    """抽取文本到缓存；相同内容已抽取过时跳过"""
+    if os.path.isfile(context.text_path):
+        context.results["text_reused"] = True
+        return
+    try:
+        context.results.update(
+            await paper_process_pool.run(extract_to_cache, context.source_path, context.text_path)
+        )
+    except UnsupportedDocument as e:
+        raise PermanentJobError(str(e)) from e
+
+
+@paper_processor.stage("dedup")
+async def detect_near_duplicate(context: PaperContext) -> None:
+    """
+    计算 MinHash 签名并通过 LSH 桶查找近似重复的论文
+
+    只与同一用户的论文比较，相同内容的论文直接复用签名。同一用户先后以 DOCX 和 PDF 上传
+    同一篇论文时，PDF 的全文检索改用 DOCX 抽取的文本（PDF 抽取会丢失段落、产生断字），
+    该文本按论文单独保存，内容哈希对应的缓存（页码、/pages、向量）仍使用 PDF 自身的文本。
+    """
+    paper = context.paper
+    assert paper.content_hash is not None
+    # 重新处理时先丢弃之前采用的文本
+    await run_in_threadpool(remove_paper_text, str(paper.id))
+    signature = await duplicate_services.signature_for_content(paper.content_hash)
+    if signature is None:
+        signature = await paper_process_pool.run(minhash_text_file, context.text_path)
+    if signature is None:
+        return
+    match = await duplicate_services.find_near_duplicate(paper.id, paper.owner_id, signature)
+    await duplicate_services.save_signature(paper.id, paper.owner_id, paper.content_hash, signature)
+    await duplicate_services.mark_near_duplicate(paper, match)
+    if match is None:
+        return
+    context.results["near_duplicate_of"] = str(match[0])
+    if match[1] >= settings.PAPER_TEXT_REUSE_THRESHOLD and await _reuse_original_text(context, match[0]):
+        context.results["text_reused_from"] = str(match[0])
+
+
+async def _reuse_original_text(context: PaperContext, original_id: PydanticObjectId) -> bool:
+    """PDF 论文的近似重复原件不是 PDF 时，全文检索改用原件抽取的文本"""
+    original = await Paper.get(original_id)
+    if original is None or not original.content_hash or original.content_hash == context.paper.content_hash:
+        return False
+    original_text_path = text_cache_path(original.content_hash)
+    original_path = paper_processor.file_helper.gen_full_path(original.content_hash)
+    if not original_path:
+        return False
+    dest_path = paper_text_path(str(context.paper.id))
+
+    def reuse() -> bool:
+        try:
+            if detect_format(context.source_path) != "pdf" or detect_format(original_path) == "pdf":
+                return False
+        except UnsupportedDocument:
+            return False
+        return adopt_text(original_text_path, dest_path)
+
+    if not await run_in_threadpool(reuse):
+        return False
+    context.index_text_path = dest_path
+    return True
+
+
+@paper_processor.stage("index")
+async def index_text(context: PaperContext) -> None:
+    """把抽取的文本（或采用的原件文本）加入全文检索索引"""
+    context.results["tokens"] = await paper_process_pool.run(
+        index_text_file, search_index_dir(), str(context.paper.id), context.index_text_path
+    )
+
+
+@paper_processor.stage("embed")
+async def embed_text(context: PaperContext) -> None:
+    """把文本切块计算向量，加入向量索引"""
+    context.results["chunks"] = await paper_process_pool.run(
+        embed_text_file, vector_index_dir(), str(context.paper.id), context.text_path, document_vector_dir()
+    )
+    # 处理期间论文被删除时，删除操作可能早于索引写入
+    if await Paper.get(context.paper.id) is None:
+        await remove_paper_from_index(context.paper.id)
+
+
+@paper_processor.stage("related")
+async def find_related(context: PaperContext) -> None:
+    """更新该论文及其近邻的相关论文列表"""
+    context.results["related"] = await update_related(context.paper.id)
+
+
+@paper_processor.stage("summary")
+async def schedule_summary(_context: PaperContext) -> None:
+    """登记关键词和摘要的批量计算（与同时处理的其他论文一起计算）"""
+    await schedule_summaries()
+
+
+@paper_processor.stage("preview")
+async def render_preview(context: PaperContext) -> None:
+    """Markdown / DOCX 论文生成 HTML 预览，同一内容只生成一次"""
+    assert context.paper.content_hash is not None
+    context.results["preview"] = await generate_preview(context.paper.content_hash)
+
+
+async def enqueue_paper_processing(paper: Paper) -> Job:
+    """论文创建后登记处理任务"""
+    await set_process_status(paper, "queued")
+    return await job_worker.enqueue(PAPER_PROCESS_JOB, paper_id=paper.id)
+
+
+async def _on_paper_job_finished(job: Job, succeeded: bool) -> None:
+    if succeeded:
+        return
+    paper = await Paper.get(job.paper_id)
+    if paper is not None:
+        await set_process_status(paper, "failed")
+
+
+def _indexes_current() -> bool:
+    manifest = read_manifest(search_index_dir())
+    vectors = [read_vector_manifest(path) for path in (vector_index_dir(), document_vector_dir())]
+    # 向量索引晚于全文检索引入，已有论文而没有向量索引时也需要重建
+    missing = os.path.isfile(os.path.join(search_index_dir(), "manifest.json")) and not all(
+        os.path.isfile(os.path.join(path, "manifest.json")) for path in (vector_index_dir(), document_vector_dir())
+    )
+    return (
+        manifest["tokenizer"] == TOKENIZER_VERSION
+        and all(v["tokenizer"] == TOKENIZER_VERSION and v["embedding"] == EMBEDDING_VERSION for v in vectors)
+        and not missing
+    )
+
+
+async def ensure_search_index_current() -> Optional[Job]:
+    """
+    启动时检查索引的分词器、向量版本，与当前版本不同时登记重建任务
+    （已有未完成的重建任务时不重复登记）
+    """
+    if await run_in_threadpool(_indexes_current):
+        return None
+    logger.info("Search indexes were built with an older tokenizer or embedding, rebuilding")
+    return await job_worker.enqueue(SEARCH_REINDEX_JOB, dedupe_key=SEARCH_REINDEX_JOB)
+
+
+def _reset_stagings(targets: tuple[str, ...], job: Job) -> tuple[str, ...]:
+    """
+    本任务的临时目录 <索引目录>.reindex-<任务 id>，清空后返回
+
+    同时只有一个重建任务，其他任务留下的临时目录（任务中途失败）一并删除。
+    """
+    stagings = tuple(f"{path}.reindex-{job.id}" for path in targets)
+    for path in targets:
+        for leftover in glob.glob(f"{glob.escape(path)}.reindex*"):
+            shutil.rmtree(leftover, ignore_errors=True)
+    return stagings
+
+
+async def reindex_papers(job: Job) -> None:
+    """
+    用当前分词器和向量重建全文检索索引和向量索引
+
+    在临时目录中分批重建，期间旧索引照常提供查询；完成后一次性替换。
+    重建开始后处理完成的论文已写入旧索引，替换后再补写一次；重建期间删除的论文替换后再删除。
+    """
+    targets = (search_index_dir(), vector_index_dir(), document_vector_dir())
+    stagings = await run_in_threadpool(_reset_stagings, targets, job)
+    started_at = datetime.utcnow()
+
+    async def index_batch(batch: list[tuple[str, str]], directories: tuple[str, ...]) -> list[str]:
+        directory, vector_directory, document_directory = directories
+        index_items = await run_in_threadpool(lambda: [(key, index_text_path(key, path)) for key, path in batch])
+        keys = await paper_process_pool.run(index_text_files, directory, index_items)
+        await paper_process_pool.run(embed_text_files, vector_directory, batch, document_directory)
+        return keys
+
+    query = Paper.find(Paper.process_status == "done", Paper.content_hash != None)  # noqa: E711
+    total = await query.count()
+    indexed: list[str] = []
+    batch: list[tuple[str, str]] = []
+    async for paper in query.project(PaperListView):
+        batch.append((str(paper.id), text_cache_path(paper.content_hash)))
+        if len(batch) >= REINDEX_BATCH_SIZE:
+            indexed += await index_batch(batch, stagings)
+            batch = []
+            await job.set_progress(len(indexed) / max(total, 1), "index", settings.JOB_LEASE_SECONDS)
+    indexed += await index_batch(batch, stagings)
+    await job.set_progress(1.0, "swap", settings.JOB_LEASE_SECONDS)
+    await run_in_threadpool(replace_from, targets[0], stagings[0])
+    for target, staging in zip(targets[1:], stagings[1:], strict=True):
+        await run_in_threadpool(replace_vectors_from, target, staging)
+
+    recent = [
+        (str(paper.id), text_cache_path(paper.content_hash))
+        async for paper in Paper.find(
+            Paper.process_status == "done", GTE(Paper.processed_at, started_at)
+        ).project(PaperListView)
+        if paper.content_hash
+    ]
+    if recent:
+        await index_batch(recent, targets)
+    cursor = Paper.get_motor_collection().find(
+        {"_id": {"$in": [PydanticObjectId(key) for key in indexed]}}, projection={"_id": 1}
+    )
+    existing = {str(document["_id"]) async for document in cursor}
+    missing = [key for key in indexed if key not in existing]
+    if missing:
+        await run_in_threadpool(remove_from_indexes, missing)
+    # 文档向量变化后相关论文需要全量重建
+    await schedule_related_rebuild(0)
+    logger.info(f"Rebuilt search indexes with {len(indexed)} papers")
+
+
+job_worker.register(PAPER_PROCESS_JOB, paper_processor.run)
+job_worker.on_finished(PAPER_PROCESS_JOB, _on_paper_job_finished)
+job_worker.register(SEARCH_REINDEX_JOB, reindex_papers)
@@ -1,19 +1,141 @@
+import logging
+from typing import Optional
+
+from beanie import PydanticObjectId
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.exceptions.base import ParamException
+from app.exceptions.paper_exceptions import PaperTextNotReady
+from app.models import Counter, Paper, PaperCreate, StoredFile, User
+from app.models.counter import owner_counter_key
+from app.models.papers import PaperPage, PaperPages
+from app.services.duplicate_services import remove_signature
+from app.services.paper_processing import enqueue_paper_processing
+from app.services.related_services import remove_related
+from app.services.search_services import remove_paper_from_index
+from app.utils.file_helper import FileHelper
+from app.utils.text_helper import read_page_range, remove_paper_text, remove_text_cache
+
+logger = logging.getLogger(__name__)
+
 
 class PaperService:
-    def __init__(self, paper_repository):
-        self.paper_repository = paper_repository
+    """论文的创建、删除和按页读取文本，负责内容寻址存储的引用计数"""
+
+    def __init__(self, file_helper: FileHelper | None = None):
+        self.file_helper = file_helper or FileHelper(settings.DOWNLOAD_DIR)
+
+    async def create_paper(self, *, owner: User, paper_create: PaperCreate, file: UploadFile) -> Paper:
+        """
+        保存上传文件并创建论文
+
+        文件按内容 SHA-256 存储，相同内容已存在时只增加引用并写入论文元数据，不再写盘。
+        """
+        content_hash, size, written = await self.file_helper.save_content_addressed(file)
+        try:
+            existed = await StoredFile.acquire(content_hash, size, file.content_type)
+        except Exception:
+            if written:
+                self.file_helper.remove_content(content_hash)
+            raise
+        if not existed and not written:
+            # 并发删除可能在写盘检查之后移除了文件，此时重新写入
+            content_hash, size, written = await self.file_helper.save_content_addressed(file)
+            logger.info(f"Reacquired released file {content_hash}, written={written}")
+
+        return await self._insert_paper(owner, paper_create, content_hash, size, file.filename)
+
+    async def create_paper_from_file(
+        self,
+        *,
+        owner: User,
+        paper_create: PaperCreate,
+        source_path: str,
+        filename: str,
+        content_type: Optional[str] = None,
+        paper_id: Optional[PydanticObjectId] = None,
+    ) -> Paper:
+        """
+        用已在本地磁盘上的完整文件（续传上传的结果）创建论文，源文件会被移走或删除
+
+        paper_id 为预先分配的论文 id（续传会话据此判断论文是否已经创建）。
+        """
+        content_hash, size = await self.file_helper.hash_file(source_path)
+        # 先增加引用再放置文件，避免并发删除在放置之后移除文件
+        existed = await StoredFile.acquire(content_hash, size, content_type)
+        try:
+            await self.file_helper.store_content_from_path(source_path, content_hash, overwrite=not existed)
+        except Exception:
+            await self._release_content(content_hash)
+            raise
+        return await self._insert_paper(owner, paper_create, content_hash, size, filename, paper_id)
 
-    def get_paper_by_id(self, paper_id):
-        return self.paper_repository.get_paper_by_id(paper_id)
+    async def _insert_paper(
+        self,
+        owner: User,
+        paper_create: PaperCreate,
+        content_hash: str,
+        size: int,
+        filename: Optional[str],
+        paper_id: Optional[PydanticObjectId] = None,
+    ) -> Paper:
+        paper_data = paper_create.model_dump()
+        if paper_id is not None:
+            paper_data["_id"] = paper_id
+        paper_data["owner"] = owner
+        paper_data["content_hash"] = content_hash
+        paper_data["file_size"] = size
+        # 下载地址在响应时签发，只保存原始文件名（过长时保留末尾的扩展名）
+        paper_data["download_name"] = filename[-255:] if filename else None
+        try:
+            paper = Paper.model_validate(paper_data)
+            await paper.insert()
+        except Exception:
+            # 论文没有创建，释放调用方增加的引用
+            await self._release_content(content_hash)
+            raise
+        await Counter.incr(owner_counter_key("papers", owner.id))
+        if paper.is_process:
+            await enqueue_paper_processing(paper)
+        return paper
 
-    def get_all_papers(self):
-        return self.paper_repository.get_all_papers()
+    async def _release_content(self, content_hash: str) -> None:
+        """减少一次引用，内容不再被引用时删除文件"""
+        if await StoredFile.release(content_hash):
+            self.file_helper.remove_content(content_hash)
 
-    def create_paper(self, paper_data):
-        return self.paper_repository.create_paper(paper_data)
+    async def read_pages(self, paper: Paper, first: int, last: Optional[int] = None) -> PaperPages:
+        """
+        读取第 first 到 last 页（从 1 开始，包含 last）的文本
 
-    def update_paper(self, paper_id, paper_data):
-        return self.paper_repository.update_paper(paper_id, paper_data)
+        通过处理时生成的页索引只读取请求的页，超出总页数的部分被忽略。
+        """
+        last = first if last is None else last
+        if last < first:
+            raise ParamException("to must not be less than from")
+        if last - first + 1 > settings.PAPER_PAGES_MAX_RANGE:
+            raise ParamException(f"at most {settings.PAPER_PAGES_MAX_RANGE} pages per request")
+        if not paper.content_hash:
+            raise PaperTextNotReady()
+        try:
+            page_count, texts = await run_in_threadpool(read_page_range, paper.content_hash, first - 1, last)
+        except FileNotFoundError:
+            raise PaperTextNotReady()
+        return PaperPages(
+            page_count=page_count,
+            pages=[PaperPage(number=first + offset, text=text) for offset, text in enumerate(texts)],
+        )
 
-    def delete_paper(self, paper_id):
-        return self.paper_repository.delete_paper(paper_id)
\ No newline at end of file
+    async def delete_paper(self, paper: Paper) -> None:
+        """删除论文，内容不再被引用时删除文件和抽取的文本"""
+        await paper.delete()
+        await Counter.incr(owner_counter_key("papers", paper.owner_id), -1)
+        await remove_paper_from_index(paper.id)
+        await remove_related(paper.id)
+        await remove_signature(paper.id)
+        remove_paper_text(str(paper.id))
+        if paper.content_hash and await StoredFile.release(paper.content_hash):
+            self.file_helper.remove_content(paper.content_hash)
+            remove_text_cache(paper.content_hash)
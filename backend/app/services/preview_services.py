@@ -0,0 +1,109 @@
+import logging
+import os
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.exceptions.base import ServiceTimeout
+from app.exceptions.paper_exceptions import PreviewNotReady, PreviewUnsupported
+from app.models import Job, Paper
+from app.services.jobs import PermanentJobError, job_worker
+from app.services.process_pool import paper_process_pool
+from app.utils.file_helper import FileHelper
+from app.utils.preview_helper import (
+    PREVIEW_FORMATS,
+    TocEntry,
+    evict_previews,
+    preview_paths,
+    read_toc,
+    render_to_cache,
+    touch,
+)
+from app.utils.text_helper import UnsupportedDocument, detect_format
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_JOB = "paper.preview"
+
+_file_helper = FileHelper(settings.DOWNLOAD_DIR)
+
+
+def _preview_format(source_path: str) -> Optional[str]:
+    try:
+        document_format = detect_format(source_path)
+    except (UnsupportedDocument, FileNotFoundError):
+        return None
+    return document_format if document_format in PREVIEW_FORMATS else None
+
+
+async def generate_preview(content_hash: str) -> bool:
+    """
+    生成内容的预览并按缓存上限淘汰旧预览
+
+    已有预览或格式不支持预览时返回 False。
+    """
+    html_path, toc_path = preview_paths(content_hash)
+    if os.path.isfile(html_path):
+        return False
+    source_path = _file_helper.gen_full_path(content_hash)
+    if not source_path or not await run_in_threadpool(_preview_format, source_path):
+        return False
+    try:
+        size = await paper_process_pool.run(render_to_cache, source_path, html_path, toc_path)
+    except UnsupportedDocument as e:
+        raise PermanentJobError(str(e)) from e
+    except ServiceTimeout as e:
+        raise PermanentJobError("preview rendering timed out") from e
+    removed = await run_in_threadpool(evict_previews, settings.PAPER_PREVIEW_CACHE_MAX_BYTES)
+    logger.info(f"Rendered preview of {content_hash} ({size} bytes), evicted {removed}")
+    return True
+
+
+async def _run_preview_job(job: Job) -> None:
+    await generate_preview(job.payload["content_hash"])
+
+
+async def schedule_preview(content_hash: str) -> Job:
+    """登记预览生成（同一内容已在排队或生成中时不重复登记）"""
+    return await job_worker.enqueue(
+        PREVIEW_JOB, {"content_hash": content_hash}, dedupe_key=f"{PREVIEW_JOB}:{content_hash}"
+    )
+
+
+async def _require_preview(paper: Paper) -> str:
+    """
+    预览 HTML 的路径
+
+    预览还没有生成（或已被淘汰）时登记生成并抛出 PreviewNotReady，客户端稍后重试。
+    """
+    if not paper.content_hash:
+        raise PreviewUnsupported()
+    html_path = preview_paths(paper.content_hash)[0]
+    if os.path.isfile(html_path):
+        return html_path
+    source_path = _file_helper.gen_full_path(paper.content_hash)
+    if not source_path or not await run_in_threadpool(_preview_format, source_path):
+        raise PreviewUnsupported()
+    await schedule_preview(paper.content_hash)
+    raise PreviewNotReady()
+
+
+async def preview_html_path(paper: Paper) -> str:
+    html_path = await _require_preview(paper)
+    await run_in_threadpool(touch, html_path)
+    return html_path
+
+
+async def preview_toc(paper: Paper) -> list[TocEntry]:
+    await _require_preview(paper)
+    assert paper.content_hash is not None
+    toc = await run_in_threadpool(read_toc, paper.content_hash)
+    if toc is None:
+        # 读取前刚好被淘汰
+        await schedule_preview(paper.content_hash)
+        raise PreviewNotReady()
+    return toc
+
+
+job_worker.register(PREVIEW_JOB, _run_preview_job)
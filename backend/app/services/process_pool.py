@@ -0,0 +1,11 @@
+from app.core.config import settings
+from app.core.executor import BoundedExecutor
+
+# 文本抽取等 CPU 密集型工作在独立进程中执行，不占用请求所在的 worker
+paper_process_pool = BoundedExecutor(
+    name="paper_process",
+    kind="process",
+    max_workers=settings.JOB_WORKER_CONCURRENCY,
+    max_queue=settings.JOB_WORKER_CONCURRENCY,
+    timeout=settings.PAPER_PROCESS_TIMEOUT_SECONDS,
+)
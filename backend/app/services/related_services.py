@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReplaceOne
+
+from app.core.config import settings
+from app.models import Job, Paper, PaperListView, PaperPublic
+from app.models.related import RelatedNeighbor, RelatedPaper, RelatedPapers
+from app.search import VectorIndex, live_keys, nearest_neighbors
+from app.services.jobs import job_worker
+from app.services.process_pool import paper_process_pool
+from app.services.search_services import document_vector_dir
+
+logger = logging.getLogger(__name__)
+
+RELATED_REBUILD_JOB = "related.rebuild"
+
+# 全量重建时每次在进程池中计算的论文数
+_REBUILD_ROWS = 2000
+
+# 文档向量（每篇论文一行）的只读视图
+document_vector_index = VectorIndex(document_vector_dir())
+
+
+async def read_related(
+    paper_id: PydanticObjectId,
+    limit: int = 10,
+    owner_id: Optional[PydanticObjectId] = None,
+) -> list[RelatedPaper]:
+    """读取预先计算的相关论文（不与全部论文比较），已删除的论文被跳过"""
+    related = await RelatedPapers.get(paper_id)
+    if related is None or not related.neighbors:
+        return []
+    scores = {neighbor.paper_id: neighbor.score for neighbor in related.neighbors}
+    owner_filter = [Paper.owner_id == owner_id] if owner_id else []
+    rows = await Paper.find(In(Paper.id, list(scores)), *owner_filter).project(PaperListView).to_list()
+    rows.sort(key=lambda row: scores[row.id], reverse=True)
+    publics = await PaperPublic.from_items(rows[:limit])
+    return [RelatedPaper(paper=public, score=scores[public.id]) for public in publics]
+
+
+async def update_related(paper_id: PydanticObjectId) -> int:
+    """
+    论文处理完成后增量更新相关论文
+
+    用论文的文档向量在向量索引中检索前 k 个近邻作为自身的列表，
+    再把该论文按得分插入这些近邻各自的列表（只更新受影响的列表），返回近邻数。
+    """
+    key = str(paper_id)
+    k = settings.RELATED_PAPERS_K
+
+    def search() -> list[tuple[str, int, float]]:
+        vector = document_vector_index.vectors_of(key)
+        if not len(vector):
+            return []
+        return document_vector_index.search(vector, limit=k, exclude=[key])
+
+    hits = await run_in_threadpool(search)
+    neighbors = [RelatedNeighbor(paper_id=PydanticObjectId(other), score=score) for other, _, score in hits]
+    await RelatedPapers(id=paper_id, neighbors=neighbors).save()
+
+    operations = []
+    for neighbor in neighbors:
+        operations += RelatedPapers.offer(neighbor.paper_id, paper_id, neighbor.score, k)
+    if operations:
+        await RelatedPapers.get_motor_collection().bulk_write(operations, ordered=True)
+    return len(neighbors)
+
+
+async def remove_related(paper_id: PydanticObjectId) -> None:
+    """删除论文的列表，并把它从其他论文的列表中移除"""
+    collection = RelatedPapers.get_motor_collection()
+    await collection.delete_one({"_id": paper_id})
+    await collection.update_many(
+        {"neighbors.paper_id": paper_id}, {"$pull": {"neighbors": {"paper_id": paper_id}}}
+    )
+
+
+async def rebuild_related(job: Job) -> None:
+    """
+    全量重建所有论文的相关论文列表（分块矩阵乘法计算精确的前 k 个近邻）
+
+    开始时取一次全部论文的键，按 _REBUILD_ROWS 篇一批在进程池中计算并写入，
+    批次之间的删除和压缩不会使其他论文被跳过；期间处理完成的论文由增量更新覆盖。
+    """
+    started_at = datetime.utcnow()
+    directory = document_vector_dir()
+    keys = await run_in_threadpool(live_keys, directory)
+    total = len(keys)
+    collection = RelatedPapers.get_motor_collection()
+    for start in range(0, total, _REBUILD_ROWS):
+        lists = await paper_process_pool.run(
+            nearest_neighbors, directory, settings.RELATED_PAPERS_K, keys[start:start + _REBUILD_ROWS]
+        )
+        operations = []
+        for key, neighbors in lists:
+            operations.append(ReplaceOne(
+                {"_id": PydanticObjectId(key)},
+                {
+                    "neighbors": [
+                        {"paper_id": PydanticObjectId(other), "score": score}
+                        for other, score in neighbors
+                        if score > 0
+                    ],
+                    "computed_at": datetime.utcnow(),
+                },
+                upsert=True,
+            ))
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+        await job.set_progress(min(start + _REBUILD_ROWS, total) / total, "rebuild", settings.JOB_LEASE_SECONDS)
+
+    # 开始时已不在向量索引中的论文（已删除）：其余论文的列表都已在本次重建中写入
+    await collection.delete_many({"computed_at": {"$lt": started_at}})
+    logger.info(f"Rebuilt related papers for {total} papers")
+
+
+async def schedule_related_rebuild(delay_seconds: Optional[float] = None) -> Job:
+    """登记全量重建，默认在 RELATED_REBUILD_INTERVAL_SECONDS 之后；已在排队时不重复登记"""
+    if delay_seconds is None:
+        delay_seconds = settings.RELATED_REBUILD_INTERVAL_SECONDS
+    run_after = datetime.utcnow() + timedelta(seconds=delay_seconds)
+    return await job_worker.schedule_once(RELATED_REBUILD_JOB, run_after)
+
+
+async def ensure_related_rebuild_scheduled() -> Job:
+    """启动时确保有待执行的全量重建任务；还没有任何列表时立即重建"""
+    has_lists = await RelatedPapers.find_one() is not None
+    return await schedule_related_rebuild(None if has_lists else 0)
+
+
+async def _on_rebuild_finished(_job: Job, _succeeded: bool) -> None:
+    # 无论成功与否都登记下一次
+    await schedule_related_rebuild()
+
+
+job_worker.register(RELATED_REBUILD_JOB, rebuild_related)
+job_worker.on_finished(RELATED_REBUILD_JOB, _on_rebuild_finished)
@@ -0,0 +1,129 @@
+import logging
+import os
+from typing import Literal, Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import Paper, PaperListView, PaperPublic
+from app.models.papers import PaperSearchHit
+from app.search import (
+    SearchIndex,
+    VectorIndex,
+    embed_text,
+    make_snippet,
+    remove_documents,
+    remove_vectors,
+)
+from app.utils.text_helper import read_page_range, text_cache_path
+
+logger = logging.getLogger(__name__)
+
+# 只按所有者过滤时多取的候选倍数
+_OWNER_FILTER_OVERFETCH = 5
+
+SearchMode = Literal["keyword", "semantic"]
+
+
+def search_index_dir() -> str:
+    return os.path.join(settings.PAPER_DATA_DIR, "search")
+
+
+def vector_index_dir() -> str:
+    return os.path.join(settings.PAPER_DATA_DIR, "vectors")
+
+
+def document_vector_dir() -> str:
+    """文档向量（每篇论文一行，用于相关论文）"""
+    return os.path.join(settings.PAPER_DATA_DIR, "paper_vectors")
+
+
+# 进程内共享的只读索引视图，索引文件变化时自动重新加载
+paper_search_index = SearchIndex(search_index_dir())
+paper_vector_index = VectorIndex(vector_index_dir())
+
+
+def _semantic_search(query: str, limit: int) -> list[tuple[str, float, Optional[int]]]:
+    return [
+        (key, score, page)
+        for key, page, score in paper_vector_index.search(embed_text(query), limit)
+    ]
+
+
+def _keyword_search(query: str, limit: int) -> list[tuple[str, float, Optional[int]]]:
+    return [(key, score, None) for key, score in paper_search_index.search(query, limit)]
+
+
+async def search_papers(
+    query: str,
+    limit: int = 10,
+    owner_id: Optional[PydanticObjectId] = None,
+    mode: SearchMode = "keyword",
+) -> list[PaperSearchHit]:
+    """
+    检索论文，返回按相关度排序的结果和摘录
+
+    keyword 为 BM25 全文检索；semantic 按文本块向量的余弦相似度检索，并返回最相似的块所在页。
+    """
+    fetch = limit * _OWNER_FILTER_OVERFETCH if owner_id else limit
+    search = _semantic_search if mode == "semantic" else _keyword_search
+    hits = await run_in_threadpool(search, query, fetch)
+    metrics.incr("search.queries")
+    if not hits:
+        return []
+
+    ids = [PydanticObjectId(key) for key, _, _ in hits]
+    owner_filter = [Paper.owner_id == owner_id] if owner_id else []
+    rows = await Paper.find(In(Paper.id, ids), *owner_filter).project(PaperListView).to_list()
+    by_id = {row.id: row for row in rows}
+    ordered = [
+        (by_id[paper_id], score, page)
+        for paper_id, (_, score, page) in zip(ids, hits, strict=True)
+        if paper_id in by_id
+    ]
+    ordered = ordered[:limit]
+
+    publics = {public.id: public for public in await PaperPublic.from_items([row for row, _, _ in ordered])}
+    snippets = await run_in_threadpool(
+        lambda: [_snippet(row.content_hash, query, page) for row, _, page in ordered]
+    )
+    return [
+        PaperSearchHit(
+            paper=publics[row.id],
+            score=score,
+            snippet=snippet,
+            page=page + 1 if page is not None else None,
+        )
+        for (row, score, page), snippet in zip(ordered, snippets, strict=True)
+        if row.id in publics
+    ]
+
+
+def _snippet(content_hash: Optional[str], query: str, page: Optional[int] = None) -> str:
+    """命中位置附近的摘录；给出页码时只在该页中查找"""
+    if not content_hash:
+        return ""
+    try:
+        if page is not None:
+            _, pages = read_page_range(content_hash, page, page + 1)
+            text = pages[0] if pages else ""
+        else:
+            with open(text_cache_path(content_hash), encoding="utf-8") as file:
+                text = file.read()
+    except FileNotFoundError:
+        return ""
+    return make_snippet(text, query)
+
+
+def remove_from_indexes(keys: list[str]) -> None:
+    """从全文检索和向量索引中删除文档（记录墓碑）"""
+    remove_documents(search_index_dir(), keys)
+    remove_vectors(vector_index_dir(), keys)
+    remove_vectors(document_vector_dir(), keys)
+
+
+async def remove_paper_from_index(paper_id: PydanticObjectId) -> None:
+    await run_in_threadpool(remove_from_indexes, [str(paper_id)])
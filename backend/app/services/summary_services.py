@@ -0,0 +1,85 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models import Job, Paper
+from app.search.summary import SUMMARY_VERSION, summarize_text_files
+from app.services.jobs import job_worker
+from app.services.process_pool import paper_process_pool
+from app.services.search_services import search_index_dir
+from app.utils.text_helper import text_cache_path
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_JOB = "paper.summarize"
+
+
+def _pending_query() -> dict[str, Any]:
+    """需要计算关键词和摘要的论文：还没有结果或结果版本过旧，且文本已经（或正在）抽取"""
+    return {
+        "summary_version": {"$ne": SUMMARY_VERSION},
+        "content_hash": {"$ne": None},
+        "process_status": {"$in": ["running", "done"]},
+    }
+
+
+async def summarize_papers(job: Job) -> None:
+    """
+    批量计算关键词和摘要
+
+    每次取 PAPER_SUMMARY_BATCH_SIZE 篇在进程池中一起计算，按 _id 顺序推进；
+    文本还没有抽取的论文被跳过，由其处理流程稍后再次登记。
+    """
+    collection = Paper.get_motor_collection()
+    total = await collection.count_documents(_pending_query())
+    last_id: Optional[PydanticObjectId] = None
+    done = updated = 0
+    while True:
+        query = _pending_query()
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        rows = await collection.find(query, projection={"content_hash": 1}).sort("_id", 1).limit(
+            settings.PAPER_SUMMARY_BATCH_SIZE
+        ).to_list(None)
+        if not rows:
+            break
+        last_id = rows[-1]["_id"]
+        results = await paper_process_pool.run(
+            summarize_text_files,
+            search_index_dir(),
+            [(str(row["_id"]), text_cache_path(row["content_hash"])) for row in rows],
+        )
+        operations = [
+            UpdateOne(
+                {"_id": PydanticObjectId(key)},
+                {"$set": {"keywords": keywords, "summary": summary, "summary_version": SUMMARY_VERSION}},
+            )
+            for key, keywords, summary in results
+        ]
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+        done += len(rows)
+        updated += len(operations)
+        await job.set_progress(min(done / max(total, 1), 1.0), "summarize", settings.JOB_LEASE_SECONDS)
+    logger.info(f"Summarized {updated} papers")
+
+
+async def schedule_summaries(delay_seconds: Optional[float] = None) -> Job:
+    """登记批量计算，默认在 PAPER_SUMMARY_DELAY_SECONDS 之后（收集同时上传的论文）；已在排队时不重复登记"""
+    if delay_seconds is None:
+        delay_seconds = settings.PAPER_SUMMARY_DELAY_SECONDS
+    return await job_worker.schedule_once(SUMMARY_JOB, datetime.utcnow() + timedelta(seconds=delay_seconds))
+
+
+async def ensure_summaries_current() -> Optional[Job]:
+    """启动时为没有结果（旧论文）或结果版本过旧的论文登记计算"""
+    if await Paper.get_motor_collection().find_one(_pending_query(), projection={"_id": 1}) is None:
+        return None
+    return await schedule_summaries(0)
+
+
+job_worker.register(SUMMARY_JOB, summarize_papers)
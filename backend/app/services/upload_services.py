@@ -0,0 +1,184 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from beanie import PydanticObjectId
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.exceptions.file_exceptions import FileTooLarge
+from app.exceptions.paper_exceptions import (
+    PaperNotFound,
+    UploadIncomplete,
+    UploadOffsetMismatch,
+)
+from app.models import Paper, PaperCreate, UploadSession, UploadSessionCreate, User
+from app.services.paper_services import PaperService
+from app.utils.file_helper import FileHelper
+
+logger = logging.getLogger(__name__)
+
+# 写入租约时长：持有租约的请求中断后，超过该时长才允许从同一偏移量重试
+UPLOAD_LEASE_SECONDS = 10 * 60
+
+
+class UploadSessionService:
+    """可续传的分块上传：创建会话、按偏移量写入分块、提交为论文"""
+
+    def __init__(self, file_helper: FileHelper | None = None, paper_service: PaperService | None = None):
+        self.file_helper = file_helper or FileHelper(settings.UPLOAD_DIR)
+        self.paper_service = paper_service or PaperService()
+
+    def part_path(self, session: UploadSession) -> str:
+        """会话临时文件的路径"""
+        return os.path.join(self.file_helper.file_path, "sessions", f"{session.id}.part")
+
+    async def create_session(self, *, owner: User, session_in: UploadSessionCreate) -> UploadSession:
+        max_size = settings.UPLOAD_MAX_SIZE_BYTES
+        if max_size and session_in.total_size > max_size:
+            raise FileTooLarge
+        session = UploadSession(owner_id=owner.id, **session_in.model_dump())
+        await session.insert()
+        metrics.incr("upload_session.created")
+        return session
+
+    async def write_chunk(self, session: UploadSession, offset: int, stream: AsyncIterator[bytes]) -> UploadSession:
+        """
+        把请求体写入会话临时文件的 offset 处
+
+        offset 必须等于已接收的字节数；通过写入租约保证同一时刻只有一个请求写入。
+        """
+        if session.status != "pending" or offset != session.received:
+            raise UploadOffsetMismatch(f"Upload offset mismatch, expected {session.received}")
+
+        now = datetime.utcnow()
+        collection = UploadSession.get_motor_collection()
+        claimed = await collection.update_one(
+            {
+                "_id": session.id,
+                "status": "pending",
+                "received": offset,
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+            },
+            {"$set": {"lease_until": now + timedelta(seconds=UPLOAD_LEASE_SECONDS)}},
+        )
+        if claimed.modified_count != 1:
+            raise UploadOffsetMismatch("Upload session is being written by another request")
+
+        max_bytes = min(settings.UPLOAD_SESSION_CHUNK_MAX_BYTES, session.total_size - offset)
+        try:
+            written = await self.file_helper.write_stream_at(
+                self.part_path(session), offset, stream, max_bytes
+            )
+        except BaseException:
+            await collection.update_one({"_id": session.id}, {"$set": {"lease_until": None}})
+            raise
+
+        session.received = offset + written
+        session.lease_until = None
+        session.expires_at = datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+        await collection.update_one(
+            {"_id": session.id},
+            {"$set": {
+                "received": session.received,
+                "lease_until": None,
+                "expires_at": session.expires_at,
+            }},
+        )
+        metrics.incr("upload_session.bytes", written)
+        return session
+
+    async def finalize(self, *, owner: User, session: UploadSession) -> Paper:
+        """
+        所有分块写完后把临时文件提交为论文，重复提交返回同一篇论文
+
+        提交与写入使用同一个租约，提交中断（进程崩溃）后租约到期即可重新提交。
+        论文 id 在认领时分配并保存在会话中，重新提交时论文已经创建则直接完成会话。
+
+        异常:
+            PaperNotFound: 会话已完成但论文已被删除
+            UploadIncomplete: 还有分块没有写入，或临时文件已丢失（会话重置为从头上传）
+        """
+        if session.status == "completed":
+            paper = await Paper.get(session.paper_id) if session.paper_id else None
+            if paper is None:
+                raise PaperNotFound()
+            return paper
+        if session.received < session.total_size:
+            raise UploadIncomplete
+
+        now = datetime.utcnow()
+        paper_id = session.paper_id or PydanticObjectId()
+        collection = UploadSession.get_motor_collection()
+        claimed = await collection.update_one(
+            {
+                "_id": session.id,
+                "status": {"$in": ["pending", "finalizing"]},
+                "received": session.total_size,
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+            },
+            {"$set": {
+                "status": "finalizing",
+                "paper_id": paper_id,
+                "lease_until": now + timedelta(seconds=UPLOAD_LEASE_SECONDS),
+            }},
+        )
+        if claimed.modified_count != 1:
+            raise UploadOffsetMismatch("Upload session is being finalized by another request")
+
+        paper = await Paper.get(paper_id)
+        if paper is None:
+            try:
+                paper = await self.paper_service.create_paper_from_file(
+                    owner=owner,
+                    paper_create=PaperCreate(file_name=session.file_name, is_process=session.is_process),
+                    source_path=self.part_path(session),
+                    filename=session.filename,
+                    content_type=session.content_type,
+                    paper_id=paper_id,
+                )
+            except FileNotFoundError:
+                # 上次提交在移走临时文件后中断，数据需要重新上传
+                await collection.update_one(
+                    {"_id": session.id},
+                    {"$set": {"status": "pending", "received": 0, "lease_until": None}},
+                )
+                raise UploadIncomplete("Upload data was lost, upload the file again")
+            except BaseException:
+                await collection.update_one({"_id": session.id}, {"$set": {"status": "pending", "lease_until": None}})
+                raise
+
+        session.status = "completed"
+        session.paper_id = paper.id
+        session.lease_until = None
+        await collection.update_one(
+            {"_id": session.id},
+            {"$set": {"status": session.status, "paper_id": paper.id, "lease_until": None}},
+        )
+        metrics.incr("upload_session.completed")
+        return paper
+
+    async def abort(self, session: UploadSession) -> None:
+        """取消上传，删除会话和临时文件"""
+        await session.delete()
+        try:
+            os.remove(self.part_path(session))
+        except FileNotFoundError:
+            pass
+
+    def purge_stale_parts(self) -> int:
+        """删除超过会话有效期未更新的临时文件（会话已被 TTL 索引删除），返回删除的文件数"""
+        directory = os.path.join(self.file_helper.file_path, "sessions")
+        if not os.path.isdir(directory):
+            return 0
+        deadline = time.time() - settings.UPLOAD_SESSION_TTL_SECONDS
+        removed = 0
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".part") and entry.stat().st_mtime < deadline:
+                os.remove(entry.path)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} stale upload parts")
+        return removed
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app import crud
+from app.core.auth_cache import AuthCache
+from app.models import User, UserUpdate
+from app.tests.utils.db import isolated_database
+
+
+def _cache() -> AuthCache:
+    # sync_interval 为 0：每次查缓存前都读取失效记录
+    return AuthCache(maxsize=10, ttl=60, sync_interval=0)
+
+
+async def _user() -> User:
+    user = User(email="alice@example.com", full_name=None, hashed_password="hash")
+    await user.insert()
+    return user
+
+
+def test_snapshot_has_no_password_hash() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            cache = _cache()
+            user = await _user()
+            cache.set("token", user)
+            cached = await cache.get("token")
+            assert cached is not None and cached.id == user.id and cached.email == user.email
+            assert cached.hashed_password == ""
+            assert await cache.get("other") is None
+
+    asyncio.run(scenario())
+
+
+def test_eviction_reaches_other_workers() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            worker_a, worker_b = _cache(), _cache()
+            user = await _user()
+            worker_a.set("token", user)
+            worker_b.set("token", user)
+
+            await worker_a.evict_user(user.id)
+            assert await worker_a.get("token") is None
+            assert await worker_b.get("token") is None
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_loaded_before_eviction_is_not_cached() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            worker_a, worker_b = _cache(), _cache()
+            user = await _user()
+            # worker B 读取用户之后、写入缓存之前，worker A 使该用户失效
+            loaded_at = datetime.utcnow() - timedelta(seconds=1)
+            await worker_b.get("token")
+            await worker_a.evict_user(user.id)
+            await worker_b.get("token")
+            worker_b.set("token", user, loaded_at=loaded_at)
+            assert await worker_b.get("token") is None
+
+            # 失效之后读取的用户可以缓存
+            worker_b.set("token", user, loaded_at=datetime.utcnow() + timedelta(seconds=10))
+            assert await worker_b.get("token") is not None
+
+    asyncio.run(scenario())
+
+
+def test_update_user_writes_only_changed_fields() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            user = await _user()
+            stale = User.model_validate(user.model_dump(by_alias=True))
+            # 其他请求停用了该用户
+            await User.get_motor_collection().update_one({"_id": user.id}, {"$set": {"is_active": False}})
+
+            updated = await crud.update_user(db_user=stale, user_in=UserUpdate.model_validate({"full_name": "Alice"}))
+            assert updated.full_name == "Alice"
+            reloaded = await User.get(user.id)
+            assert reloaded is not None
+            assert reloaded.full_name == "Alice" and not reloaded.is_active and reloaded.hashed_password == "hash"
+
+    asyncio.run(scenario())
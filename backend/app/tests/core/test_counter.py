@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.models import Counter
+from app.tests.utils.db import isolated_database
+
+
+class Recount:
+    """返回给定精确计数的 recount 函数，可在计数期间执行并发的增减"""
+
+    def __init__(self, value: int, during: int = 0) -> None:
+        self.value = value
+        self.during = during
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        if self.during:
+            await Counter.incr("items", self.during)
+        return self.value
+
+
+def test_missing_counter_is_seeded_then_incremented() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            # 计数器不存在时增减不生效
+            await Counter.incr("items")
+            recount = Recount(3)
+            assert await Counter.read("items", recount, max_age=60) == 3
+            await Counter.incr("items", 2)
+            assert await Counter.read("items", recount, max_age=60) == 5
+            assert recount.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_counter_is_recounted() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            assert await Counter.read("items", Recount(3), max_age=60) == 3
+            await Counter.incr("items", 10)
+            await Counter.get_motor_collection().update_one(
+                {"_id": "items"}, {"$set": {"checked_at": datetime.utcnow() - timedelta(minutes=5)}}
+            )
+            # 偏差在下一次校正时消除
+            assert await Counter.read("items", Recount(4), max_age=60) == 4
+            assert await Counter.read("items", Recount(0), max_age=60) == 4
+
+    asyncio.run(scenario())
+
+
+def test_recount_does_not_overwrite_concurrent_increments() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            assert await Counter.read("items", Recount(3), max_age=0) == 3
+            # 计数期间有并发的增减：不写回，保留增减结果，之后再校正
+            assert await Counter.read("items", Recount(3, during=1), max_age=0) == 3
+            counter = await Counter.get("items")
+            assert counter is not None and counter.value == 4
+            assert await Counter.read("items", Recount(4), max_age=0) == 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import smtplib
+import socket
+from collections.abc import Iterator
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+
+import pytest
+
+from app.core.config import settings
+from app.tests.utils.smtp import SMTPSink, smtp_sink
+from app.utils.email_helper import (
+    SMTPConnectionPool,
+    build_message,
+    email_templates,
+    generate_new_account_email,
+    is_permanent_failure,
+    preload_email_templates,
+)
+
+
+@pytest.fixture
+def sink(monkeypatch: pytest.MonkeyPatch) -> Iterator[SMTPSink]:
+    with smtp_sink(monkeypatch) as server:
+        yield server
+
+
+def _message(index: int, email_to: str = "user@example.com") -> EmailMessage:
+    return build_message(
+        message_id=f"m{index}", email_to=email_to, subject=f"测试 {index}", html_content=f"<p>{index}</p>"
+    )
+
+
+def test_pool_reuses_connection_across_batches(sink: SMTPSink) -> None:
+    pool = SMTPConnectionPool(size=1)
+    assert pool.send_messages([_message(0), _message(1)]) == [None, None]
+    assert pool.send_messages([_message(2)]) == [None]
+    pool.close()
+    assert sink.connections == 1 and pool.connects == 1
+    received = [message_from_bytes(data, policy=policy.default) for data in sink.messages]
+    assert [message["Message-ID"] for message in received] == [f"<m{i}@example.com>" for i in range(3)]
+    assert received[0]["Subject"] == "测试 0"
+
+
+def test_rejected_recipient_does_not_break_batch(sink: SMTPSink) -> None:
+    pool = SMTPConnectionPool(size=1)
+    results = pool.send_messages([_message(0), _message(1, "reject@example.com"), _message(2)])
+    pool.close()
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused) and is_permanent_failure(results[1])
+    assert len(sink.messages) == 2 and sink.connections == 1
+
+
+def test_pool_reconnects_when_idle_connection_was_closed(sink: SMTPSink) -> None:
+    pool = SMTPConnectionPool(size=1)
+    assert pool.send_messages([_message(0)]) == [None]
+    # 服务器关闭空闲连接
+    sink.handlers[0].connection.shutdown(socket.SHUT_RDWR)
+    assert pool.send_messages([_message(1)]) == [None]
+    pool.close()
+    assert pool.connects == 2 and len(sink.messages) == 2
+
+
+@pytest.mark.usefixtures("sink")
+def test_unreachable_server_fails_every_message(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SMTP_PORT", 1)
+    results = SMTPConnectionPool(size=1).send_messages([_message(0), _message(1)])
+    assert len(results) == 2 and all(isinstance(error, OSError) for error in results)
+    assert not any(is_permanent_failure(error) for error in results if error)
+
+
+def test_templates_compile_once_and_render() -> None:
+    assert preload_email_templates() == 3
+    template = email_templates().get_template("new_account.html")
+    assert email_templates().get_template("new_account.html") is template
+    email = generate_new_account_email("a@example.com", "alice", "s3cret")
+    assert "Username: alice" in email.html_content and "Password: s3cret" in email.html_content
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.executor import BoundedExecutor
+from app.core.metrics import metrics
+from app.exceptions.base import ServiceBusy, ServiceTimeout
+
+
+def test_run_returns_result() -> None:
+    executor = BoundedExecutor(name="test_result", max_workers=2, max_queue=2)
+    try:
+        assert asyncio.run(executor.run(pow, 2, 10)) == 1024
+        assert executor.in_flight == 0
+    finally:
+        executor.shutdown()
+
+
+def test_run_rejects_when_saturated() -> None:
+    executor = BoundedExecutor(name="test_saturated", max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario() -> None:
+        first = asyncio.ensure_future(executor.run(release.wait))
+        second = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ServiceBusy):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(first, second)
+
+    try:
+        asyncio.run(scenario())
+        counters = metrics.snapshot()["counters"]
+        assert counters["executor.test_saturated.rejected"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_run_times_out() -> None:
+    executor = BoundedExecutor(name="test_timeout", max_workers=1, timeout=0.05)
+    try:
+        with pytest.raises(ServiceTimeout):
+            asyncio.run(executor.run(time.sleep, 0.3))
+    finally:
+        executor.shutdown()
+
+
+def test_process_timeout_recycles_pool() -> None:
+    executor = BoundedExecutor(name="test_recycle", kind="process", max_workers=2, timeout=2)
+
+    async def scenario() -> None:
+        # 预热：spawn 启动工作进程较慢，不计入超时
+        await asyncio.gather(executor.run(pow, 2, 2), executor.run(pow, 2, 2))
+        executor.timeout = 0.5
+        stuck = asyncio.ensure_future(executor.run(time.sleep, 30))
+        await asyncio.sleep(0)
+        executor.timeout = 10
+        other = asyncio.ensure_future(executor.run(time.sleep, 30))
+        with pytest.raises(ServiceTimeout):
+            await stuck
+        # 同一进程池中的其他任务随工作进程一起结束
+        with pytest.raises(ServiceBusy):
+            await other
+        assert await executor.run(pow, 2, 10) == 1024
+
+    try:
+        asyncio.run(scenario())
+        assert executor.in_flight == 0
+        assert metrics.snapshot()["counters"]["executor.test_recycle.recycled"] == 1
+    finally:
+        executor.shutdown()
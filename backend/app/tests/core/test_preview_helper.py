@@ -0,0 +1,87 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.utils.preview_helper import (
+    evict_previews,
+    preview_paths,
+    read_toc,
+    render_docx,
+    render_markdown,
+    render_to_cache,
+)
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def test_markdown_is_sanitized_and_headings_get_anchors() -> None:
+    body, toc = render_markdown(
+        "# Intro 介绍\n\n<script>alert(1)</script> [bad](javascript:alert(1)) [ok](https://example.com)\n\n## Intro 介绍\n"
+    )
+    assert "<script>" not in body and "&lt;script&gt;" in body
+    assert 'href="javascript' not in body
+    assert '<a href="https://example.com" rel="nofollow noopener noreferrer">ok</a>' in body
+    assert toc == [
+        {"level": 1, "title": "Intro 介绍", "anchor": "intro-介绍"},
+        {"level": 2, "title": "Intro 介绍", "anchor": "intro-介绍-2"},
+    ]
+    assert '<h2 id="intro-介绍-2">' in body
+
+
+def test_docx_headings_lists_links_and_tables(tmp_path: Path) -> None:
+    path = tmp_path / "paper.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", (
+            f"<w:document {W} {R}><w:body>"
+            '<w:p><w:pPr><w:pStyle w:val="1"/></w:pPr><w:r><w:t>摘要</w:t></w:r></w:p>'
+            '<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>bold &lt;x&gt;</w:t></w:r>'
+            '<w:hyperlink r:id="rId1"><w:r><w:t>site</w:t></w:r></w:hyperlink>'
+            '<w:hyperlink r:id="rId2"><w:r><w:t>evil</w:t></w:r></w:hyperlink></w:p>'
+            '<w:p><w:pPr><w:numPr/></w:pPr><w:r><w:t>item</w:t></w:r></w:p>'
+            "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>cell</w:t></w:r></w:p></w:tc></w:tr></w:tbl>"
+            "</w:body></w:document>"
+        ))
+        archive.writestr("word/styles.xml", (
+            f'<w:styles {W}><w:style w:type="paragraph" w:styleId="1"><w:name w:val="heading 1"/></w:style></w:styles>'
+        ))
+        archive.writestr("word/_rels/document.xml.rels", (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="https://example.com" TargetMode="External"/>'
+            '<Relationship Id="rId2" Target="javascript:alert(1)" TargetMode="External"/>'
+            "</Relationships>"
+        ))
+    body, toc = render_docx(str(path))
+    assert toc == [{"level": 1, "title": "摘要", "anchor": "摘要"}]
+    assert body.split("\n") == [
+        '<h1 id="摘要">摘要</h1>',
+        '<p><strong>bold &lt;x&gt;</strong><a href="https://example.com" rel="nofollow noopener noreferrer">site</a>evil</p>',
+        "<ul>",
+        "<li>item</li>",
+        "</ul>",
+        "<table>",
+        "<tr><td>cell</td></tr>",
+        "</table>",
+        "",
+    ]
+
+
+def test_eviction_removes_least_recently_used(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PAPER_DATA_DIR", str(tmp_path))
+    hashes = [f"{i:02x}" * 32 for i in range(3)]
+    for index, content_hash in enumerate(hashes):
+        source = tmp_path / f"{index}.md"
+        source.write_text("# Title\n\n" + "x" * 1000, encoding="utf-8")
+        html_path, toc_path = preview_paths(content_hash)
+        render_to_cache(str(source), html_path, toc_path)
+        # 第二个最近访问
+        atime = 2_000_000_000 if index == 1 else 1_000_000_000 + index
+        os.utime(html_path, (atime, os.stat(html_path).st_mtime))
+
+    assert evict_previews(10_000) == 0
+    assert evict_previews(1_500) == 2
+    assert read_toc(hashes[1]) == [{"level": 1, "title": "Title", "anchor": "title"}]
+    assert read_toc(hashes[0]) is None and read_toc(hashes[2]) is None
@@ -0,0 +1,30 @@
+import time
+
+from app.core.security import sign_download, verify_download_signature
+
+
+def test_download_signature_round_trip() -> None:
+    expires = int(time.time()) + 60
+    signature = sign_download("paper.pdf", expires)
+    assert verify_download_signature("paper.pdf", expires, signature)
+
+
+def test_download_signature_rejects_tampering() -> None:
+    expires = int(time.time()) + 60
+    signature = sign_download("paper.pdf", expires)
+    assert not verify_download_signature("other.pdf", expires, signature)
+    assert not verify_download_signature("paper.pdf", expires + 1, signature)
+
+
+def test_download_signature_covers_download_name() -> None:
+    expires = int(time.time()) + 60
+    signature = sign_download("0" * 64, expires, "论文.pdf")
+    assert verify_download_signature("0" * 64, expires, signature, "论文.pdf")
+    assert not verify_download_signature("0" * 64, expires, signature, "other.exe")
+    assert not verify_download_signature("0" * 64, expires, signature)
+
+
+def test_download_signature_expires() -> None:
+    expires = int(time.time()) - 1
+    signature = sign_download("paper.pdf", expires)
+    assert not verify_download_signature("paper.pdf", expires, signature)
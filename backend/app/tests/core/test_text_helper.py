@@ -0,0 +1,74 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.utils.text_helper import (
+    PAGE_SEPARATOR,
+    detect_format,
+    extract_pages,
+    extract_to_cache,
+    page_index_path,
+    read_page_range,
+    text_cache_path,
+)
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def write_docx(path: Path, body: str) -> None:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W}><w:body>{body}</w:body></w:document>")
+
+
+def test_plain_text_falls_back_to_gb18030(tmp_path: Path) -> None:
+    path = tmp_path / "paper.md"
+    path.write_bytes("# 标题\n正文".encode("gb18030"))
+    assert detect_format(str(path)) == "text"
+    assert extract_pages(str(path)) == ["# 标题\n正文"]
+
+
+def test_docx_paragraphs_and_page_breaks(tmp_path: Path) -> None:
+    path = tmp_path / "paper.docx"
+    write_docx(
+        path,
+        "<w:p><w:r><w:t>第一页</w:t></w:r><w:r><w:t> hello</w:t></w:r></w:p>"
+        "<w:p><w:r><w:br w:type=\"page\"/><w:t>second page</w:t></w:r></w:p>",
+    )
+    assert detect_format(str(path)) == "docx"
+    assert extract_pages(str(path)) == ["第一页 hello", "second page"]
+
+
+def test_extract_to_cache_writes_pages(tmp_path: Path) -> None:
+    source = tmp_path / "paper.md"
+    source.write_text("one\ftwo", encoding="utf-8")
+    dest = tmp_path / "cache" / "text.txt"
+    assert extract_to_cache(str(source), str(dest)) == {"pages": 2, "chars": 7}
+    assert dest.read_text(encoding="utf-8").split(PAGE_SEPARATOR) == ["one", "two"]
+
+
+def test_read_page_range_reads_only_requested_pages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PAPER_DATA_DIR", str(tmp_path))
+    source = tmp_path / "paper.md"
+    source.write_text("第一页\fsecond 页\f\fé last", encoding="utf-8")
+    content_hash = "ab" * 32
+    extract_to_cache(str(source), text_cache_path(content_hash))
+
+    assert read_page_range(content_hash, 0) == (4, ["第一页", "second 页", "", "é last"])
+    assert read_page_range(content_hash, 1, 2) == (4, ["second 页"])
+    assert read_page_range(content_hash, 3, 10) == (4, ["é last"])
+    assert read_page_range(content_hash, 4, 6) == (4, [])
+
+
+def test_read_page_range_rebuilds_missing_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "PAPER_DATA_DIR", str(tmp_path))
+    content_hash = "cd" * 32
+    path = Path(text_cache_path(content_hash))
+    path.parent.mkdir(parents=True)
+    path.write_text("一\f二\f三", encoding="utf-8")
+
+    assert not os.path.exists(page_index_path(content_hash))
+    assert read_page_range(content_hash, 1, 3) == (3, ["二", "三"])
+    assert os.path.exists(page_index_path(content_hash))
@@ -0,0 +1,109 @@
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.search import (
+    SearchIndex,
+    add_documents,
+    index,
+    make_snippet,
+    rebuild,
+    remove_documents,
+    replace_from,
+    segment,
+    tokenize,
+)
+
+
+def test_tokenize_mixed_text() -> None:
+    assert tokenize("Deep Learning 深度学习") == ["deep", "learn", "深度", "学习"]
+
+
+def test_search_ranks_by_bm25(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    add_documents(directory, [
+        ("a" * 24, tokenize("graph neural networks for molecules")),
+        ("b" * 24, tokenize("neural networks neural networks neural networks")),
+        ("c" * 24, tokenize("a survey of databases")),
+    ])
+    search_index = SearchIndex(directory)
+    keys = [key for key, _ in search_index.search("neural networks")]
+    assert keys == ["b" * 24, "a" * 24]
+    assert search_index.search("unknown") == []
+
+
+def test_remove_and_replace_documents(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    search_index = SearchIndex(directory)
+    add_documents(directory, [("a" * 24, tokenize("transformer attention"))])
+    add_documents(directory, [("b" * 24, tokenize("attention mechanisms"))])
+    assert {key for key, _ in search_index.search("attention")} == {"a" * 24, "b" * 24}
+
+    assert remove_documents(directory, ["a" * 24]) == 1
+    assert [key for key, _ in search_index.search("attention")] == ["b" * 24]
+
+    # 重新索引同一个键时旧文档被替换
+    add_documents(directory, [("b" * 24, tokenize("convolution"))])
+    assert search_index.search("attention") == []
+    assert [key for key, _ in search_index.search("convolution")] == ["b" * 24]
+
+
+def test_segments_are_merged_by_size_class(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    for number in range(21):
+        add_documents(directory, [(f"{number:024d}", tokenize(f"paper {number} common"))])
+    # 只合并同一层的段：1 × 16 + 1 × 4 + 1 × 1
+    assert sorted(info["docs"] for info in index.read_manifest(directory)["segments"]) == [1, 4, 16]
+
+    remove_documents(directory, [f"{0:024d}"])
+    add_documents(directory, [(f"{99:024d}", tokenize("common"))])
+    search_index = SearchIndex(directory)
+    keys = {key for key, _ in search_index.search("common", limit=100)}
+    assert len(keys) == 21
+    assert f"{0:024d}" not in keys
+
+    rebuild(directory, [("d" * 24, tokenize("common"))])
+    assert [key for key, _ in search_index.search("common")] == ["d" * 24]
+
+
+def test_merge_rewrites_each_document_logarithmically(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    directory = str(tmp_path)
+    rewritten = []
+    merge = segment.merge
+
+    def counting_merge(
+        directory: str, segments: Sequence[segment.Segment], deleted: dict[str, np.ndarray]
+    ) -> str | None:
+        rewritten.append(sum(item.doc_count for item in segments))
+        return merge(directory, segments, deleted)
+
+    monkeypatch.setattr(segment, "merge", counting_merge)
+    for number in range(4 ** 4):
+        add_documents(directory, [(f"{number:024d}", ["common"])])
+    # 每个文档依次进入 4、16、64、256 文档的段，共被重写 4 次
+    assert [info["docs"] for info in index.read_manifest(directory)["segments"]] == [4 ** 4]
+    assert sum(rewritten) == 4 * 4 ** 4
+
+
+def test_snippet_centres_on_first_match() -> None:
+    text = "introduction " * 30 + "we propose a sparse attention method" + " conclusion" * 30
+    snippet = make_snippet(text, "sparse attention", width=60)
+    assert "sparse attention" in snippet
+    assert snippet.startswith("…") and snippet.endswith("…")
+
+
+def test_replace_from_swaps_in_rebuilt_index(tmp_path: Path) -> None:
+    directory = str(tmp_path / "search")
+    staging = str(tmp_path / "search.reindex")
+    add_documents(directory, [("a" * 24, tokenize("old paper"))])
+    search_index = SearchIndex(directory)
+    assert search_index.search("old")
+
+    add_documents(staging, [("b" * 24, tokenize("new paper"))])
+    assert replace_from(directory, staging) == 1
+    assert not os.path.exists(staging)
+    assert search_index.search("old") == []
+    assert [key for key, _ in search_index.search("paper")] == ["b" * 24]
@@ -0,0 +1,45 @@
+import random
+from pathlib import Path
+
+from app.search.minhash import band_keys, minhash_text_file, similarity
+
+_WORDS = [f"term{i}" for i in range(500)]
+
+
+def _write(tmp_path: Path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _document(seed: int, length: int = 400) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(_WORDS) for _ in range(length))
+
+
+def test_near_duplicates_share_buckets(tmp_path: Path) -> None:
+    text = _document(1)
+    edited = text.split()
+    edited[100:105] = ["changed"] * 5
+    first = minhash_text_file(_write(tmp_path, "a.txt", text))
+    second = minhash_text_file(_write(tmp_path, "b.txt", " ".join(edited)))
+    assert first is not None and second is not None
+    assert similarity(first, second) > 0.8
+    assert set(band_keys(first)) & set(band_keys(second))
+
+
+def test_different_documents_are_not_similar(tmp_path: Path) -> None:
+    first = minhash_text_file(_write(tmp_path, "a.txt", _document(1)))
+    second = minhash_text_file(_write(tmp_path, "b.txt", _document(2)))
+    assert first is not None and second is not None
+    assert similarity(first, second) < 0.2
+    assert not set(band_keys(first)) & set(band_keys(second))
+
+
+def test_signature_is_deterministic(tmp_path: Path) -> None:
+    path = _write(tmp_path, "a.txt", _document(3))
+    assert minhash_text_file(path) == minhash_text_file(path)
+
+
+def test_empty_text_has_no_signature(tmp_path: Path) -> None:
+    assert minhash_text_file(_write(tmp_path, "a.txt", " \f\n")) is None
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from app.search import add_documents, tokenize
+from app.search.summary import (
+    parse_document,
+    split_sentences,
+    summarize,
+    summarize_text_files,
+)
+
+TRANSLATION = (
+    "Neural machine translation has become the dominant approach for translating text.\n"
+    "In this paper we propose a transformer model with attention for neural machine translation.\n"
+    "The weather was nice yesterday and we went for a walk in the park.\n"
+    "Our attention based translation model improves translation quality on benchmark datasets.\n"
+    "We evaluate the transformer translation model on English German translation tasks.\n\n"
+    "Experiments show that attention layers capture long range dependencies in translation.\n"
+    "Translation with attention outperforms recurrent translation baselines on every dataset."
+)
+TRAFFIC = (
+    "本文研究城市交通流量预测问题。我们提出基于图神经网络的交通流量预测模型。"
+    "模型在多个城市的交通数据集上取得了最好的预测效果。"
+)
+
+
+def test_split_sentences_joins_wrapped_lines() -> None:
+    assert split_sentences("# 标题\n\n第一句。第二\n句！Line one\nwraps. Next one") == [
+        "标题", "第一句。", "第二句！", "Line one wraps.", "Next one",
+    ]
+
+
+def test_keywords_and_summary_in_one_batch() -> None:
+    results = summarize([parse_document(TRANSLATION), parse_document(TRAFFIC), parse_document("")])
+
+    keywords, summary = results[0]
+    assert keywords[0] == "translation"
+    assert "attention" in keywords[:3]
+    # 关键词显示原词而不是词干（"transform"）
+    assert "transformer" in keywords
+    assert summary is not None and "weather" not in summary
+    # 摘要句按原文顺序排列
+    sentences = split_sentences(TRANSLATION)
+    positions = [sentences.index(sentence) for sentence in split_sentences(summary)]
+    assert len(positions) == 5 and positions == sorted(positions)
+
+    keywords, _ = results[1]
+    assert {"交通", "预测"} <= set(keywords[:4])
+    assert "我们" not in keywords
+    assert results[2] == ([], None)
+
+
+def test_index_document_frequencies_lower_common_terms(tmp_path: Path) -> None:
+    directory = str(tmp_path / "index")
+    # "model" 出现在语料的所有论文中，不应排在前面
+    add_documents(directory, [(f"{i:024d}", tokenize(f"model study number {i}")) for i in range(20)])
+    text_path = tmp_path / "paper.txt"
+    text_path.write_text("model model model model graph graph", encoding="utf-8")
+
+    [(key, keywords, _)] = summarize_text_files(directory, [("a" * 24, str(text_path)), ("b" * 24, "missing.txt")])
+    assert key == "a" * 24
+    assert keywords == ["graph", "model"]
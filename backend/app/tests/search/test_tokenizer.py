@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from app.search.dictionary import Dictionary, compile_dictionary
+from app.search.porter import stem
+from app.search.tokenizer import iter_tokens, tokenize
+
+
+def test_chinese_is_segmented_into_words() -> None:
+    tokens = tokenize("我们提出了一种基于深度学习的机器翻译方法")
+    assert tokens == ["我们", "提出", "了", "一种", "基于", "深度", "学习", "的", "机器", "翻译", "方法"]
+
+
+def test_long_words_also_emit_contained_words() -> None:
+    tokens = tokenize("中华人民共和国")
+    assert tokens[0] == "中华"
+    assert {"人民共和国", "人民", "共和国"} <= set(tokens)
+
+
+def test_english_is_stemmed_and_positions_are_kept() -> None:
+    text = "Neural networks, running 2024 experiments"
+    tokens = list(iter_tokens(text))
+    assert [token for token, _ in tokens] == ["neural", "network", "run", "2024", "experi"]
+    assert [text[start:start + 3].lower() for _, start in tokens] == ["neu", "net", "run", "202", "exp"]
+
+
+def test_kana_and_hangul_are_split_into_bigrams() -> None:
+    assert tokenize("한국어") == ["한국", "국어"]
+    assert tokenize("カタカナ") == ["カタ", "タカ", "カナ"]
+    # 私用区字符不属于汉字，不产出词
+    assert tokenize("\ue000") == []
+
+
+def test_porter_stemmer() -> None:
+    cases = {
+        "caresses": "caress", "ponies": "poni", "agreed": "agre", "hopping": "hop",
+        "filing": "file", "happy": "happi", "relational": "relat", "generalization": "gener",
+        "effective": "effect", "adoption": "adopt", "controll": "control", "is": "is",
+    }
+    assert {word: stem(word) for word in cases} == cases
+
+
+def test_compiled_dictionary_prefers_likely_segmentation(tmp_path: Path) -> None:
+    source = tmp_path / "words.txt"
+    source.write_text("# 测试\n研究 100\n研究生 10\n生命 100\n起源 100\n", encoding="utf-8")
+    target = str(tmp_path / "words.trie")
+    compile_dictionary(str(source), target)
+    dictionary = Dictionary(target)
+
+    assert "研究生" in dictionary and "研" not in dictionary
+    assert [end for end, _ in dictionary.prefixes("研究生命", 0)] == [2, 3]
+    text = "研究生命起源"
+    assert [text[start:end] for start, end in dictionary.segment(text)] == ["研究", "生命", "起源"]
+    # 未登录的字单独成词
+    text = "某研究"
+    assert [text[start:end] for start, end in dictionary.segment(text)] == ["某", "研究"]
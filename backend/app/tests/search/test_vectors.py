@@ -0,0 +1,128 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.search import VectorIndex, add_vectors, embed_text, remove_vectors, vectors
+from app.search.embedding import EMBEDDING_DIM
+
+
+def _random_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    data = rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+    normalized: np.ndarray = data / np.linalg.norm(data, axis=1, keepdims=True)
+    return normalized
+
+
+def test_similar_text_ranks_first(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    texts = {
+        "a" * 24: "基于深度学习的机器翻译方法 neural machine translation",
+        "b" * 24: "城市交通流量预测与信号灯控制 traffic signal control",
+        "c" * 24: "蛋白质结构预测 protein folding",
+    }
+    add_vectors(directory, [(key, embed_text(text)[None], [0]) for key, text in texts.items()])
+    index = VectorIndex(directory)
+
+    hits = index.search(embed_text("神经网络机器翻译"), limit=3)
+    assert hits[0][0] == "a" * 24
+    excluded = index.search(embed_text("神经网络机器翻译"), exclude=["a" * 24])
+    assert "a" * 24 not in [key for key, _, _ in excluded]
+
+
+def test_best_chunk_per_document_and_tombstones(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    rng = np.random.default_rng(0)
+    data = _random_vectors(rng, 6)
+    add_vectors(directory, [("a" * 24, data[:3], [0, 1, 2]), ("b" * 24, data[3:], [0, 0, 1])])
+    index = VectorIndex(directory)
+
+    hits = index.search(data[1], limit=5)
+    assert hits[0][:2] == ("a" * 24, 1)
+    assert hits[0][2] == pytest.approx(1.0)
+    assert len({key for key, _, _ in hits}) == len(hits)
+
+    # 重新写入同一键时替换旧向量
+    add_vectors(directory, [("a" * 24, data[4:5], [7])])
+    assert ("a" * 24, 1) not in [hit[:2] for hit in index.search(data[1], limit=5)]
+    assert remove_vectors(directory, ["b" * 24]) == 3
+    assert [key for key, _, _ in index.search(data[4], limit=5)] == ["a" * 24]
+    assert index.row_count == 1
+
+
+def test_uncommitted_rows_are_truncated(tmp_path: Path) -> None:
+    directory = str(tmp_path)
+    rng = np.random.default_rng(1)
+    add_vectors(directory, [("a" * 24, _random_vectors(rng, 2), [0, 1])])
+    vectors_path, _ = vectors._paths(directory, 0)
+    with open(vectors_path, "ab") as file:
+        file.write(b"\0" * 100)
+
+    add_vectors(directory, [("b" * 24, _random_vectors(rng, 1), [0])])
+    assert VectorIndex(directory).row_count == 3
+    assert Path(vectors_path).stat().st_size == 3 * EMBEDDING_DIM * 4
+
+
+def test_ivf_search_matches_exact_search(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(vectors, "IVF_MIN_ROWS", 2000)
+    directory = str(tmp_path)
+    rng = np.random.default_rng(2)
+    # 聚成若干簇的数据，便于分区
+    centres = _random_vectors(rng, 20)
+    data = centres[rng.integers(0, 20, size=3000)] + 0.05 * rng.standard_normal((3000, EMBEDDING_DIM))
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+    add_vectors(directory, [(f"{row:024d}", data[row:row + 1], [0]) for row in range(2500)])
+    assert vectors.read_vector_manifest(directory)["ivf"] is not None
+    add_vectors(directory, [(f"{row:024d}", data[row:row + 1], [0]) for row in range(2500, 3000)])
+
+    index = VectorIndex(directory)
+    for row in (5, 2700):
+        assert index.search(data[row], limit=1)[0][0] == f"{row:024d}"
+    remove_vectors(directory, [f"{5:024d}"])
+    assert index.search(data[5], limit=1)[0][0] != f"{5:024d}"
+
+
+def test_compaction_keeps_live_rows(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(vectors, "COMPACT_MIN_ROWS", 4)
+    directory = str(tmp_path)
+    rng = np.random.default_rng(3)
+    data = _random_vectors(rng, 8)
+    add_vectors(directory, [(f"{row:024d}", data[row:row + 1], [row]) for row in range(8)])
+    index = VectorIndex(directory)
+    index.search(data[0])
+
+    remove_vectors(directory, [f"{row:024d}" for row in range(4)])
+    manifest = vectors.read_vector_manifest(directory)
+    assert manifest["generation"] == 1 and manifest["rows"] == 4 and manifest["deleted"] == []
+    assert index.search(data[6], limit=1)[0][:2] == (f"{6:024d}", 6)
+
+
+def test_chunks_keep_page_numbers(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.search import embedding
+
+    monkeypatch.setattr(embedding, "CHUNK_TOKENS", 4)
+    monkeypatch.setattr(embedding, "MIN_CHUNK_TOKENS", 2)
+    chunks = embedding.chunk_pages(["a b c d e", "f g h i j k"])
+    assert chunks == [(0, ["a", "b", "c", "d", "e"]), (1, ["f", "g", "h", "i"]), (1, ["j", "k"])]
+
+
+def test_nearest_neighbors_match_brute_force(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # 小块以覆盖分块计算
+    monkeypatch.setattr(vectors, "NEIGHBOR_BLOCK_CELLS", 64)
+    directory = str(tmp_path)
+    rng = np.random.default_rng(4)
+    data = _random_vectors(rng, 40)
+    add_vectors(directory, [(f"{row:024d}", data[row:row + 1], [0]) for row in range(40)])
+    remove_vectors(directory, [f"{0:024d}"])
+
+    lists = vectors.nearest_neighbors(directory, k=5)
+    assert [key for key, _ in lists] == [f"{row:024d}" for row in range(1, 40)]
+    similarity = data[1:] @ data[1:].T
+    np.fill_diagonal(similarity, -np.inf)
+    expected = np.argsort(-similarity, axis=1)[:, :5]
+    for row, (_, neighbors) in enumerate(lists):
+        assert [key for key, _ in neighbors] == [f"{index + 1:024d}" for index in expected[row]]
+        assert np.allclose([score for _, score in neighbors], similarity[row, expected[row]])
+    assert vectors.live_keys(directory) == [key for key, _ in lists]
+    # 指定键时只计算这些键，已删除的键被跳过
+    subset = [f"{11:024d}", f"{0:024d}", f"{10:024d}"]
+    assert vectors.nearest_neighbors(directory, k=5, keys=subset) == [lists[10], lists[9]]
@@ -0,0 +1,29 @@
+import asyncio
+
+import numpy as np
+import pytest
+from beanie import PydanticObjectId
+
+from app.services import duplicate_services
+from app.tests.utils.db import isolated_database
+
+SIGNATURE = np.arange(128, dtype=np.uint32).tobytes()
+
+
+def test_candidates_are_limited_per_owner(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(duplicate_services, "_MAX_CANDIDATES", 3)
+
+    async def scenario() -> None:
+        async with isolated_database():
+            alice, bob = PydanticObjectId(), PydanticObjectId()
+            # 其他用户的大量相同内容不会挤掉本人的论文
+            for _ in range(5):
+                await duplicate_services.save_signature(PydanticObjectId(), bob, "bob", SIGNATURE)
+            original = PydanticObjectId()
+            await duplicate_services.save_signature(original, alice, "alice", SIGNATURE)
+
+            match = await duplicate_services.find_near_duplicate(PydanticObjectId(), alice, SIGNATURE)
+            assert match == (original, 1.0)
+            assert await duplicate_services.find_near_duplicate(original, alice, SIGNATURE) is None
+
+    asyncio.run(scenario())
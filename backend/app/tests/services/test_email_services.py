@@ -0,0 +1,159 @@
+import asyncio
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.exceptions.base import EmailNotConfigured
+from app.models import OutboxEmail
+from app.services.email_services import EmailSender, enqueue_email
+from app.tests.utils.db import isolated_database
+from app.tests.utils.smtp import SMTPSink, smtp_sink
+
+
+@pytest.fixture
+def sink(monkeypatch: pytest.MonkeyPatch) -> Iterator[SMTPSink]:
+    with smtp_sink(monkeypatch) as server:
+        yield server
+
+
+async def _enqueue(email_to: str = "user@example.com", dedup_key: str | None = None) -> OutboxEmail:
+    return await enqueue_email(
+        email_to=email_to, subject="测试", html_content="<p>token</p>", dedup_key=dedup_key
+    )
+
+
+async def _reload(email: OutboxEmail) -> OutboxEmail:
+    reloaded = await OutboxEmail.get(email.id)
+    assert reloaded is not None
+    return reloaded
+
+
+@pytest.mark.usefixtures("sink")
+def test_claim_takes_due_emails_once() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            sender = EmailSender()
+            first = await _enqueue()
+            second = await _enqueue()
+            later = await _enqueue()
+            await OutboxEmail.get_motor_collection().update_one(
+                {"_id": later.id}, {"$set": {"run_after": datetime.utcnow() + timedelta(hours=1)}}
+            )
+
+            claimed = await sender.claim()
+            assert [email.id for email in claimed] == [first.id, second.id]
+            assert all(email.status == "sending" and email.attempts == 1 for email in claimed)
+            assert claimed[0].lease is not None and claimed[0].lease == claimed[1].lease
+            # 已认领的邮件和未到期的邮件都不会被认领
+            assert await sender.claim() == []
+            assert (await _reload(later)).status == "queued"
+
+            # 发送任务崩溃：租约过期后重新认领
+            await OutboxEmail.get_motor_collection().update_one(
+                {"_id": first.id}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            reclaimed = await sender.claim()
+            assert [email.id for email in reclaimed] == [first.id]
+            assert reclaimed[0].attempts == 2 and reclaimed[0].lease != claimed[0].lease
+
+    asyncio.run(scenario())
+
+
+def test_run_once_sends_and_clears_content(sink: SMTPSink) -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            sender = EmailSender()
+            sent = await _enqueue()
+            rejected = await _enqueue("reject@example.com")
+            assert await sender.run_once() == 2
+            await sender.stop()
+
+            sent = await _reload(sent)
+            assert sent.status == "sent" and sent.sent_at is not None
+            assert sent.html_content == "" and sent.lease is None and sent.expire_at is not None
+            # 被服务器永久拒绝，不再重试
+            rejected = await _reload(rejected)
+            assert rejected.status == "failed" and rejected.attempts == 1
+            assert rejected.error is not None and rejected.html_content == ""
+            assert len(sink.messages) == 1
+            assert await sender.run_once() == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.usefixtures("sink")
+def test_transient_failure_retries_with_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 3)
+
+    async def scenario() -> None:
+        async with isolated_database():
+            sender = EmailSender()
+            email = await _enqueue()
+            for attempt, delay in ((1, 30), (2, 60)):
+                # MongoDB 中的时间只精确到毫秒
+                started = datetime.utcnow().replace(microsecond=0)
+                [claimed] = await sender.claim()
+                await sender._record([claimed], [OSError("connection reset")])
+                email = await _reload(email)
+                assert email.status == "queued" and email.attempts == attempt
+                assert email.error == "OSError: connection reset" and email.html_content
+                assert email.run_after >= started + timedelta(seconds=delay)
+                await OutboxEmail.get_motor_collection().update_one(
+                    {"_id": email.id}, {"$set": {"run_after": datetime.utcnow()}}
+                )
+
+            # 达到 max_attempts 后标记为 failed
+            [claimed] = await sender.claim()
+            await sender._record([claimed], [OSError("connection reset")])
+            email = await _reload(email)
+            assert email.status == "failed" and email.attempts == 3 and email.html_content == ""
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.usefixtures("sink")
+def test_record_skips_emails_reclaimed_by_another_sender() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            email = await _enqueue()
+            [stale] = await EmailSender().claim()
+            await OutboxEmail.get_motor_collection().update_one(
+                {"_id": email.id}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            [current] = await EmailSender().claim()
+
+            # 租约已被重新认领，旧的发送结果不覆盖
+            await EmailSender()._record([stale], [None])
+            email = await _reload(email)
+            assert email.status == "sending" and email.lease == current.lease and email.html_content
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.usefixtures("sink")
+def test_enqueue_dedup_key_returns_existing_email() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            first = await _enqueue(dedup_key="password-recovery:1")
+            second = await _enqueue(dedup_key="password-recovery:1")
+            assert second.id == first.id
+            assert await OutboxEmail.find_all().count() == 1
+            # 写入时即设置过期时间
+            assert first.expire_at is not None and first.expire_at > datetime.utcnow()
+
+    asyncio.run(scenario())
+
+
+def test_enqueue_without_smtp_is_refused(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SMTP_HOST", None)
+
+    async def scenario() -> None:
+        async with isolated_database():
+            with pytest.raises(EmailNotConfigured):
+                await _enqueue()
+            assert await OutboxEmail.find_all().count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models import Job
+from app.services.jobs import JobWorker, PermanentJobError
+from app.tests.utils.db import isolated_database
+
+
+class Recorder:
+    """按顺序抛出给定异常的任务处理函数，并记录结束回调"""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+        self.finished: list[bool] = []
+
+    async def handle(self, _job: Job) -> None:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+    async def on_finished(self, _job: Job, succeeded: bool) -> None:
+        self.finished.append(succeeded)
+
+
+def _worker(recorder: Recorder) -> JobWorker:
+    worker = JobWorker()
+    worker.register("test.job", recorder.handle)
+    worker.on_finished("test.job", recorder.on_finished)
+    return worker
+
+
+async def _reload(job: Job) -> Job:
+    reloaded = await Job.get(job.id)
+    assert reloaded is not None
+    return reloaded
+
+
+def test_claim_takes_due_jobs_once() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            worker = _worker(Recorder())
+            later = await worker.enqueue("test.job", run_after=datetime.utcnow() + timedelta(hours=1))
+            await worker.enqueue("other.job")
+            due = await worker.enqueue("test.job")
+
+            claimed = await worker.claim()
+            assert claimed is not None and claimed.id == due.id
+            assert claimed.status == "running" and claimed.attempts == 1
+            assert claimed.locked_until is not None and claimed.locked_until > datetime.utcnow()
+            # 已认领的任务、未到期的任务和没有处理函数的任务都不会被认领
+            assert await worker.claim() is None
+            assert (await _reload(later)).status == "queued"
+
+            # worker 崩溃：租约过期后重新认领
+            await Job.get_motor_collection().update_one(
+                {"_id": due.id}, {"$set": {"locked_until": datetime.utcnow() - timedelta(seconds=1)}}
+            )
+            reclaimed = await worker.claim()
+            assert reclaimed is not None and reclaimed.id == due.id and reclaimed.attempts == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_retries_with_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 30.0)
+
+    async def scenario() -> None:
+        async with isolated_database():
+            recorder = Recorder(RuntimeError("first"), RuntimeError("second"), RuntimeError("third"))
+            worker = _worker(recorder)
+            job = await worker.enqueue("test.job", max_attempts=3)
+
+            for attempt, delay in ((1, 30), (2, 60)):
+                # MongoDB 中的时间只精确到毫秒
+                started = datetime.utcnow().replace(microsecond=0)
+                assert await worker.run_once()
+                job = await _reload(job)
+                assert job.status == "queued" and job.attempts == attempt
+                assert job.locked_until is None and job.error is not None
+                assert timedelta(seconds=delay) <= job.run_after - started < timedelta(seconds=delay + 5)
+                # 退避期间不会被认领
+                assert not await worker.run_once()
+                await Job.get_motor_collection().update_one(
+                    {"_id": job.id}, {"$set": {"run_after": datetime.utcnow()}}
+                )
+
+            assert await worker.run_once()
+            job = await _reload(job)
+            assert job.status == "failed" and job.attempts == 3 and job.error == "RuntimeError: third"
+            assert recorder.calls == 3 and recorder.finished == [False]
+
+    asyncio.run(scenario())
+
+
+def test_permanent_error_fails_without_retry() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            recorder = Recorder(PermanentJobError("broken document"))
+            worker = _worker(recorder)
+            job = await worker.enqueue("test.job", max_attempts=3)
+            assert await worker.run_once()
+            job = await _reload(job)
+            assert job.status == "failed" and job.attempts == 1
+            assert recorder.finished == [False]
+
+    asyncio.run(scenario())
+
+
+def test_successful_job_is_done() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            recorder = Recorder()
+            worker = _worker(recorder)
+            job = await worker.enqueue("test.job")
+            assert await worker.run_once()
+            job = await _reload(job)
+            assert job.status == "done" and job.progress == 1.0 and job.finished_at is not None
+            assert recorder.finished == [True]
+            assert not await worker.run_once()
+
+    asyncio.run(scenario())
+
+
+def test_dedupe_key_allows_one_pending_job() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            worker = _worker(Recorder())
+            # 多个进程同时登记只插入一个任务
+            jobs = await asyncio.gather(*(worker.enqueue("test.job", dedupe_key="once") for _ in range(4)))
+            assert {job.id for job in jobs} == {jobs[0].id}
+            assert await Job.find(Job.kind == "test.job").count() == 1
+
+            # 执行中的任务同样不重复登记，结束后可以再次登记
+            claimed = await worker.claim()
+            assert claimed is not None
+            assert (await worker.enqueue("test.job", dedupe_key="once")).id == jobs[0].id
+            await Job.get_motor_collection().update_one({"_id": claimed.id}, {"$set": {"status": "done"}})
+            again = await worker.enqueue("test.job", dedupe_key="once")
+            assert again.id != jobs[0].id and again.status == "queued"
+
+    asyncio.run(scenario())
+
+
+def test_schedule_once_merges_into_the_queued_job() -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            worker = _worker(Recorder())
+            now = datetime.utcnow().replace(microsecond=0)
+            later, soon = now + timedelta(hours=1), now + timedelta(minutes=1)
+            # 多个进程同时登记只插入一个任务，执行时间取最早的
+            jobs = await asyncio.gather(
+                worker.schedule_once("test.job", later), worker.schedule_once("test.job", soon)
+            )
+            assert jobs[0].id == jobs[1].id
+            assert await Job.find(Job.kind == "test.job").count() == 1
+            assert (await _reload(jobs[0])).run_after == soon
+            assert (await worker.schedule_once("test.job", later)).run_after == soon
+
+            # 执行中的任务不合并新的登记
+            await Job.get_motor_collection().update_one({"_id": jobs[0].id}, {"$set": {"run_after": now}})
+            claimed = await worker.claim()
+            assert claimed is not None and claimed.queued_key is None
+            queued = await worker.schedule_once("test.job", later)
+            assert queued.id != claimed.id and queued.status == "queued"
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.models import PaperCreate, StoredFile, User
+from app.services.paper_services import PaperService
+from app.tests.utils.db import isolated_database
+from app.utils.file_helper import FileHelper
+
+
+def _source(directory: Path, name: str, content: bytes) -> str:
+    path = directory / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_failed_insert_releases_content(tmp_path: Path) -> None:
+    async def scenario() -> None:
+        async with isolated_database():
+            service = PaperService(FileHelper(str(tmp_path / "files")))
+            owner = User(email="alice@example.com", full_name=None, hashed_password="hash")
+            await owner.insert()
+            paper_create = PaperCreate(file_name="paper.txt", is_process=False)
+            paper_id = PydanticObjectId()
+
+            paper = await service.create_paper_from_file(
+                owner=owner,
+                paper_create=paper_create,
+                source_path=_source(tmp_path, "a.txt", b"first"),
+                filename="a.txt",
+                paper_id=paper_id,
+            )
+            assert paper.content_hash is not None
+
+            # 论文 id 已存在：插入失败，新内容的引用和文件都被释放
+            with pytest.raises(DuplicateKeyError):
+                await service.create_paper_from_file(
+                    owner=owner,
+                    paper_create=paper_create,
+                    source_path=_source(tmp_path, "b.txt", b"second"),
+                    filename="b.txt",
+                    paper_id=paper_id,
+                )
+            assert await StoredFile.find_all().count() == 1
+            assert not os.path.exists(service.file_helper.content_path(hashlib.sha256(b"second").hexdigest()))
+
+            # 相同内容插入失败：只减少本次的引用，文件仍被原论文引用
+            with pytest.raises(DuplicateKeyError):
+                await service.create_paper_from_file(
+                    owner=owner,
+                    paper_create=paper_create,
+                    source_path=_source(tmp_path, "c.txt", b"first"),
+                    filename="c.txt",
+                    paper_id=paper_id,
+                )
+            stored = await StoredFile.get(paper.content_hash)
+            assert stored is not None and stored.ref_count == 1
+            assert os.path.exists(service.file_helper.content_path(paper.content_hash))
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from uuid import uuid4
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.models import models
+
+
+@asynccontextmanager
+async def isolated_database() -> AsyncIterator[None]:
+    """在独立的临时库中初始化 Beanie（需要可连接的 MongoDB），结束时删除该库"""
+    client: AsyncIOMotorClient[Any] = AsyncIOMotorClient(str(settings.MONGODB_URI))
+    name = f"{settings.MONGO_DB}_test_{uuid4().hex[:8]}"
+    try:
+        await init_beanie(database=client[name], document_models=models)
+        yield
+    finally:
+        await client.drop_database(name)
+        client.close()
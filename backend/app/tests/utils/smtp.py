@@ -0,0 +1,71 @@
+import socketserver
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pytest
+
+from app.core.config import settings
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """只记录收到的邮件的本地 SMTP 服务器；收件人以 reject 开头时返回 550"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages: list[bytes] = []
+        self.connections = 0
+        self.handlers: list[_SMTPHandler] = []
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: SMTPSink
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.connections += 1
+        self.server.handlers.append(self)
+        self._reply("220 sink ready")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250 sink")
+            elif command.startswith("RCPT") and "<REJECT" in command:
+                self._reply("550 no such user")
+            elif command == "DATA":
+                self._reply("354 end with .")
+                data = b""
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    data += chunk
+                self.server.messages.append(data)
+                self._reply("250 queued")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("250 ok")
+
+
+@contextmanager
+def smtp_sink(monkeypatch: pytest.MonkeyPatch) -> Iterator[SMTPSink]:
+    """启动本地 SMTP 服务器，并把 SMTP 配置指向它"""
+    server = SMTPSink()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_SSL", False)
+    monkeypatch.setattr(settings, "SMTP_USER", None)
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "noreply@example.com")
+    monkeypatch.setattr(settings, "EMAILS_FROM_NAME", "AideX")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
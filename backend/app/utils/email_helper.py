@@ -1,10 +1,15 @@
 import logging
+import smtplib
+import ssl
+import threading
+import time
 from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional, Sequence
 
-import emails  # type: ignore
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from app.core.config import settings
 
@@ -18,37 +23,181 @@ class EmailData:
     subject: str
 
 
+EMAIL_TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "email-templates" / "build"
+
+_templates: Optional[Environment] = None
+_templates_lock = threading.Lock()
+
+
+def email_templates() -> Environment:
+    """
+    进程内共享的邮件模板环境
+
+    模板只编译一次，之后从内存中取；编译出的字节码缓存在 jinja2 默认的按用户区分的目录中
+    （只使用属于当前用户且权限为 0700 的目录，避免加载他人写入的字节码），重启后的进程跳过编译
+    （模板内容变化时缓存按校验和失效）。构建产物在运行中不会变化，只在本地环境检查修改。
+    """
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = Environment(
+                    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+                    bytecode_cache=FileSystemBytecodeCache(),
+                    auto_reload=settings.ENVIRONMENT == "local",
+                )
+    return _templates
+
+
+def preload_email_templates() -> int:
+    """启动时编译全部模板，返回模板数"""
+    environment = email_templates()
+    names = environment.list_templates(extensions=["html"])
+    for name in names:
+        environment.get_template(name)
+    return len(names)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
-
-
-def send_email(
-    *,
-    email_to: str,
-    subject: str = "",
-    html_content: str = "",
-) -> None:
-    assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
-    )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    elif settings.SMTP_SSL:
-        smtp_options["ssl"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
+    return email_templates().get_template(template_name).render(context)
+
+
+class SMTPConnectionPool:
+    """
+    持久 SMTP 连接池（线程安全）
+
+    最多同时打开 size 个连接；发送完一批邮件后连接放回池中供下一批复用，
+    空闲超过 EMAIL_SMTP_IDLE_SECONDS 的连接关闭后重建。单封邮件被拒绝时连接继续使用，
+    连接出错时丢弃；从池中取出的连接在第一封邮件上断开时（服务器已关闭空闲连接）重连一次。
+    """
+
+    def __init__(self, size: Optional[int] = None) -> None:
+        self.size = size or settings.EMAIL_SMTP_POOL_SIZE
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        # (连接, 放回时间)，后放回的先取出
+        self._idle: list[tuple[smtplib.SMTP, float]] = []
+        # 建立过的连接数
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        timeout = settings.EMAIL_SMTP_TIMEOUT_SECONDS
+        assert settings.SMTP_HOST, "no provided configuration for email variables"
+        connection: smtplib.SMTP
+        if settings.SMTP_SSL:
+            connection = smtplib.SMTP_SSL(
+                settings.SMTP_HOST, settings.SMTP_PORT, timeout=timeout, context=ssl.create_default_context()
+            )
+        else:
+            connection = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=timeout)
+            if settings.SMTP_TLS:
+                connection.starttls(context=ssl.create_default_context())
+        if settings.SMTP_USER:
+            connection.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        with self._lock:
+            self.connects += 1
+        return connection
+
+    def _acquire(self) -> tuple[smtplib.SMTP, bool]:
+        """取出一个空闲连接（第二项为 True）或新建连接"""
+        now = time.monotonic()
+        stale = []
+        connection = None
+        with self._lock:
+            while self._idle:
+                candidate, released_at = self._idle.pop()
+                if now - released_at <= settings.EMAIL_SMTP_IDLE_SECONDS:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            _close(candidate)
+        if connection is not None:
+            return connection, True
+        return self._connect(), False
+
+    def _release(self, connection: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+
+    def send_messages(self, messages: Sequence[EmailMessage]) -> list[Optional[Exception]]:
+        """
+        用一个连接依次发送，返回每封邮件的错误（成功为 None）
+
+        连接失败时剩余的邮件都以该错误返回。
+        """
+        results: list[Optional[Exception]] = []
+        with self._slots:
+            connection: Optional[smtplib.SMTP] = None
+            try:
+                connection, reused = self._acquire()
+                for message in messages:
+                    while True:
+                        try:
+                            connection.send_message(message)
+                            results.append(None)
+                        except _REJECTED as e:
+                            # 被服务器拒绝的只是这一封邮件（smtplib 已发送 RSET）
+                            results.append(e)
+                        except (smtplib.SMTPException, OSError):
+                            _close(connection)
+                            connection = None
+                            if not reused:
+                                raise
+                            connection, reused = self._connect(), False
+                            continue
+                        reused = False
+                        break
+            except (smtplib.SMTPException, OSError) as e:
+                if connection is not None:
+                    _close(connection)
+                    connection = None
+                logger.warning(f"SMTP connection failed: {e}")
+                results.extend([e] * (len(messages) - len(results)))
+            finally:
+                if connection is not None:
+                    self._release(connection)
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            _close(connection)
+
+
+# 只针对单封邮件的拒绝（收件人、发件人或内容），连接仍然可用
+_REJECTED = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def _close(connection: smtplib.SMTP) -> None:
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """服务器以 5xx 拒绝（收件人不存在等），重试也不会成功"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def build_message(*, message_id: str, email_to: str, subject: str, html_content: str) -> EmailMessage:
+    """构造 HTML 邮件；message_id 对同一封邮件固定，重试时收件方可以据此去重"""
+    assert settings.EMAILS_FROM_EMAIL, "no provided configuration for email variables"
+    domain = settings.EMAILS_FROM_EMAIL.rsplit("@", 1)[-1]
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = formataddr((settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL))
+    message["To"] = email_to
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = f"<{message_id}@{domain}>"
+    message.set_content(html_content, subtype="html")
+    return message
 
 
 def generate_test_email(email_to: str) -> EmailData:
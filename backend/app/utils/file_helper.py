@@ -1,11 +1,20 @@
+import errno
+import hashlib
 import os
-from typing import Union
+import shutil
+import time
+import uuid
+from urllib.parse import parse_qs, quote, urlencode, urlparse
+from typing import AsyncIterator, BinaryIO, Optional, Union
 from fastapi import File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 import aiofiles  # 用于异步文件操作
 import logging
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import sign_download
 
-from app.exceptions.file_exceptions import FileTypeError  # 用于日志记录
+from app.exceptions.file_exceptions import FileTooLarge, FileTypeError  # 用于日志记录
 
 logger = logging.getLogger(__name__)
 
@@ -60,21 +69,276 @@ class FileHelper:
         is_binary = isinstance(content, bytes)
         return self._write_file(full_path, content, binary=is_binary)
 
-    async def save_from_upload_file(self, file: UploadFile, file_name: str = None) -> str:
-        """从 FastAPI 的 UploadFile 对象保存文件"""
+    async def save_from_upload_file(self, file: UploadFile, file_name: str = None, max_size: Optional[int] = None) -> str:
+        """
+        从 FastAPI 的 UploadFile 对象保存文件
+
+        不把整个文件读入内存：已落盘的上传临时文件用 copy_file_range/sendfile 在内核中复制，
+        仍在内存中的小文件按 UPLOAD_CHUNK_SIZE_BYTES 分块写出。先写入 .part 文件再原子替换。
+
+        异常:
+            FileTooLarge: 文件超过 max_size（默认 UPLOAD_MAX_SIZE_BYTES）
+        """
         if not file_name:
             file_name = file.filename
+        if max_size is None:
+            max_size = settings.UPLOAD_MAX_SIZE_BYTES
 
         full_path = os.path.join(self.file_path, file_name)
 
         if not self._prepare_file_path(full_path):
             return False
 
-        content = await file.read()
-        is_binary = isinstance(content, bytes)
-        await self._write_file(full_path, content, binary=is_binary)
+        self._check_upload_size(file, max_size)
+        await self._store_upload(file, full_path, max_size, label=file_name)
         return file_name
-    
+
+    async def save_content_addressed(self, file: UploadFile, max_size: Optional[int] = None) -> tuple[str, int, bool]:
+        """
+        按内容的 SHA-256 保存上传文件
+
+        先对上传临时文件计算哈希，相同内容的文件已存在时不再写盘。
+        文件保存在 <file_path>/<哈希前两位>/<哈希> 下。
+
+        返回:
+            (content_hash, size, written)，written 表示本次是否写入了文件
+        """
+        if max_size is None:
+            max_size = settings.UPLOAD_MAX_SIZE_BYTES
+        self._check_upload_size(file, max_size)
+
+        content_hash, size = await self._hash_upload(file, max_size)
+        full_path = self.content_path(content_hash)
+        if os.path.isfile(full_path):
+            metrics.incr("upload.deduplicated")
+            self.logger.info(f"Upload {file.filename} deduplicated as {content_hash}")
+            return content_hash, size, False
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        await self._store_upload(file, full_path, max_size, label=file.filename)
+        return content_hash, size, True
+
+    async def hash_file(self, full_path: str) -> tuple[str, int]:
+        """在线程池中计算本地文件的 SHA-256，返回 (十六进制哈希, 字节数)"""
+        with open(full_path, "rb") as source:
+            return await run_in_threadpool(self._hash_fd, source.fileno(), 0)
+
+    async def store_content_from_path(self, source_path: str, content_hash: str, overwrite: bool = False) -> bool:
+        """
+        把本地文件（如续传上传拼好的临时文件）移入内容寻址存储
+
+        相同内容已存在且不要求覆盖时直接删除源文件。返回是否移入了文件。
+        """
+        full_path = self.content_path(content_hash)
+        if not overwrite and os.path.isfile(full_path):
+            os.remove(source_path)
+            metrics.incr("upload.deduplicated")
+            self.logger.info(f"Upload {source_path} deduplicated as {content_hash}")
+            return False
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        size = os.path.getsize(source_path)
+        await run_in_threadpool(self._move_file, source_path, full_path)
+        metrics.incr("upload.files")
+        metrics.incr("upload.bytes", size)
+        return True
+
+    @staticmethod
+    def _move_file(source_path: str, dest_path: str) -> None:
+        """移动文件；跨文件系统时先复制为 .part 再原子替换"""
+        try:
+            os.replace(source_path, dest_path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        part_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+        try:
+            shutil.copyfile(source_path, part_path)
+            os.replace(part_path, dest_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.remove(source_path)
+
+    async def write_stream_at(
+        self, full_path: str, offset: int, stream: AsyncIterator[bytes], max_bytes: int
+    ) -> int:
+        """
+        把请求体流写入文件的 offset 处，返回写入的字节数
+
+        写入前把文件截断到 offset，丢弃上次中断的请求留下的未确认数据。
+        数据按 UPLOAD_CHUNK_SIZE_BYTES 合并后用 pwrite 写出。
+
+        异常:
+            FileTooLarge: 写入的字节数超过 max_bytes
+        """
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        fd = os.open(full_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, offset)
+            written = 0
+            buffer = bytearray()
+            async for chunk in stream:
+                if written + len(buffer) + len(chunk) > max_bytes:
+                    raise FileTooLarge
+                buffer += chunk
+                if len(buffer) >= settings.UPLOAD_CHUNK_SIZE_BYTES:
+                    written += await run_in_threadpool(self._pwrite_all, fd, bytes(buffer), offset + written)
+                    buffer.clear()
+            if buffer:
+                written += await run_in_threadpool(self._pwrite_all, fd, bytes(buffer), offset + written)
+            return written
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _pwrite_all(fd: int, data: bytes, offset: int) -> int:
+        view = memoryview(data)
+        while view:
+            count = os.pwrite(fd, view, offset)
+            offset += count
+            view = view[count:]
+        return len(data)
+
+    @staticmethod
+    def _check_upload_size(file: UploadFile, max_size: int) -> None:
+        # 上传内容已由 multipart 解析器接收完毕，大小已知时在复制前直接拒绝
+        if max_size and file.size is not None and file.size > max_size:
+            raise FileTooLarge
+
+    async def _store_upload(self, file: UploadFile, full_path: str, max_size: int, label: Optional[str]) -> None:
+        """把上传内容复制到 full_path（先写 .part 再原子替换），并记录指标"""
+        started = time.monotonic()
+        # 并发写入相同内容时各自使用独立的临时文件
+        part_path = f"{full_path}.{uuid.uuid4().hex}.part"
+        try:
+            if self._is_on_disk(file.file):
+                size, method = await run_in_threadpool(
+                    self._copy_fd, file.file, part_path, max_size
+                )
+                peak_buffer = 0
+            else:
+                size, peak_buffer = await self._copy_chunks(file, part_path, max_size)
+                method = "chunked"
+            os.replace(part_path, full_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        metrics.incr("upload.files")
+        metrics.incr("upload.bytes", size)
+        metrics.max_gauge("upload.peak_buffer_bytes", peak_buffer)
+        self.logger.info(
+            f"Saved upload {label}: {size} bytes via {method}, "
+            f"peak buffer {peak_buffer} bytes, {time.monotonic() - started:.3f}s"
+        )
+
+    async def _hash_upload(self, file: UploadFile, max_size: int) -> tuple[str, int]:
+        """分块计算上传内容的 SHA-256，返回 (十六进制哈希, 字节数)"""
+        if self._is_on_disk(file.file):
+            return await run_in_threadpool(self._hash_fd, file.file.fileno(), max_size)
+
+        digest = hashlib.sha256()
+        size = 0
+        await file.seek(0)
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE_BYTES):
+            size += len(chunk)
+            if max_size and size > max_size:
+                raise FileTooLarge
+            digest.update(chunk)
+        return digest.hexdigest(), size
+
+    @staticmethod
+    def _hash_fd(fd: int, max_size: int) -> tuple[str, int]:
+        """用 pread 分块读取文件计算 SHA-256（不改变文件位置）"""
+        size = os.fstat(fd).st_size
+        if max_size and size > max_size:
+            raise FileTooLarge
+        digest = hashlib.sha256()
+        offset = 0
+        while offset < size:
+            chunk = os.pread(fd, settings.UPLOAD_CHUNK_SIZE_BYTES, offset)
+            if not chunk:
+                break
+            digest.update(chunk)
+            offset += len(chunk)
+        return digest.hexdigest(), offset
+
+    @staticmethod
+    def is_content_hash(key: str) -> bool:
+        """是否为内容寻址存储的键（64 位十六进制 SHA-256）"""
+        return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
+
+    def content_path(self, content_hash: str) -> str:
+        """内容寻址文件的完整路径"""
+        return os.path.join(self.file_path, content_hash[:2], content_hash)
+
+    def remove_content(self, content_hash: str) -> None:
+        """删除内容寻址文件（不存在时忽略）"""
+        try:
+            os.remove(self.content_path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _is_on_disk(source: BinaryIO) -> bool:
+        """上传临时文件是否已写入磁盘（SpooledTemporaryFile 超过阈值后才落盘）"""
+        if not getattr(source, "_rolled", True):
+            return False
+        try:
+            source.fileno()
+        except (OSError, AttributeError, ValueError):
+            return False
+        return True
+
+    async def _copy_chunks(self, file: UploadFile, dest_path: str, max_size: int) -> tuple[int, int]:
+        """分块复制，返回 (写入字节数, 单次缓冲的最大字节数)"""
+        chunk_size = settings.UPLOAD_CHUNK_SIZE_BYTES
+        size = 0
+        peak_buffer = 0
+        await file.seek(0)
+        async with aiofiles.open(dest_path, "wb") as dest:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise FileTooLarge
+                peak_buffer = max(peak_buffer, len(chunk))
+                await dest.write(chunk)
+        return size, peak_buffer
+
+    @staticmethod
+    def _copy_fd(source: BinaryIO, dest_path: str, max_size: int) -> tuple[int, str]:
+        """在内核中复制文件内容（在线程池中执行），返回 (写入字节数, 复制方式)"""
+        src_fd = source.fileno()
+        size = os.fstat(src_fd).st_size
+        if max_size and size > max_size:
+            raise FileTooLarge
+
+        with open(dest_path, "wb") as dest:
+            dest_fd = dest.fileno()
+            offset = 0
+            method = "copy_file_range"
+            while offset < size:
+                try:
+                    if method == "copy_file_range":
+                        copied = os.copy_file_range(src_fd, dest_fd, size - offset, offset, offset)
+                    else:
+                        copied = os.sendfile(dest_fd, src_fd, offset, size - offset)
+                except (AttributeError, OSError):
+                    # 旧内核或跨文件系统不支持 copy_file_range 时退回 sendfile
+                    if method == "sendfile":
+                        raise
+                    method = "sendfile"
+                    os.lseek(dest_fd, offset, os.SEEK_SET)
+                    continue
+                if copied == 0:
+                    break
+                offset += copied
+        return offset, method
+
     @staticmethod
     async def validate_upload_file(file: UploadFile = File(...), allowed_types: list[str] = None) -> UploadFile:
         """
@@ -102,12 +366,53 @@ class FileHelper:
         
     
     def gen_full_path(self, file_name: str) -> str:
-        """生成文件的完整路径"""
+        """生成文件的完整路径，支持内容寻址的键和旧的按文件名保存的文件"""
+        if not file_name or os.path.basename(file_name) != file_name:
+            return ""
+        if self.is_content_hash(file_name):
+            full_path = self.content_path(file_name)
+            return full_path if os.path.isfile(full_path) else ""
         is_exit = self._check_file_exit(file_name=file_name)
         if not is_exit:
             return ""
         return os.path.join(self.file_path, file_name)
     
-    def gen_down_url(self, saved_file_name:str) -> str:
-        """生成文件的下载地址"""
-        return f"{settings.BACKEND_HOST}/api/v1/utils/download/?file_name={saved_file_name}"
\ No newline at end of file
+    def gen_down_url(
+        self,
+        saved_file_name: str,
+        download_name: Optional[str] = None,
+        expires_in: Optional[int] = None,
+    ) -> str:
+        """
+        生成带签名的文件下载地址
+
+        参数:
+            saved_file_name: 保存的文件名或内容哈希
+            download_name: 下载时使用的文件名
+            expires_in: 有效期（秒），默认 DOWNLOAD_URL_TTL_SECONDS
+        """
+        if expires_in is None:
+            expires_in = settings.DOWNLOAD_URL_TTL_SECONDS
+        expires = int(time.time()) + expires_in
+        query = {
+            "file_name": saved_file_name,
+            "expires": expires,
+            "signature": sign_download(saved_file_name, expires, download_name),
+        }
+        if download_name:
+            query["name"] = download_name
+        return f"{settings.BACKEND_HOST}/api/v1/utils/download/?{urlencode(query)}"
+
+    def resign_down_url(self, url: str) -> Optional[str]:
+        """为已保存的下载地址（包括签名已过期和旧的未签名地址）生成新的签名地址"""
+        query = parse_qs(urlparse(url).query)
+        saved_file_name = query.get("file_name", [None])[0]
+        if not saved_file_name:
+            return None
+        return self.gen_down_url(saved_file_name, download_name=query.get("name", [None])[0])
+
+    def gen_accel_path(self, file_name: str) -> str:
+        """文件相对 DOWNLOAD_DIR 的路径，拼在 DOWNLOAD_ACCEL_PREFIX 后交给 nginx"""
+        full_path = self.gen_full_path(file_name)
+        relative = os.path.relpath(full_path, self.file_path).replace(os.sep, "/")
+        return settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative)
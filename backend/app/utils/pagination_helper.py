@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Literal, Optional, TypeVar
+
+from beanie import Document, PydanticObjectId
+from bson.errors import InvalidId
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.exceptions.base import ParamException
+from app.models.counter import Counter
+
+DocumentT = TypeVar("DocumentT", bound=Document)
+
+# exact: count_documents 精确计数
+# estimated: 无过滤条件时读取集合元数据，有计数器时读取增量计数器
+TotalMode = Literal["exact", "estimated"]
+
+# 列表统一按 (created_at, _id) 倒序，与各模型上的复合索引一致
+KEYSET_SORT = ("-created_at", "-_id")
+
+
+def encode_cursor(created_at: datetime, id: PydanticObjectId) -> str:
+    """把最后一条记录的排序键编码为不透明游标"""
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, PydanticObjectId]:
+    """解析游标，格式错误时抛出 ParamException"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), PydanticObjectId(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise ParamException("invalid cursor")
+
+
+def keyset_filter(cursor: str) -> dict[str, Any]:
+    """生成“排在游标之后”的查询条件"""
+    created_at, id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": id}},
+        ]
+    }
+
+
+async def fetch_page(
+    model: type[DocumentT],
+    *filters: Any,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    projection_model: Optional[type[BaseModel]] = None,
+) -> tuple[list[Any], Optional[str]]:
+    """
+    获取一页文档
+
+    传入 cursor 时使用键集分页（忽略 skip），否则沿用 skip/limit 分页。
+    两种模式排序一致，都会在还有下一页时返回 next_cursor。
+    传入 projection_model 时只查询该模型的字段并直接构建该模型（需包含 id 和 created_at），
+    跳过 Document 的创建和状态快照，适合只读列表。
+    """
+    if cursor:
+        query = model.find(*filters, keyset_filter(cursor))
+    else:
+        query = model.find(*filters)
+        if skip:
+            query = query.skip(skip)
+    query = query.sort(*KEYSET_SORT)
+    if projection_model is not None:
+        query = query.project(projection_model)  # type: ignore[arg-type]
+    if limit <= 0:
+        return await query.to_list(), None
+
+    documents = await query.limit(limit + 1).to_list()
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        assert last.id is not None
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return documents, next_cursor
+
+
+async def count_documents(
+    model: type[Document],
+    *filters: Any,
+    mode: TotalMode = "exact",
+    counter_key: Optional[str] = None,
+) -> int:
+    """统计列表总数"""
+    if mode == "estimated":
+        if not filters:
+            return await model.get_motor_collection().estimated_document_count()
+        if counter_key:
+            return await Counter.read(
+                counter_key,
+                lambda: model.find(*filters).count(),
+                max_age=settings.COUNTER_RECOUNT_SECONDS,
+            )
+    return await model.find(*filters).count()
+
+
+async def fetch_page_with_total(
+    model: type[DocumentT],
+    *filters: Any,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    total_mode: TotalMode = "exact",
+    counter_key: Optional[str] = None,
+    projection_model: Optional[type[BaseModel]] = None,
+) -> tuple[list[Any], Optional[str], Optional[int]]:
+    """获取一页文档及总数（不需要总数时返回 None），计数与分页查询并发执行"""
+    page = fetch_page(
+        model,
+        *filters,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        projection_model=projection_model,
+    )
+    if not include_total:
+        documents, next_cursor = await page
+        return documents, next_cursor, None
+
+    (documents, next_cursor), total = await asyncio.gather(
+        page,
+        count_documents(model, *filters, mode=total_mode, counter_key=counter_key),
+    )
+    return documents, next_cursor, total
@@ -0,0 +1,330 @@
+"""
+论文预览：把 Markdown / DOCX 转换为安全的 HTML 片段，并生成目录
+
+Markdown 用 markdown-it（CommonMark + 表格、删除线）渲染，关闭原始 HTML，链接地址经过
+markdown-it 的校验（拒绝 javascript: 等协议）；DOCX 直接由 word/document.xml 生成有限的标签
+（标题、段落、列表、表格、粗体等），所有文本都经过转义，超链接只保留 http(s) 和 mailto。
+标题带 id，目录为 [{"level", "title", "anchor"}]。
+
+结果按内容哈希缓存在 PAPER_DATA_DIR/previews/<哈希前两位>/<哈希>-v<版本>.html 和 .toc.json，
+访问时更新文件的 atime，缓存总大小超过上限时按 atime 淘汰最久未访问的预览。
+这里的函数是同步的，渲染在进程池中执行。修改输出时需递增 PREVIEW_VERSION。
+"""
+import html
+import json
+import os
+import re
+import time
+import unicodedata
+import uuid
+import zipfile
+from typing import Any, Optional
+from xml.etree import ElementTree
+
+from markdown_it import MarkdownIt
+
+from app.core.config import settings
+from app.utils.text_helper import UnsupportedDocument, detect_format, read_plain_text
+
+PREVIEW_VERSION = 1
+
+# 可以预览的格式（PDF 由浏览器直接打开）
+PREVIEW_FORMATS = ("text", "docx")
+
+# 淘汰到上限的该比例以下，避免每次生成后都要淘汰
+_EVICT_TARGET = 0.9
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_R = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_HEADING_NAME_RE = re.compile(r"^(?:heading|标题)\s*([1-6])$", re.IGNORECASE)
+_SAFE_URL_RE = re.compile(r"^(?:https?:|mailto:)", re.IGNORECASE)
+_LINK_REL = "nofollow noopener noreferrer"
+
+TocEntry = dict[str, Any]
+
+
+def preview_paths(content_hash: str) -> tuple[str, str]:
+    """内容哈希对应的 (HTML 路径, 目录路径)"""
+    base = os.path.join(settings.PAPER_DATA_DIR, "previews", content_hash[:2], f"{content_hash}-v{PREVIEW_VERSION}")
+    return f"{base}.html", f"{base}.toc.json"
+
+
+class _Anchors:
+    """由标题生成页内唯一的 id"""
+
+    def __init__(self) -> None:
+        self.used: set[str] = set()
+
+    def make(self, title: str) -> str:
+        slug = "-".join(
+            "".join(char for char in unicodedata.normalize("NFKC", title).lower() if char.isalnum() or char.isspace()).split()
+        ) or "section"
+        anchor, suffix = slug, 1
+        while anchor in self.used:
+            suffix += 1
+            anchor = f"{slug}-{suffix}"
+        self.used.add(anchor)
+        return anchor
+
+
+def render_markdown(text: str) -> tuple[str, list[TocEntry]]:
+    md = MarkdownIt("commonmark", {"html": False}).enable(["table", "strikethrough"])
+    tokens = md.parse(text)
+    anchors = _Anchors()
+    toc: list[TocEntry] = []
+    for index, token in enumerate(tokens):
+        if token.type == "heading_open":
+            children = tokens[index + 1].children or []
+            title = "".join(child.content for child in children if child.type in ("text", "code_inline")).strip()
+            anchor = anchors.make(title)
+            token.attrSet("id", anchor)
+            toc.append({"level": int(token.tag[1]), "title": title, "anchor": anchor})
+        elif token.type == "inline":
+            for child in token.children or []:
+                if child.type == "link_open":
+                    child.attrSet("rel", _LINK_REL)
+    return md.renderer.render(tokens, md.options, {}), toc
+
+
+def render_docx(path: str) -> tuple[str, list[TocEntry]]:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            body = ElementTree.fromstring(archive.read("word/document.xml")).find(f"{_W}body")
+            links = _docx_links(archive)
+            heading_styles = _docx_heading_styles(archive)
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+        raise UnsupportedDocument(f"invalid docx: {e}") from e
+
+    parts: list[str] = []
+    toc: list[TocEntry] = []
+    anchors = _Anchors()
+    in_list = False
+    for element in body if body is not None else []:
+        is_item = element.tag == f"{_W}p" and element.find(f"{_W}pPr/{_W}numPr") is not None
+        if in_list and not is_item:
+            parts.append("</ul>")
+            in_list = False
+        if element.tag == f"{_W}tbl":
+            parts.append(_docx_table(element, links))
+            continue
+        if element.tag != f"{_W}p":
+            continue
+        content = _docx_runs(element, links)
+        level = _docx_heading_level(element, heading_styles)
+        if level:
+            title = "".join(node.text or "" for node in element.iter(f"{_W}t")).strip()
+            anchor = anchors.make(title)
+            toc.append({"level": level, "title": title, "anchor": anchor})
+            parts.append(f'<h{level} id="{anchor}">{content}</h{level}>')
+        elif is_item:
+            if not in_list:
+                parts.append("<ul>")
+                in_list = True
+            parts.append(f"<li>{content}</li>")
+        elif content.strip():
+            parts.append(f"<p>{content}</p>")
+    if in_list:
+        parts.append("</ul>")
+    return "\n".join(parts) + "\n", toc
+
+
+def _docx_links(archive: zipfile.ZipFile) -> dict[str, str]:
+    """关系 id -> 外部链接地址（只保留安全的协议）"""
+    try:
+        root = ElementTree.fromstring(archive.read("word/_rels/document.xml.rels"))
+    except KeyError:
+        return {}
+    return {
+        rel.get("Id", ""): rel.get("Target", "")
+        for rel in root.iter(f"{_PACKAGE_R}Relationship")
+        if rel.get("TargetMode") == "External" and _SAFE_URL_RE.match(rel.get("Target", ""))
+    }
+
+
+def _docx_heading_styles(archive: zipfile.ZipFile) -> dict[str, int]:
+    """样式 id -> 标题级别；中文版 Word 的样式 id 是数字，按样式名或大纲级别判断"""
+    try:
+        root = ElementTree.fromstring(archive.read("word/styles.xml"))
+    except KeyError:
+        return {"Title": 1, **{f"Heading{level}": level for level in range(1, 7)}}
+    styles = {}
+    for style in root.iter(f"{_W}style"):
+        style_id = style.get(f"{_W}styleId", "")
+        name_element = style.find(f"{_W}name")
+        name = name_element.get(f"{_W}val", "") if name_element is not None else ""
+        match = _HEADING_NAME_RE.match(name)
+        if name.lower() == "title":
+            styles[style_id] = 1
+        elif match:
+            styles[style_id] = int(match.group(1))
+        elif level := _outline_level(style):
+            styles[style_id] = level
+    return styles
+
+
+def _outline_level(element: ElementTree.Element) -> int:
+    """段落或样式的大纲级别（1-6），没有或为正文级别时为 0"""
+    outline = element.find(f"{_W}pPr/{_W}outlineLvl")
+    value = outline.get(f"{_W}val", "") if outline is not None else ""
+    return int(value) + 1 if value.isdigit() and int(value) < 6 else 0
+
+
+def _docx_heading_level(paragraph: ElementTree.Element, styles: dict[str, int]) -> int:
+    if level := _outline_level(paragraph):
+        return level
+    style = paragraph.find(f"{_W}pPr/{_W}pStyle")
+    return styles.get(style.get(f"{_W}val", ""), 0) if style is not None else 0
+
+
+def _docx_runs(paragraph: ElementTree.Element, links: dict[str, str]) -> str:
+    parts = []
+    for child in paragraph:
+        if child.tag == f"{_W}r":
+            parts.append(_docx_run(child))
+        elif child.tag == f"{_W}hyperlink":
+            inner = "".join(_docx_run(run) for run in child.iter(f"{_W}r"))
+            target = links.get(child.get(f"{_R}id", ""))
+            if target:
+                inner = f'<a href="{html.escape(target)}" rel="{_LINK_REL}">{inner}</a>'
+            parts.append(inner)
+    return "".join(parts)
+
+
+def _docx_run(run: ElementTree.Element) -> str:
+    text = []
+    for node in run:
+        if node.tag == f"{_W}t":
+            text.append(html.escape(node.text or ""))
+        elif node.tag == f"{_W}tab":
+            text.append(" ")
+        elif node.tag == f"{_W}br" and node.get(f"{_W}type") != "page":
+            text.append("<br>")
+    content = "".join(text)
+    properties = run.find(f"{_W}rPr")
+    if not content or properties is None:
+        return content
+    for tag, element in (("strong", "b"), ("em", "i"), ("u", "u"), ("s", "strike")):
+        flag = properties.find(f"{_W}{element}")
+        if flag is not None and flag.get(f"{_W}val", "true") not in ("0", "false", "none"):
+            content = f"<{tag}>{content}</{tag}>"
+    align = properties.find(f"{_W}vertAlign")
+    if align is not None and align.get(f"{_W}val") in ("superscript", "subscript"):
+        tag = "sup" if align.get(f"{_W}val") == "superscript" else "sub"
+        content = f"<{tag}>{content}</{tag}>"
+    return content
+
+
+def _docx_table(table: ElementTree.Element, links: dict[str, str]) -> str:
+    rows = []
+    for row in table.iter(f"{_W}tr"):
+        cells = [
+            "<td>" + "<br>".join(_docx_runs(paragraph, links) for paragraph in cell.iter(f"{_W}p")) + "</td>"
+            for cell in row.findall(f"{_W}tc")
+        ]
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return "<table>\n" + "\n".join(rows) + "\n</table>"
+
+
+def render_preview(source_path: str) -> tuple[str, list[TocEntry]]:
+    """按格式渲染，返回 (HTML 片段, 目录)；不支持预览的格式抛出 UnsupportedDocument"""
+    document_format = detect_format(source_path)
+    if document_format == "docx":
+        return render_docx(source_path)
+    if document_format == "text":
+        return render_markdown(read_plain_text(source_path))
+    raise UnsupportedDocument(f"preview is not supported for {document_format}")
+
+
+def render_to_cache(source_path: str, html_path: str, toc_path: str) -> int:
+    """
+    渲染并写入缓存（在进程池中执行，路径由调用方按 preview_paths 给出），返回 HTML 的字节数
+
+    先写目录再写 HTML：HTML 存在即表示预览可用。
+    """
+    body, toc = render_preview(source_path)
+    data = body.encode("utf-8")
+    _write_atomic(toc_path, json.dumps(toc, ensure_ascii=False).encode("utf-8"))
+    _write_atomic(html_path, data)
+    return len(data)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(part_path, "wb") as file:
+            file.write(data)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+def read_toc(content_hash: str) -> Optional[list[TocEntry]]:
+    """缓存的目录，预览尚未生成（或已被淘汰）时为 None"""
+    html_path, toc_path = preview_paths(content_hash)
+    if not os.path.isfile(html_path):
+        return None
+    try:
+        with open(toc_path, encoding="utf-8") as file:
+            toc: list[TocEntry] = json.load(file)
+            return toc
+    except FileNotFoundError:
+        return None
+
+
+def touch(path: str) -> None:
+    """记录访问时间（只改 atime，mtime 用于 Last-Modified 不变）"""
+    try:
+        stat_result = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), stat_result.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+
+
+def evict_previews(max_bytes: int) -> int:
+    """
+    缓存总大小超过 max_bytes 时，按 HTML 的 atime 从旧到新删除预览，直到低于上限的 90%
+
+    返回删除的预览数。
+    """
+    root = os.path.join(settings.PAPER_DATA_DIR, "previews")
+    entries: dict[str, list[Any]] = {}
+    total = 0
+    try:
+        shards = list(os.scandir(root))
+    except FileNotFoundError:
+        return 0
+    for shard in shards:
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(".part"):
+                continue
+            try:
+                stat_result = entry.stat()
+            except FileNotFoundError:
+                continue
+            base = entry.path.rsplit(".", 2)[0] if entry.name.endswith(".toc.json") else entry.path.rsplit(".", 1)[0]
+            item = entries.setdefault(base, [0.0, 0])
+            if entry.name.endswith(".html"):
+                item[0] = stat_result.st_atime
+            item[1] += stat_result.st_size
+            total += stat_result.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for base, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+        if total <= max_bytes * _EVICT_TARGET:
+            break
+        for path in (f"{base}.html", f"{base}.toc.json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,279 @@
+"""
+论文文本抽取
+
+这里的函数是同步的 CPU 密集型操作，在进程池中执行，不能依赖事件循环或数据库。
+抽取结果按页以换页符 \\f 连接，缓存在 PAPER_DATA_DIR/text/<哈希前两位>/<哈希>.txt。
+同目录的 <哈希>.pages 是页索引：页数 + 1 个 uint64，第 i 个为第 i 页在文本文件中的
+字节偏移，最后一个为文件大小 + 1（相当于末尾还有一个分隔符），读取页范围时只读对应的字节。
+"""
+import os
+import uuid
+import zipfile
+from array import array
+from typing import Literal, Optional
+from xml.etree import ElementTree
+
+from app.core.config import settings
+
+DocumentFormat = Literal["pdf", "docx", "doc", "text"]
+
+PAGE_SEPARATOR = "\f"
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class UnsupportedDocument(ValueError):
+    """无法抽取文本的文档（格式不支持或文件损坏），重试也不会成功"""
+
+
+def text_cache_path(content_hash: str) -> str:
+    """内容哈希对应的文本缓存路径"""
+    return os.path.join(settings.PAPER_DATA_DIR, "text", content_hash[:2], f"{content_hash}.txt")
+
+
+def page_index_path(content_hash: str) -> str:
+    """内容哈希对应的页索引路径"""
+    return os.path.join(settings.PAPER_DATA_DIR, "text", content_hash[:2], f"{content_hash}.pages")
+
+
+def paper_text_path(paper_id: str) -> str:
+    """
+    按论文保存的文本，只用于全文检索索引
+
+    PDF 论文采用近似重复原件（非 PDF）的文本时写入这里，内容哈希对应的缓存仍是 PDF 自身的文本，
+    页码和 /pages 不受影响。
+    """
+    return os.path.join(settings.PAPER_DATA_DIR, "text", "papers", f"{paper_id}.txt")
+
+
+def index_text_path(paper_id: str, text_path: str) -> str:
+    """论文写入全文检索索引时使用的文本：有按论文保存的文本时用它，否则为 text_path"""
+    path = paper_text_path(paper_id)
+    return path if os.path.isfile(path) else text_path
+
+
+def remove_paper_text(paper_id: str) -> None:
+    """删除按论文保存的文本及其页索引（不存在时忽略）"""
+    path = paper_text_path(paper_id)
+    for file_path in (path, _index_path_of(path)):
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_text_cache(content_hash: str) -> None:
+    """删除内容哈希对应的文本缓存和页索引（不存在时忽略）"""
+    for path in (text_cache_path(content_hash), page_index_path(content_hash)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def detect_format(path: str) -> DocumentFormat:
+    """按文件头识别文档格式，不依赖上传时声明的 content type"""
+    with open(path, "rb") as file:
+        head = file.read(8)
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise UnsupportedDocument("zip archive is not a docx document")
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "doc"
+    return "text"
+
+
+def extract_pdf_pages(path: str) -> list[str]:
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError as e:  # pragma: no cover - 依赖缺失时直接失败
+        raise UnsupportedDocument("pypdf is not installed") from e
+    try:
+        reader = PdfReader(path)
+        return [page.extract_text() or "" for page in reader.pages]
+    except PdfReadError as e:
+        raise UnsupportedDocument(f"invalid pdf: {e}") from e
+
+
+def extract_docx_pages(path: str) -> list[str]:
+    """
+    从 word/document.xml 中流式读取段落文本
+
+    分页依据显式分页符和 Word 保存时记录的 lastRenderedPageBreak。
+    """
+    pages: list[str] = []
+    paragraphs: list[str] = []
+    runs: list[str] = []
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+            for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == f"{_W}lastRenderedPageBreak" or (
+                        tag == f"{_W}br" and element.get(f"{_W}type") == "page"
+                    ):
+                        if runs:
+                            paragraphs.append("".join(runs))
+                            runs = []
+                        if paragraphs:
+                            pages.append("\n".join(paragraphs))
+                            paragraphs = []
+                    continue
+                if tag == f"{_W}t":
+                    runs.append(element.text or "")
+                elif tag == f"{_W}tab":
+                    runs.append("\t")
+                elif tag == f"{_W}p":
+                    paragraphs.append("".join(runs))
+                    runs = []
+                    element.clear()
+    except (KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+        raise UnsupportedDocument(f"invalid docx: {e}") from e
+    if runs:
+        paragraphs.append("".join(runs))
+    if paragraphs or not pages:
+        pages.append("\n".join(paragraphs))
+    return pages
+
+
+def read_plain_text(path: str) -> str:
+    """读取 Markdown / 纯文本，依次尝试 UTF-8 和 GB18030 编码"""
+    with open(path, "rb") as file:
+        data = file.read()
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")
+
+
+def extract_plain_pages(path: str) -> list[str]:
+    return read_plain_text(path).split(PAGE_SEPARATOR)
+
+
+def extract_pages(path: str) -> list[str]:
+    """按格式抽取每一页的文本"""
+    document_format = detect_format(path)
+    if document_format == "pdf":
+        pages = extract_pdf_pages(path)
+    elif document_format == "docx":
+        pages = extract_docx_pages(path)
+    elif document_format == "text":
+        pages = extract_plain_pages(path)
+    else:
+        raise UnsupportedDocument(f"unsupported document format: {document_format}")
+    return [page.replace(PAGE_SEPARATOR, "\n") for page in pages]
+
+
+def extract_to_cache(source_path: str, dest_path: str) -> dict[str, int]:
+    """
+    抽取文本并写入缓存文件（在进程池中执行）
+
+    先写临时文件再原子替换，返回 {"pages": 页数, "chars": 字符数}。
+    """
+    pages = extract_pages(source_path)
+    text = PAGE_SEPARATOR.join(pages)
+    _write_text_cache(dest_path, text)
+    return {"pages": len(pages), "chars": len(text)}
+
+
+def adopt_text(source_text_path: str, dest_path: str) -> bool:
+    """把另一份文档已抽取的文本复制为 dest_path，源缓存不存在时返回 False"""
+    try:
+        with open(source_text_path, encoding="utf-8") as file:
+            text = file.read()
+    except FileNotFoundError:
+        return False
+    _write_text_cache(dest_path, text)
+    return True
+
+
+def _write_text_cache(dest_path: str, text: str) -> None:
+    """写入文本缓存及其页索引（先文本后索引，索引比文本旧时读取方会重建）"""
+    _write_atomic(dest_path, text.encode("utf-8"))
+    offsets = array("Q", [0])
+    for page in text.split(PAGE_SEPARATOR):
+        offsets.append(offsets[-1] + len(page.encode("utf-8")) + 1)
+    _write_atomic(_index_path_of(dest_path), offsets.tobytes())
+
+
+def _write_atomic(dest_path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    part_path = f"{dest_path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(part_path, "wb") as file:
+            file.write(data)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+def _index_path_of(text_path: str) -> str:
+    return os.path.splitext(text_path)[0] + ".pages"
+
+
+def _load_page_index(text_path: str) -> "array[int]":
+    """
+    读取页索引；索引缺失或与文本不一致（旧版本的缓存、写入文本后中断）时扫描文本重建
+
+    分隔符 \\f 在 UTF-8 中是单字节，按字节扫描即可得到偏移。
+    """
+    index_path = _index_path_of(text_path)
+    text_stat = os.stat(text_path)
+    offsets = array("Q")
+    try:
+        index_stat = os.stat(index_path)
+        with open(index_path, "rb") as file:
+            offsets.frombytes(file.read())
+    except (FileNotFoundError, ValueError):
+        index_stat = None
+    if index_stat and index_stat.st_mtime_ns >= text_stat.st_mtime_ns and offsets and offsets[-1] == text_stat.st_size + 1:
+        return offsets
+
+    offsets = array("Q", [0])
+    position = 0
+    with open(text_path, "rb") as file:
+        while block := file.read(1 << 20):
+            start = 0
+            while (found := block.find(b"\f", start)) >= 0:
+                offsets.append(position + found + 1)
+                start = found + 1
+            position += len(block)
+    offsets.append(position + 1)
+    _write_atomic(index_path, offsets.tobytes())
+    return offsets
+
+
+def read_page_range(content_hash: str, start: int, end: Optional[int] = None) -> tuple[int, list[str]]:
+    """
+    读取缓存的第 start 到 end - 1 页（从 0 开始），返回 (总页数, 各页文本)
+
+    只读取页索引和所需的字节范围，不读取整个文本。文本缓存不存在时抛出 FileNotFoundError。
+    """
+    text_path = text_cache_path(content_hash)
+    offsets = _load_page_index(text_path)
+    page_count = len(offsets) - 1
+    end = page_count if end is None else min(end, page_count)
+    if start >= end:
+        return page_count, []
+    with open(text_path, "rb") as file:
+        file.seek(offsets[start])
+        data = file.read(offsets[end] - 1 - offsets[start])
+    return page_count, data.decode("utf-8").split(PAGE_SEPARATOR)
+
+
+def read_cached_pages(content_hash: str) -> list[str]:
+    """读取缓存的按页文本"""
+    with open(text_cache_path(content_hash), encoding="utf-8") as file:
+        return file.read().split(PAGE_SEPARATOR)
@@ -0,0 +1,81 @@
+"""
+列表查询基准：完整 Document 加载 vs 投影模型
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_listing_projection.py [rows] [iterations]
+
+在 MongoDB 中创建临时数据库 <MONGO_DB>_bench，写入 rows 条 Item，
+分别用两种方式读取并转换为 ItemPublic，输出每页的 CPU 时间和 Python 内存峰值，结束后删除临时数据库。
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.models import Item, ItemListView, ItemPublic, User, models
+from app.utils.pagination_helper import fetch_page
+
+
+async def hydrated_page(limit: int) -> list[ItemPublic]:
+    items, _ = await fetch_page(Item, limit=limit)
+    return await ItemPublic.from_items(items)
+
+
+async def projected_page(limit: int) -> list[ItemPublic]:
+    rows, _ = await fetch_page(Item, limit=limit, projection_model=ItemListView)
+    return await ItemPublic.from_items(rows)
+
+
+async def measure(
+    page: Callable[[int], Awaitable[list[ItemPublic]]], limit: int, iterations: int
+) -> dict[str, float]:
+    await page(limit)  # 预热
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        await page(limit)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / iterations
+
+    tracemalloc.start()
+    await page(limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_ms": cpu_ms, "peak_kib": peak / 1024}
+
+
+async def run(client: Any, rows: int = 100, iterations: int = 200) -> None:
+    db_name = f"{settings.MONGO_DB}_bench"
+    await init_beanie(database=client[db_name], document_models=models)
+    try:
+        owner = User(email="bench@example.com", full_name="bench", hashed_password="x")
+        await owner.insert()
+        await Item.insert_many(
+            [
+                Item(title=f"item {i}", description="x" * 200, owner=owner)
+                for i in range(rows)
+            ]
+        )
+
+        results = {
+            "document": await measure(hydrated_page, rows, iterations),
+            "projection": await measure(projected_page, rows, iterations),
+        }
+        print(f"{rows} rows/page, {iterations} iterations")
+        print(f"{'path':<12}{'cpu ms/page':>14}{'peak KiB':>12}")
+        for name, result in results.items():
+            print(f"{name:<12}{result['cpu_ms']:>14.2f}{result['peak_kib']:>12.1f}")
+        base, fast = results["document"], results["projection"]
+        print(
+            f"saving: cpu {1 - fast['cpu_ms'] / base['cpu_ms']:.0%}, "
+            f"memory {1 - fast['peak_kib'] / base['peak_kib']:.0%}"
+        )
+    finally:
+        await client.drop_database(db_name)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(run(AsyncIOMotorClient(str(settings.MONGODB_URI)), *args))
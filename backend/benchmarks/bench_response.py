@@ -0,0 +1,78 @@
+"""
+响应序列化基准：FastAPI response_model 路径 vs ApiJSONResponse
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_response.py [rows] [iterations]
+
+构造一页 rows 条 ItemPublic 的 PaginatedResponse，比较两种方式把它变成响应字节的耗时：
+  - response_model: FastAPI 默认路径（dump -> 按 response_model 校验 -> 序列化 -> json.dumps）
+  - ApiJSONResponse: 路由直接返回，pydantic-core 一次序列化为字节
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import ApiJSONResponse
+from app.models import ItemPublic, UserPublic
+from app.models.response import ApiResponse, PaginatedResponse
+
+
+def build_page(rows: int) -> PaginatedResponse:
+    owner = UserPublic(id=PydanticObjectId(), email="bench@example.com", full_name="bench")
+    items = [
+        ItemPublic(
+            id=PydanticObjectId(),
+            title=f"item {i}",
+            description="x" * 200,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+            owner=owner,
+        )
+        for i in range(rows)
+    ]
+    return PaginatedResponse.create(items=items, total=rows, page=1, page_size=rows)
+
+
+# 与 APIRoute 一样，response_model 字段只创建一次
+RESPONSE_FIELD = create_model_field(
+    name="Response", type_=ApiResponse[list[ItemPublic]], mode="serialization"
+)
+
+
+async def response_model_path(page: PaginatedResponse) -> bytes:
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_path(page: PaginatedResponse) -> bytes:
+    return ApiJSONResponse(page).body
+
+
+async def measure(path, page: PaginatedResponse, iterations: int) -> float:
+    await path(page)  # 预热
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await path(page)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+async def main(rows: int = 100, iterations: int = 500) -> None:
+    page = build_page(rows)
+    assert len(await fast_path(page)) > 0
+    results = {
+        "response_model": await measure(response_model_path, page, iterations),
+        "ApiJSONResponse": await measure(fast_path, page, iterations),
+    }
+    print(f"{rows} rows/response, {iterations} iterations")
+    for name, ms in results.items():
+        print(f"{name:<16}{ms:>10.3f} ms/response")
+    print(f"speedup: {results['response_model'] / results['ApiJSONResponse']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*[int(arg) for arg in sys.argv[1:3]]))
@@ -0,0 +1,62 @@
+"""
+全文检索基准：BM25 查询延迟
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_search.py [docs] [queries]
+
+按 Zipf 分布生成 docs 篇合成文档（每篇约 300 词，词表 50000），分批写入索引，
+再随机执行 queries 次 1~3 个词的查询（单线程），输出 p50 / p95 / p99 延迟。
+"""
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.search import SearchIndex, add_documents
+
+VOCABULARY = 50_000
+DOC_LENGTH = 300
+BATCH = 10_000
+
+
+def build(directory: str, docs: int, rng: np.random.Generator) -> None:
+    words = np.array([f"w{i}" for i in range(VOCABULARY)])
+    for start in range(0, docs, BATCH):
+        count = min(BATCH, docs - start)
+        ranks = np.minimum(rng.zipf(1.2, size=(count, DOC_LENGTH)), VOCABULARY) - 1
+        documents = [
+            (f"{start + i:024x}", words[row].tolist())
+            for i, row in enumerate(ranks)
+        ]
+        add_documents(directory, documents)
+
+
+def main() -> None:
+    docs = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        build(directory, docs, rng)
+        print(f"indexed {docs} docs in {time.perf_counter() - started:.1f}s")
+
+        index = SearchIndex(directory)
+        index.search("w1")  # 加载段
+        latencies = []
+        for _ in range(queries):
+            # 查询词覆盖常见词和长尾词
+            terms = [f"w{int(rank) - 1}" for rank in np.minimum(rng.zipf(1.1, size=rng.integers(1, 4)), 5000)]
+            start = time.perf_counter()
+            index.search(" ".join(terms), limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"queries: {queries}")
+    print(f"p50: {quantiles[49]:.2f} ms  p95: {quantiles[94]:.2f} ms  p99: {quantiles[98]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+向量索引基准：精确检索与 IVF 分区检索的延迟和召回率
+
+    cd backend && PYTHONPATH=. python benchmarks/bench_vectors.py [rows] [queries]
+
+生成 rows 个聚成簇的随机单位向量（每 8 行属于同一文档），分别以精确检索和 IVF 检索执行
+queries 次查询，输出 p50 / p95 延迟以及 IVF 前 10 个结果相对精确检索的召回率。
+"""
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.search import VectorIndex, add_vectors, vectors
+from app.search.embedding import EMBEDDING_DIM
+
+BATCH = 20_000
+CHUNKS_PER_DOC = 8
+
+
+def build(directory: str, rows: int, rng: np.random.Generator) -> np.ndarray:
+    centres = rng.standard_normal((1000, EMBEDDING_DIM)).astype(np.float32)
+    samples = []
+    for start in range(0, rows, BATCH):
+        count = min(BATCH, rows - start)
+        data = centres[rng.integers(0, len(centres), size=count)]
+        data += 0.6 * rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+        data /= np.linalg.norm(data, axis=1, keepdims=True)
+        items = []
+        for offset in range(0, count, CHUNKS_PER_DOC):
+            chunk = data[offset:offset + CHUNKS_PER_DOC]
+            items.append((f"{(start + offset) // CHUNKS_PER_DOC:024d}", chunk, [0] * len(chunk)))
+        add_vectors(directory, items)
+        samples.append(data[:50])
+    return np.concatenate(samples)
+
+
+def measure(index: VectorIndex, queries: np.ndarray) -> tuple[list[float], list[list[str]]]:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, limit=10)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([key for key, _, _ in hits])
+    return latencies, results
+
+
+def report(name: str, latencies: list[float]) -> None:
+    quantiles = statistics.quantiles(sorted(latencies), n=100)
+    print(f"{name:6} p50: {quantiles[49]:.2f} ms  p95: {quantiles[94]:.2f} ms")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        samples = build(directory, rows, rng)
+        manifest = vectors.read_vector_manifest(directory)
+        print(f"indexed {rows} vectors in {time.perf_counter() - started:.1f}s, ivf: {manifest['ivf']}")
+        queries = samples[rng.choice(len(samples), size=count)]
+        queries += 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+
+        index = VectorIndex(directory)
+        index.search(queries[0])
+        ivf_latencies, ivf_results = measure(index, queries)
+        # 去掉分区即为精确检索
+        index._ivf = None
+        exact_latencies, exact_results = measure(index, queries)
+
+    report("exact", exact_latencies)
+    report("ivf", ivf_latencies)
+    recall = np.mean([
+        len(set(ivf) & set(exact)) / max(len(exact), 1)
+        for ivf, exact in zip(ivf_results, exact_results, strict=True)
+    ])
+    print(f"ivf recall@10: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()